@@ -33,7 +33,7 @@ from pychess.Utils.const import (
     RESIGNATION,
     SCHESS,
 )
-from pychess.Utils.logic import validate, getMoveKillingKing
+from pychess.Utils.logic import validate, getMoveKillingKing, legalMoveCount
 from pychess.Utils.lutils.ldata import MATE_VALUE
 from pychess.Utils.lutils.lmove import ParsingError
 from pychess.Variants import variants
@@ -166,6 +166,13 @@ class CECPEngine(ProtocolEngine):
         self.waitingForMove = False
         self.readyForMoveNowCommand = False
         self.timeHandicap = 1
+        self.multipvSetting = 1  # multiPV option sent to the engine
+        self.multipvExpected = (
+            1  # Number of PVs expected (limited by number of legal moves)
+        )
+        self.analysis = [None]
+        self.analysisDepth = None  # Depth of the lines being filled in
+        self.analysisLine = 0  # Index of the next line at that depth
 
         self.lastping = 0
         self.lastpong = 0
@@ -528,6 +535,8 @@ class CECPEngine(ProtocolEngine):
             self.__setPonder(value == 1)
         else:
             self.optionQueue.append(f"option {key}={value}")
+            if key == "multiPV":
+                self.multipvSetting = int(value)
 
     # Interacting with the player
 
@@ -659,6 +668,15 @@ class CECPEngine(ProtocolEngine):
             print("setboard 8/8/8/8/8/8/8/8 w - - 0 1", file=self.engine)
             self.engineIsAnalyzing = False
 
+    def __resetAnalysis(self):
+        if "multiPV" in self.options and self.multipvSetting > 1:
+            self.multipvExpected = min(self.multipvSetting, legalMoveCount(self.board))
+        else:
+            self.multipvExpected = 1
+        self.analysis = [None] * self.multipvExpected
+        self.analysisDepth = None
+        self.analysisLine = 0
+
     def __sendAnalyze(self, inverse=False):
         if inverse and self.board.board.opIsChecked():
             # Many engines don't like positions able to take down enemy
@@ -678,6 +696,7 @@ class CECPEngine(ProtocolEngine):
             )
             return
 
+        self.__resetAnalysis()
         print("post", file=self.engine)
         print("analyze", file=self.engine)
         self.engineIsAnalyzing = True
@@ -842,18 +861,27 @@ class CECPEngine(ProtocolEngine):
 
                         mvstrs = movere.findall(moves)
                         if mvstrs:
-                            self.emit(
-                                "analyze",
-                                [
-                                    (
-                                        self.board.ply,
-                                        mvstrs,
-                                        scoreval,
-                                        depth.strip(),
-                                        nps,
-                                    )
-                                ],
+                            analysis = (
+                                self.board.ply,
+                                mvstrs,
+                                scoreval,
+                                depth.strip(),
+                                nps,
                             )
+                            if "multiPV" in self.options:
+                                # The lines of a depth come one after the
+                                # other, the best first
+                                if depth != self.analysisDepth:
+                                    self.analysisDepth = depth
+                                    self.analysisLine = 0
+                                if self.analysisLine < len(self.analysis):
+                                    self.analysis[self.analysisLine] = analysis
+                                self.analysisLine += 1
+                                self.emit("analyze", self.analysis)
+                            else:
+                                # Other engines send a better line of the
+                                # same depth, when they find one
+                                self.emit("analyze", [analysis])
 
                         continue
 
@@ -1095,16 +1123,34 @@ class CECPEngine(ProtocolEngine):
         return self.features["analyze"]
 
     def getAnalysisLines(self):
-        return 1
+        return self.multipvSetting
 
     def minAnalysisLines(self):
-        return 1
+        try:
+            return int(self.options["multiPV"]["min"])
+        except (KeyError, ValueError):
+            return 1  # Engine does not support the multiPV option
 
     def maxAnalysisLines(self):
-        return 1
-
-    def requestMultiPV(self, setting):
-        return 1
+        try:
+            return int(self.options["multiPV"]["max"])
+        except (KeyError, ValueError):
+            return 1  # Engine does not support the multiPV option
+
+    def requestMultiPV(self, n):
+        n = min(n, self.maxAnalysisLines())
+        n = max(n, self.minAnalysisLines())
+        if n != self.multipvSetting:
+            self.multipvSetting = n
+            self.__resetAnalysis()
+            if self.engineIsAnalyzing:
+                # Analyze again, for all the lines to start from the first depth
+                print("exit", file=self.engine)
+                print("option multiPV=%s" % n, file=self.engine)
+                print("analyze", file=self.engine)
+            else:
+                print("option multiPV=%s" % n, file=self.engine)
+        return n
 
     def __repr__(self):
         if self.name:
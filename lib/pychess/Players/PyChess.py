@@ -1,6 +1,7 @@
 import os
 import random
 import sys
+from threading import Event, Lock
 from time import time
 
 this_dir = os.path.dirname(os.path.abspath(__file__))
@@ -30,6 +31,8 @@ try:
         PLACEMENTCHESS,
     )  # nopep8
     from pychess.Utils.lutils import lsearch  # nopep8
+    from pychess.Utils.lutils.LazySMP import LazySMP  # nopep8
+    from pychess.Utils.lutils.TimeManager import TimeManager  # nopep8
     from pychess.Utils.lutils.ldata import MAXPLY  # nopep8
     from pychess.Utils.lutils.lsearch import alphaBeta  # nopep8
     from pychess.Utils.lutils.lmove import listToSan, toSAN  # nopep8
@@ -43,18 +46,43 @@ class PyChess:
     def __init__(self):
         self.sd = MAXPLY
         self.skipPruneChance = 0
+        self.nullMove = True
+        self.lateMoveReductions = True
+        self.futilityPruning = True
+        self.razoring = True
+        self.deltaPruning = True
+        self.seePruning = True
+        self.qsearchChecks = False
+        # Half width of the window around the previous iteration's score, in
+        # which the next iteration is searched first. 0 means a full window.
+        self.aspirationWindow = 50
 
         self.clock = [0, 0]
         self.basetime = 0
         self.increment = 0
         self.movestogo = 0
         self.searchtime = 0
+        # Stop searching after about this many nodes. 0 means no limit.
+        self.nodeLimit = 0
+        # The number of best lines to search and print
+        self.multipv = 1
         self.scr = 0  # The current predicted score. Used when accepting draw offers
         self.playingAs = WHITE
-        self.ponder = False  # Currently unused
+        # Whether to search on the opponent's time ("hard" in CECP)
+        self.ponder = False
+        # The reply we expect to our last move, and while pondering the
+        # position after it
+        self.ponderMove = None
+        self.ponderBoard = None
+        self.pondering = False
+        self.__ponderhitEvent = Event()
+        self.__ponderLock = Lock()
+        self.__stopped = False
         self.post = False
         self.debug = True
         self.outOfBook = False
+        self.smp = LazySMP()
+        self.timeManager = TimeManager()
 
     def print(self, text):
         try:
@@ -66,6 +94,13 @@ class PyChess:
     def format_pv(self, board, moves):
         return listToSan(board, moves)
 
+    def print_pv(self, board, depth, score, elapsed, nodes, moves, multipv=1):
+        """Prints the thinking output of a finished iteration, for the
+        multipv'th best line"""
+        pv1 = " ".join(self.format_pv(board, moves))
+        time_cs = int(100 * elapsed)
+        self.print(f"{depth} {score} {time_cs} {nodes} {pv1}")
+
     # Play related
 
     def __remainingMovesA(self):
@@ -118,79 +153,197 @@ class PyChess:
             self.outOfBook = True
         return choice
 
+    def __applySearchOptions(self):
+        lsearch.skipPruneChance = self.skipPruneChance
+        lsearch.nullMove = self.nullMove
+        lsearch.lateMoveReductions = self.lateMoveReductions
+        lsearch.futilityPruning = self.futilityPruning
+        lsearch.razoring = self.razoring
+        lsearch.deltaPruning = self.deltaPruning
+        lsearch.seePruning = self.seePruning
+        lsearch.qsearchChecks = self.qsearchChecks
+        lsearch.nodeLimit = self.nodeLimit or sys.maxsize
+
+    def __search(self, board, depth, lastScore):
+        """Search board to depth, first inside the aspiration window around
+        lastScore and then, if the score falls outside of it, once more with
+        a full window"""
+        window = self.aspirationWindow
+        if window and depth > 1 and abs(lastScore) < lsearch.MATE_BOUND:
+            alpha = lastScore - window
+            beta = lastScore + window
+            mvs, scr = alphaBeta(board, depth, alpha, beta)
+            if alpha < scr < beta or not lsearch.searching:
+                return mvs, scr
+            if scr <= alpha:
+                self.timeManager.failLow()
+        return alphaBeta(board, depth)
+
+    def __searchLines(self, board, depth, lastScores):
+        """Search the self.multipv best lines of board to depth, each one
+        leaving out the first moves of the lines before it. As the searches
+        share the table, the lines after the first are much cheaper than it.
+        Returns a list of (moves, score) pairs, the best first, which holds
+        the first line even if its search was interrupted."""
+        lines = []
+        try:
+            for i in range(self.multipv):
+                lsearch.excludedMoves = frozenset(mvs[0] for mvs, scr in lines)
+                lastScore = lastScores[min(i, len(lastScores) - 1)]
+                mvs, scr = self.__search(board, depth, lastScore)
+                if not lines or (mvs and lsearch.searching):
+                    lines.append((mvs, scr))
+                if not mvs or not lsearch.searching:
+                    break
+        finally:
+            lsearch.excludedMoves = ()
+        lines.sort(key=lambda line: line[1], reverse=True)
+        return lines
+
+    def __timed(self):
+        return self.basetime > 0 or self.increment > 0 or self.searchtime > 0
+
+    def __startClock(self, nodes=0):
+        """Starts the time manager for the search of our move, and gives
+        lsearch its deadline"""
+        if self.searchtime > 0:
+            usetime = self.searchtime
+        else:
+            if self.movestogo > 0:
+                remaining_moves = self.__remainingMovesB()
+                usetime = self.clock[self.playingAs] / remaining_moves
+                if remaining_moves == 1:
+                    usetime -= 0.05
+            else:
+                usetime = self.clock[self.playingAs] / self.__remainingMovesA()
+                if self.clock[self.playingAs] > 10:
+                    # If we have time, we assume 40 moves rather than 80
+                    usetime *= 2
+                # The increment is a constant. We'll use this always
+                usetime += self.increment
+            usetime = min(usetime, self.clock[self.playingAs] / 2)
+
+        timeManager = self.timeManager
+        clock = self.searchtime or self.clock[self.playingAs]
+        timeManager.start(usetime, clock, nodes)
+        lsearch.endtime = timeManager.hardDeadline
+        lsearch.timecheckFreq = timeManager.timecheckFreq()
+        if self.debug:
+            self.print(
+                "# Time left: %3.2f s; Planing to think for %3.2f s, "
+                "at most %3.2f s"
+                % (
+                    self.clock[self.playingAs],
+                    timeManager.softLimit,
+                    timeManager.hardLimit,
+                )
+            )
+
     def __go(self, ondone=None):
-        """Finds and prints the best move from the current position"""
+        """Finds and prints the best move from the current position. While
+        pondering, searches the position after the expected reply instead,
+        and waits for __ponderhit() before making its move."""
 
-        mv = False if self.outOfBook else self.__getBestOpening()
+        if self.pondering:
+            board = self.ponderBoard
+            mv = False
+        else:
+            board = self.board
+            self.__stopped = False
+            mv = False if self.outOfBook else self.__getBestOpening()
         if mv:
             mvs = [mv]
+            self.ponderMove = None
 
         if not mv:
-            lsearch.skipPruneChance = self.skipPruneChance
-            lsearch.searching = True
+            self.__applySearchOptions()
+            # Keep the table, but let this search replace older entries
+            lsearch.newSearch()
 
-            timed = self.basetime > 0 or self.increment > 0 or self.searchtime > 0
-
-            if self.searchtime > 0:
-                usetime = self.searchtime
-            else:
-                if self.movestogo > 0:
-                    remaining_moves = self.__remainingMovesB()
-                    usetime = self.clock[self.playingAs] / remaining_moves
-                    if remaining_moves == 1:
-                        usetime -= 0.05
-                else:
-                    usetime = self.clock[self.playingAs] / self.__remainingMovesA()
-                    if self.clock[self.playingAs] > 10:
-                        # If we have time, we assume 40 moves rather than 80
-                        usetime *= 2
-                    # The increment is a constant. We'll use this always
-                    usetime += self.increment
-                usetime = min(usetime, self.clock[self.playingAs] / 2)
-
-            prevtime = 0
+            timed = self.__timed()
             starttime = time()
-            lsearch.endtime = starttime + usetime if timed else sys.maxsize
-            if self.debug:
+            timeManager = self.timeManager
+            if self.pondering:
+                # Searched until __ponderhit() or __stop(), which may
+                # already have cleared lsearch.searching
+                lsearch.endtime = sys.maxsize
+                if self.debug and self.ponderMove is not None:
+                    self.print("# Pondering on %s" % toSAN(self.board, self.ponderMove))
+            else:
+                lsearch.searching = True
                 if timed:
-                    self.print(
-                        "# Time left: %3.2f s; Planing to think for %3.2f s"
-                        % (self.clock[self.playingAs], usetime)
-                    )
+                    self.__startClock()
                 else:
-                    self.print("# Searching to depth %d without timelimit" % self.sd)
+                    lsearch.endtime = sys.maxsize
+                    if self.debug:
+                        self.print(
+                            "# Searching to depth %d without timelimit" % self.sd
+                        )
 
+            self.smp.start(board, self.sd, lsearch.endtime)
+            lines = [([], self.scr)]
             for depth in range(1, self.sd + 1):
-                # Heuristic time saving
-                # Don't waste time, if the estimated isn't enough to complete
-                # next depth
-                if depth > 1 and timed and usetime <= prevtime * 4 and usetime > 1:
+                # Don't start an iteration we don't have the time to finish
+                if (
+                    depth > 1
+                    and timed
+                    and not self.pondering
+                    and not timeManager.nextIteration()
+                ):
                     break
-                lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
-                search_result = alphaBeta(self.board, depth)
+                lsearch.timecheck_counter = lsearch.timecheckFreq
+                lines = self.__searchLines(board, depth, [scr for mvs, scr in lines])
                 if lsearch.searching:
-                    mvs, self.scr = search_result
+                    mvs, self.scr = lines[0]
+                    if timed and not self.pondering:
+                        timeManager.iterationDone(
+                            lsearch.nodes, mvs[0] if mvs else None, self.scr
+                        )
+                        lsearch.timecheckFreq = timeManager.timecheckFreq()
                     if time() > lsearch.endtime:
                         break
                     if self.post:
-                        pv1 = " ".join(self.format_pv(self.board, mvs))
-                        time_cs = int(100 * (time() - starttime))
-                        self.print(
-                            f"{depth} {self.scr} {time_cs} {lsearch.nodes} {pv1}"
-                        )
+                        for multipv, (lmvs, lscr) in enumerate(lines, 1):
+                            self.print_pv(
+                                board,
+                                depth,
+                                lscr,
+                                time() - starttime,
+                                lsearch.nodes + self.smp.nodes,
+                                lmvs,
+                                multipv,
+                            )
                 else:
                     # We were interrupted
                     if depth == 1:
-                        mvs, self.scr = search_result
+                        mvs, self.scr = lines[0]
                     break
-                prevtime = time() - starttime - prevtime
-
-                self.clock[self.playingAs] -= time() - starttime - self.increment
+            if self.pondering:
+                # Keep the result until we know whether the opponent played
+                # the move we expected
+                self.__ponderhitEvent.wait()
+            # Pondering without a ponderhit didn't use our time, and the time
+            # manager still times the previous search
+            if timed and timeManager.starttime >= starttime:
+                self.clock[self.playingAs] -= timeManager.elapsed() - self.increment
+            self.smp.stop()
+            if self.debug:
+                self.print(
+                    "# Nodes: %d in main search, %d in quiescent search"
+                    % (lsearch.nodes - lsearch.qnodes, lsearch.qnodes)
+                )
+
+            if self.pondering:
+                # The opponent didn't play the move we expected
+                lsearch.nodes = 0
+                lsearch.qnodes = 0
+                return
 
             if not mvs:
                 if not lsearch.searching:
                     # We were interupted
                     lsearch.nodes = 0
+                    lsearch.qnodes = 0
                     return
 
                 # This should only happen in terminal mode
@@ -198,58 +351,121 @@ class PyChess:
                 if self.scr == 0:
                     self.print("result %s" % reprResult[DRAW])
                 elif self.scr < 0:
-                    if self.board.color == WHITE:
+                    if board.color == WHITE:
                         self.print("result %s" % reprResult[BLACKWON])
                     else:
                         self.print("result %s" % reprResult[WHITEWON])
                 else:
-                    if self.board.color == WHITE:
+                    if board.color == WHITE:
                         self.print("result %s" % reprResult[WHITEWON])
                     else:
                         self.print("result %s" % reprResult[BLACKWON])
                 return
 
             lsearch.nodes = 0
+            lsearch.qnodes = 0
             lsearch.searching = False
+            # The reply we expect, to ponder on
+            self.ponderMove = mvs[1] if len(mvs) > 1 else None
 
         move = mvs[0]
-        sanmove = toSAN(self.board, move)
+        sanmove = toSAN(board, move)
         if ondone:
             ondone(sanmove)
         return sanmove
 
+    def __ponder(self, ondone=None, board=None):
+        """Searches board until __ponderhit() or __stop(). By default board is
+        the position after the reply we expect to our last move, which must
+        be on self.board. Returns whether we made our next move."""
+        with self.__ponderLock:
+            if board is None:
+                if self.__stopped or self.ponderMove is None:
+                    return False
+                board = self.board.clone()
+                board.applyMove(self.ponderMove)
+            else:
+                # A new search, as with __go
+                self.__stopped = False
+            self.ponderBoard = board
+            self.__ponderhitEvent.clear()
+            self.pondering = True
+            lsearch.searching = True
+        return self.__go(ondone) is not None
+
+    def __ponderhit(self):
+        """The opponent played the move we ponder on, and it's on self.board.
+        The pondering search goes on as the search of our move, keeping what
+        it has searched so far."""
+        if self.__timed():
+            self.__startClock(lsearch.nodes)
+        self.pondering = False
+        self.__ponderhitEvent.set()
+
+    def __stop(self, move=False):
+        """Stops searching, or pondering. Pondering makes no move, unless
+        move is true."""
+        with self.__ponderLock:
+            self.__stopped = True
+            lsearch.searching = False
+            if move:
+                self.pondering = False
+        self.__ponderhitEvent.set()
+
     def __analyze(self):
         """Searches, and prints info from, the position as stated in the cecp
         protocol"""
 
         start = time()
+        self.__applySearchOptions()
+        # Entries of the previous positions stay useful, as long as they are
+        # not replaced by ones for this position
+        lsearch.newSearch()
         lsearch.endtime = sys.maxsize
         lsearch.searching = True
+        lines = [([], 0)]
+        self.smp.start(self.board, self.sd, lsearch.endtime)
 
         for depth in range(1, self.sd):
             if not lsearch.searching:
                 break
-            board = self.board.clone()
-            mvs, scr = alphaBeta(board, depth)
-
-            pv1 = " ".join(self.format_pv(board, mvs))
-            time_cs = int(100 * (time() - start))
-            self.print(f"{depth} {scr} {time_cs} {lsearch.nodes} {pv1}")
+            board = self.board.clone(shareHistory=True)
+            lines = self.__searchLines(board, depth, [scr for mvs, scr in lines])
+
+            for multipv, (mvs, scr) in enumerate(lines, 1):
+                self.print_pv(
+                    board,
+                    depth,
+                    scr,
+                    time() - start,
+                    lsearch.nodes + self.smp.nodes,
+                    mvs,
+                    multipv,
+                )
 
             lsearch.nodes = 0
+            lsearch.qnodes = 0
+        self.smp.stop()
 
 
 if __name__ == "__main__":
     import logging
-    from pychess.Players.PyChessCECP import PyChessCECP
 
-    if len(sys.argv) == 1 or sys.argv[1:] == ["debug"]:
-        if "debug" in sys.argv[1:]:
+    args = sys.argv[1:]
+    if args in ([], ["debug"], ["uci"], ["uci", "debug"]):
+        if "debug" in args:
             log.logger.setLevel(logging.DEBUG)
         else:
             log.logger.setLevel(logging.WARNING)
 
-        pychess = PyChessCECP()
+        if "uci" in args:
+            from pychess.Players.PyChessUCI import PyChessUCI
+
+            pychess = PyChessUCI()
+        else:
+            from pychess.Players.PyChessCECP import PyChessCECP
+
+            pychess = PyChessCECP()
     else:
         print("Unknown argument(s):", repr(sys.argv))
         sys.exit(0)
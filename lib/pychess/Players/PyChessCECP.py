@@ -39,9 +39,10 @@ from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.ldata import MAXPLY
 from pychess.Utils.lutils import lsearch, leval
 from pychess.Utils.lutils.lmove import parseSAN, parseAny, toSAN, toAN, ParsingError
-from pychess.Utils.lutils.lmovegen import genAllMoves, genCaptures, genCheckEvasions
+from pychess.Utils.lutils.lmovegen import genLegalMoves, genCaptures, genCheckEvasions
 from pychess.Utils.lutils.validator import validateMove
 from pychess.System.Log import log
+from pychess.System.prefix import addUserCachePrefix
 from pychess.Variants.horde import HORDESTART
 from pychess.Variants.placement import PLACEMENTSTART
 from pychess.Variants.threecheck import THREECHECKSTART
@@ -61,6 +62,20 @@ if sys.platform != "win32":
 
 ASCII = sys.platform == "win32"
 
+# The variants of the variant command starting from the standard position, or
+# from one set up by the GUI
+STANDARD_START_VARIANTS = {
+    "fischerandom": FISCHERRANDOMCHESS,
+    "crazyhouse": CRAZYHOUSECHESS,
+    "wildcastle": WILDCASTLESHUFFLECHESS,
+    "losers": LOSERSCHESS,
+    "suicide": SUICIDECHESS,
+    "giveaway": GIVEAWAYCHESS,
+    "atomic": ATOMICCHESS,
+    "racingkings": RACINGKINGSCHESS,
+    "kingofthehill": KINGOFTHEHILLCHESS,
+}
+
 
 def get_input():
     return input()
@@ -98,10 +113,22 @@ class PyChessCECP(PyChess):
             "pause": 0,  # Unimplemented
             "nps": 0,  # Unimplemented
             "debug": 1,
-            "memory": 0,  # Unimplemented
-            "smp": 0,  # Unimplemented
+            "memory": 1,
+            "smp": 1,
             "egt": "gaviota",
-            "option": "skipPruneChance -slider 0 0 100",
+            "option": [
+                "skipPruneChance -slider 0 0 100",
+                "nullMove -check 1",
+                "lateMoveReductions -check 1",
+                "futilityPruning -check 1",
+                "razoring -check 1",
+                "deltaPruning -check 1",
+                "seePruning -check 1",
+                "qsearchChecks -check 0",
+                "aspirationWindow -spin 50 0 1000",
+                "multiPV -spin 1 1 64",
+                "persistentHash -check 0",
+            ],
         }
         python = sys.executable.split("/")[-1]
         python_version = "%s.%s.%s" % sys.version_info[0:3]
@@ -140,7 +167,8 @@ class PyChessCECP(PyChess):
                 elif lines[0] == "protover":
                     stringPairs = [
                         "=".join([k, '"%s"' % v if isinstance(v, str) else str(v)])
-                        for k, v in self.features.items()
+                        for k, values in self.features.items()
+                        for v in (values if isinstance(values, list) else [values])
                     ]
                     self.print("feature %s" % " ".join(stringPairs))
                     self.print("feature done=1")
@@ -173,29 +201,14 @@ class PyChessCECP(PyChess):
 
                 elif lines[0] == "variant":
                     if len(lines) > 1:
-                        if lines[1] == "fischerandom":
-                            self.board.variant = FISCHERRANDOMCHESS
-                        elif lines[1] == "crazyhouse":
-                            self.board.variant = CRAZYHOUSECHESS
-                            self.board.iniHouse()
-                        elif lines[1] == "wildcastle":
-                            self.board.variant = WILDCASTLESHUFFLECHESS
-                        elif lines[1] == "losers":
-                            self.board.variant = LOSERSCHESS
-                        elif lines[1] == "suicide":
-                            self.board.variant = SUICIDECHESS
-                        elif lines[1] == "giveaway":
-                            self.board.variant = GIVEAWAYCHESS
-                        elif lines[1] == "atomic":
-                            self.board.variant = ATOMICCHESS
-                            self.board.iniAtomic()
+                        # A new board, as LBoard keeps the material up to date
+                        # with the piece values of its variant
+                        if lines[1] in STANDARD_START_VARIANTS:
+                            self.board = LBoard(STANDARD_START_VARIANTS[lines[1]])
+                            self.board.applyFen(FEN_START)
                         elif lines[1] == "3check":
                             self.board = LBoard(THREECHECKCHESS)
                             self.board.applyFen(THREECHECKSTART)
-                        elif lines[1] == "racingkings":
-                            self.board.variant = RACINGKINGSCHESS
-                        elif lines[1] == "kingofthehill":
-                            self.board.variant = KINGOFTHEHILLCHESS
                         elif lines[1] == "horde":
                             self.board = LBoard(HORDECHESS)
                             self.board.applyFen(HORDESTART)
@@ -224,6 +237,8 @@ class PyChessCECP(PyChess):
                 elif lines[0] == "quit":
                     self.forced = True
                     self.__stopSearching()
+                    self.smp.shutdown()
+                    lsearch.table.save()
                     sys.exit(0)
 
                 elif lines[0] == "random":
@@ -283,7 +298,9 @@ class PyChessCECP(PyChess):
                     self.clock[1 - self.playingAs] = float(lines[1]) / 100.0
 
                 elif lines[0] == "usermove":
-                    self.__stopSearching()
+                    # While pondering the search runs on its own board
+                    if not self.pondering:
+                        self.__stopSearching()
                     try:
                         move = parseAny(self.board, lines[1])
                     except ParsingError:
@@ -294,6 +311,11 @@ class PyChessCECP(PyChess):
                         self.print("Illegal move: %s" % lines[1])
                         self.print(self.board.prepr(ascii=ASCII))
                         continue
+                    if self.pondering and move == self.ponderMove:
+                        self.board.applyMove(move)
+                        PyChess._PyChess__ponderhit(self)
+                        continue
+                    self.__stopSearching()
                     self.board.applyMove(move)
                     self.playingAs = self.board.color
                     if not self.forced and not self.analyzing:
@@ -302,7 +324,7 @@ class PyChessCECP(PyChess):
                         self.__analyze()
 
                 elif lines[0] == "?":
-                    if not self.forced and not self.analyzing:
+                    if not self.forced and not self.analyzing and not self.pondering:
                         self.__stopSearching()
 
                 elif lines[0] == "ping":
@@ -374,18 +396,23 @@ class PyChessCECP(PyChess):
                 elif lines[0] == "memory":
                     # FIXME: this is supposed to control the *total* memory use.
                     if lsearch.searching:
-                        self.print("Error (already searching):", line)
+                        self.print("Error (already searching): %s" % line)
                     else:
                         limit = int(lines[1])
                         if limit < 1:
-                            self.print("Error (limit too low):", line)
+                            self.print("Error (limit too low): %s" % line)
                         else:
-                            pass
-                            # TODO implement
-                            # lsearch.setHashSize(limit)
+                            lsearch.setHashSize(limit)
+                            # Let the helpers attach to the new table
+                            self.smp.setCores(len(self.smp.helpers) + 1)
 
                 elif lines[0] == "cores":
-                    pass  # We aren't SMP-capable.
+                    cores = int(lines[1])
+                    if cores < 1:
+                        self.print("Error (too few cores): %s" % line)
+                    else:
+                        self.__stopSearching()
+                        self.smp.setCores(cores)
 
                 elif lines[0] == "egtpath":
                     if len(lines) >= 3 and lines[1] == "gaviota":
@@ -410,6 +437,37 @@ class PyChessCECP(PyChess):
                             self.print(
                                 "Error (argument must be an integer 0..100): %s" % line
                             )
+                    elif name in (
+                        "nullMove",
+                        "lateMoveReductions",
+                        "futilityPruning",
+                        "razoring",
+                        "deltaPruning",
+                        "seePruning",
+                        "qsearchChecks",
+                    ):
+                        setattr(self, name, bool(value))
+                    elif name == "persistentHash":
+                        # Keep the hash table in a file, to use it again the
+                        # next time the engine is started
+                        self.__stopSearching()
+                        path = addUserCachePrefix("pychess.hash") if value else None
+                        lsearch.setHashFile(path)
+                        self.smp.setCores(len(self.smp.helpers) + 1)
+                    elif name == "multiPV":
+                        if 1 <= value <= 64:
+                            self.multipv = value
+                        else:
+                            self.print(
+                                "Error (argument must be an integer 1..64): %s" % line
+                            )
+                    elif name == "aspirationWindow":
+                        if 0 <= value <= 1000:
+                            self.aspirationWindow = value
+                        else:
+                            self.print(
+                                "Error (argument must be an integer 0..1000): %s" % line
+                            )
 
                 # CECP analyze mode commands
                 # See http://www.gnu.org/software/xboard/engine-intf.html#11
@@ -428,7 +486,7 @@ class PyChessCECP(PyChess):
                     self.print(
                         [
                             self.__formatMove(self.board, move)
-                            for move in genAllMoves(self.board)
+                            for move in genLegalMoves(self.board)
                         ]
                     )
 
@@ -451,18 +509,25 @@ class PyChessCECP(PyChess):
                     )
 
                 elif lines[0] == "benchmark":
+                    # benchmark [depth] [outputfilename]
                     if len(lines) > 1:
-                        benchmark(int(lines[1]))
+                        benchmark(int(lines[1]), *lines[2:3])
                     else:
                         benchmark()
 
                 elif lines[0] == "profile":
+                    # profile outputfilename [depth] [benchmarkfilename]
                     if len(lines) > 1:
                         import cProfile
 
-                        cProfile.runctx("benchmark()", locals(), globals(), lines[1])
+                        args = [int(lines[2])] + lines[3:4] if len(lines) > 2 else []
+                        cProfile.runctx(
+                            "benchmark(*args)", globals(), locals(), lines[1]
+                        )
                     else:
-                        self.print("Usage: profile outputfilename")
+                        self.print(
+                            "Usage: profile outputfilename [depth] [benchmarkfilename]"
+                        )
 
                 elif lines[0] == "perft":
                     root = "0" if len(lines) < 3 else lines[2]
@@ -500,9 +565,10 @@ class PyChessCECP(PyChess):
                 self.print("Error (missing argument): %s" % line)
 
     def __stopSearching(self):
-        lsearch.searching = False
+        PyChess._PyChess__stop(self)
         if self.thread:
             self.thread.join()
+        self.pondering = False
 
     def __formatMove(self, board, move):
         if self.features["san"]:
@@ -529,13 +595,19 @@ class PyChessCECP(PyChess):
                 output = self.__formatMove(self.board, move)
                 self.board.applyMove(move)
                 self.print("move %s" % output)
-            # TODO: start pondering, if enabled
 
-        self.thread = Thread(
-            target=PyChess._PyChess__go,
-            name=fident(PyChess._PyChess__go),
-            args=(self, ondone),
-        )
+        def play():
+            PyChess._PyChess__go(self, ondone)
+            # Search on the opponent's time, and as long as the opponent plays
+            # the move we expect, keep on searching
+            while (
+                self.ponder
+                and not self.forced
+                and PyChess._PyChess__ponder(self, ondone)
+            ):
+                pass
+
+        self.thread = Thread(target=play, name=fident(play))
         self.thread.daemon = True
         self.thread.start()
 
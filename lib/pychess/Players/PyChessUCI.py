@@ -0,0 +1,289 @@
+import signal
+import sys
+from threading import Thread
+
+import pychess
+from pychess.Players.PyChess import PyChess
+from pychess.System import fident
+from pychess.Utils.const import (
+    CASTLE_KK,
+    CASTLE_KR,
+    NORMALCHESS,
+    FEN_START,
+    FISCHERRANDOMCHESS,
+    WHITE,
+)
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.ldata import MAXPLY, MATE_VALUE
+from pychess.Utils.lutils import lsearch
+from pychess.Utils.lutils.lmove import parseAN, parseSAN, toAN, ParsingError
+from pychess.Utils.lutils.validator import validateMove
+from pychess.System.Log import log
+
+# The parameters of go taking a value
+GO_PARAMETERS = (
+    "wtime",
+    "btime",
+    "winc",
+    "binc",
+    "movestogo",
+    "movetime",
+    "depth",
+    "nodes",
+    "mate",
+)
+
+
+def get_input():
+    return input()
+
+
+class PyChessUCI(PyChess):
+    """The built-in engine speaking the UCI protocol.
+    See http://wbec-ridderkerk.nl/html/UCIProtocol.html"""
+
+    def __init__(self):
+        PyChess.__init__(self)
+        self.board = LBoard(NORMALCHESS)
+        self.board.applyFen(FEN_START)
+
+        self.thread = None
+        self.post = True
+        self.debug = False
+        self.chess960 = False
+
+        self.options = [
+            "Hash type spin default 32 min 1 max 4096",
+            "Threads type spin default 1 min 1 max 64",
+            "MultiPV type spin default 1 min 1 max 64",
+            "Ponder type check default false",
+            "UCI_Chess960 type check default false",
+        ]
+
+    def print(self, text):
+        # Debug output, and the results the search core prints in terminal
+        # mode, are sent as info strings
+        if text.startswith("#"):
+            text = "info string %s" % text[1:].strip()
+        elif text.startswith("result"):
+            text = "info string %s" % text
+        PyChess.print(self, text)
+
+    def handle_sigterm(self, *args):
+        self.__stopSearching()
+        sys.exit(0)
+
+    def makeReady(self):
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self.handle_sigterm)
+
+    def run(self):
+        while True:
+            try:
+                line = get_input()
+            except EOFError:
+                line = "quit"
+            lines = line.split()
+
+            try:
+                if not lines:
+                    continue
+
+                log.debug(line, extra={"task": "uci"})
+
+                if lines[0] == "uci":
+                    self.print("id name PyChess %s" % pychess.VERSION)
+                    self.print("id author The PyChess team")
+                    for option in self.options:
+                        self.print("option name %s" % option)
+                    self.print("uciok")
+
+                elif lines[0] == "debug":
+                    self.debug = lines[1] == "on"
+
+                elif lines[0] == "isready":
+                    self.print("readyok")
+
+                elif lines[0] == "setoption":
+                    self.__setOption(line)
+
+                elif lines[0] == "ucinewgame":
+                    self.__stopSearching()
+                    self.outOfBook = False
+
+                elif lines[0] == "position":
+                    self.__stopSearching()
+                    self.__setPosition(lines[1:])
+
+                elif lines[0] == "go":
+                    self.__stopSearching()
+                    self.__go(lines[1:])
+
+                elif lines[0] == "stop":
+                    self.__stopSearching()
+
+                elif lines[0] == "ponderhit":
+                    if self.pondering:
+                        PyChess._PyChess__ponderhit(self)
+
+                elif lines[0] == "quit":
+                    self.__stopSearching()
+                    self.smp.shutdown()
+                    lsearch.table.save()
+                    sys.exit(0)
+
+                elif lines[0] == "stop_unittest":
+                    break
+
+                else:
+                    self.print("info string Unknown command: %s" % line)
+            except (IndexError, ValueError):
+                self.print("info string Invalid command: %s" % line)
+
+    def __stopSearching(self):
+        """Stops the search, which still reports its best move"""
+        PyChess._PyChess__stop(self, move=True)
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.pondering = False
+
+    def __setOption(self, line):
+        # setoption name <id> [value <x>], where the id may contain spaces
+        name, _, value = line.partition(" name ")[2].partition(" value ")
+        name = name.strip().lower()
+        value = value.strip()
+        if name == "hash":
+            self.__stopSearching()
+            lsearch.setHashSize(max(1, int(value)))
+            # Let the helpers attach to the new table
+            self.smp.setCores(len(self.smp.helpers) + 1)
+        elif name == "threads":
+            self.__stopSearching()
+            self.smp.setCores(max(1, int(value)))
+        elif name == "multipv":
+            self.multipv = max(1, int(value))
+        elif name == "ponder":
+            # We ponder when told to with go ponder, whatever this says
+            pass
+        elif name == "uci_chess960":
+            self.chess960 = value == "true"
+            self.board.variant = FISCHERRANDOMCHESS if self.chess960 else NORMALCHESS
+        else:
+            self.print("info string Unknown option: %s" % name)
+
+    def __setPosition(self, args):
+        """position [startpos | fen <fen>] [moves <move> ...]"""
+        if "moves" in args:
+            index = args.index("moves")
+            args, moves = args[:index], args[index + 1 :]
+        else:
+            moves = []
+        if args[0] == "startpos":
+            fen = FEN_START
+        elif args[0] == "fen":
+            fen = " ".join(args[1:])
+        else:
+            raise ValueError(args[0])
+
+        board = LBoard(FISCHERRANDOMCHESS if self.chess960 else NORMALCHESS)
+        board.applyFen(fen)
+        for movestr in moves:
+            try:
+                move = parseAN(board, movestr)
+            except ParsingError:
+                move = None
+            if move is None or not validateMove(board, move):
+                self.print("info string Illegal move: %s" % movestr)
+                break
+            board.applyMove(move)
+        self.board = board
+        self.playingAs = board.color
+
+    def __go(self, args):
+        """go [wtime <x>] [btime <x>] [winc <x>] [binc <x>] [movestogo <x>]
+        [movetime <x>] [depth <x>] [nodes <x>] [infinite] [ponder]"""
+        params = {}
+        i = 0
+        while i < len(args):
+            if args[i] in GO_PARAMETERS:
+                params[args[i]] = int(args[i + 1])
+                i += 2
+            else:
+                params[args[i]] = True
+                i += 1
+
+        self.playingAs = self.board.color
+        us, them = ("wtime", "btime") if self.playingAs == WHITE else ("btime", "wtime")
+        self.clock[:] = [0, 0]
+        self.clock[self.playingAs] = params.get(us, 0) / 1000
+        self.clock[1 - self.playingAs] = params.get(them, 0) / 1000
+        self.basetime = self.clock[self.playingAs]
+        inc = "winc" if self.playingAs == WHITE else "binc"
+        self.increment = params.get(inc, 0) / 1000
+        self.movestogo = params.get("movestogo", 0)
+        self.searchtime = params.get("movetime", 0) / 1000
+        self.sd = min(params.get("depth", MAXPLY), MAXPLY)
+        self.nodeLimit = params.get("nodes", 0)
+
+        # Until ponderhit or stop, the search isn't timed
+        untimed = "infinite" in params or "ponder" in params
+        # We report the best move, and expect a reply, after the position
+        self.ponderMove = None
+
+        def ondone(result):
+            board = self.board.clone()
+            move = parseSAN(board, result)
+            output = "bestmove %s" % self.__formatMove(board, move)
+            if self.ponderMove is not None:
+                board.applyMove(move)
+                output += " ponder %s" % self.__formatMove(board, self.ponderMove)
+            self.print(output)
+
+        def search():
+            if untimed:
+                board = self.board.clone()
+                done = PyChess._PyChess__ponder(self, ondone, board)
+            else:
+                done = PyChess._PyChess__go(self, ondone) is not None
+            if not done:
+                # UCI asks for a best move, even when there is none
+                self.print("bestmove (none)")
+
+        self.thread = Thread(target=search, name=fident(search))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __formatMove(self, board, move):
+        castle_notation = CASTLE_KR if self.chess960 else CASTLE_KK
+        return toAN(board, move, short=True, castleNotation=castle_notation)
+
+    def format_pv(self, board, moves):
+        board = board.clone()
+        formatted = []
+        for move in moves:
+            formatted.append(self.__formatMove(board, move))
+            board.applyMove(move)
+        return formatted
+
+    def print_pv(self, board, depth, score, elapsed, nodes, moves, multipv=1):
+        if abs(score) >= lsearch.MATE_BOUND:
+            plies = MATE_VALUE - abs(score)
+            mate = (plies + 1) // 2
+            scorestr = "mate %d" % (mate if score > 0 else -mate)
+        else:
+            scorestr = "cp %d" % score
+        self.print(
+            "info depth %d multipv %d score %s time %d nodes %d nps %d hashfull %d "
+            "pv %s"
+            % (
+                depth,
+                multipv,
+                scorestr,
+                int(1000 * elapsed),
+                nodes,
+                int(nodes / elapsed) if elapsed > 0 else 0,
+                lsearch.table.hashfull(),
+                " ".join(self.format_pv(board, moves)),
+            )
+        )
@@ -1181,7 +1181,7 @@ class PGNFile(ChessFile):
                         self.error = LoadingError(errstr1, "")
                         break
 
-                    new_board = last_board.clone()
+                    new_board = last_board.clone(shareHistory=True)
                     new_board.applyMove(lmove)
 
                     if m.group(MOVE_COMMENT):
@@ -597,7 +597,7 @@ class Board:
 
     def clone(self, lboard=None):
         if lboard is None:
-            lboard = self.board.clone()
+            lboard = self.board.clone(shareHistory=True)
 
         if self.variant != NORMALCHESS:
             from pychess.Variants import variants
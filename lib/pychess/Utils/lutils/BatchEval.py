@@ -0,0 +1,662 @@
+"""Evaluates many standard chess positions at once with NumPy.
+
+The positions are packed into arrays, with the bitboards of LBoard.boards as
+uint64 numbers, and each term of leval.evaluateNormal is computed for all of
+them together. The scores are those of evaluateComplete for standard chess,
+which makes the module useful for statistics over whole databases, like the
+material balance at every ply, and for screening positions before searching
+them.
+
+NumPy is an optional dependency of PyChess, the numpy extra, so this module
+is only importable when it is installed."""
+
+import numpy as np
+
+from pychess.Utils.const import (
+    WHITE,
+    BLACK,
+    NORMALCHESS,
+    PAWN,
+    KNIGHT,
+    BISHOP,
+    ROOK,
+    QUEEN,
+    KING,
+    BPAWN,
+    CAS_FLAGS,
+    W_OO,
+    W_OOO,
+    B_OO,
+    B_OOO,
+    reprSign,
+    A2,
+    B3,
+    H2,
+    G3,
+    A7,
+    B6,
+    H7,
+    G6,
+    B1,
+    G1,
+    B8,
+    G8,
+    D1,
+)
+from .LBoard import LBoard
+from .attack import staticExchangeEvaluate
+from .ldata import (
+    bitPosArray,
+    fileBits,
+    fromToRay,
+    moveArray,
+    distance,
+    passedPawnMask,
+    passedScores,
+    pawnScoreBoard,
+    squarePawnMask,
+    isolaniMask,
+    isolani_normal,
+    isolani_weaker,
+    frontWall,
+    endingKing,
+    materialValues,
+    stonewall,
+    lbox,
+    brank7,
+    brank8,
+    brank67,
+    d2e2,
+    WHITE_SQUARES,
+    BLACK_SQUARES,
+)
+from .leval import (
+    tropisms,
+    PHASE_MATERIAL,
+    MATERIAL_DIFF_LIMIT,
+    TRADE_DOWN_TOTAL,
+    TRADE_DOWN_DIVISOR,
+    BACKWARD_PAWN,
+    DOUBLED_PAWN,
+    PAWN_BASE_ATTACKED,
+    EIGHT_PAWNS,
+    STONEWALL_BONUS,
+    LOCKED_PAWN,
+    CONNECTED_PASSERS,
+    BLOCKED_CENTER_PAWN,
+    PAWN_STORM,
+    DOUBLE_QR7,
+    PAWN_WALL_MOD,
+    DEVELOPMENT_PLIES,
+    NO_KING_SIDE_CASTLING,
+    NO_QUEEN_SIDE_CASTLING,
+    QUEEN_MOVED,
+    WING_PAWNS_DESTROYED,
+    ROOK_OPEN_FILE,
+    ROOK_OPEN_FILE_EXTRA,
+    ROOK_F_FILE,
+)
+from .lmovegen import newMove
+
+# Positions are evaluated this many at a time, to bound the memory used for
+# the arrays with an entry for every square of every position
+CHUNK_SIZE = 4096
+
+PIECES = range(PAWN, KING + 1)
+
+################################################################################
+# Tables of leval and ldata as arrays                                          #
+################################################################################
+
+CORDS = np.arange(64)
+# The bit of each cord, as in bitPosArray
+SHIFTS = np.array([63 - cord for cord in range(64)], dtype=np.uint64)
+BITPOS = np.array(bitPosArray, dtype=np.uint64)
+FILES = CORDS & 7
+RANKS = CORDS >> 3
+
+PIECE_VALUES = np.array(materialValues(NORMALCHESS)[: KING + 1], dtype=np.int64)
+PASSED_SCORES = np.array(passedScores, dtype=np.int64)
+# The passed pawn score of the rank of each cord
+CORD_PASSED_SCORES = PASSED_SCORES[:, RANKS]
+PAWN_SCORES = np.array(pawnScoreBoard, dtype=np.int64)
+ENDING_KING = np.array(endingKing, dtype=np.int64)
+KING_DISTANCE = np.array(distance[KING], dtype=np.int64)
+KING_MOVES = np.array(moveArray[KING], dtype=np.uint64)
+NUMBERMOD = np.array(PAWN_WALL_MOD, dtype=np.int64)
+TROPISMS = {
+    piece: np.array(tropisms[piece], dtype=np.int64) for piece in range(KNIGHT, KING)
+}
+ISOLANI_NORMAL = np.array(isolani_normal, dtype=np.int64)
+ISOLANI_WEAKER = np.array(isolani_weaker, dtype=np.int64)
+FILE_BITS = np.array(fileBits, dtype=np.uint64)
+ISOLANI_MASK = np.array(isolaniMask, dtype=np.uint64)
+
+# The file bits of the file of each cord
+CORD_FILE_BITS = FILE_BITS[FILES]
+
+# The front walls of evalKingSafety, for kings on the queen and king side
+WALLS = (
+    np.array((frontWall[WHITE][B1], frontWall[WHITE][G1]), dtype=np.uint64),
+    np.array((frontWall[BLACK][B8], frontWall[BLACK][G8]), dtype=np.uint64),
+)
+SQUARE_COLORS = np.array((BLACK_SQUARES, WHITE_SQUARES), dtype=np.uint64)
+
+# The squares before the home square of the queen, which firstBit() would
+# find before it
+QUEEN_HOME = (D1, D1 + 56)
+BEFORE_QUEEN_HOME = tuple(
+    sum(bitPosArray[cord] for cord in range(home)) for home in QUEEN_HOME
+)
+
+
+def _passedPawnTables(color):
+    """Masks of cacheablePawnInfo for the pawns of color on each cord"""
+    opcolor = 1 - color
+    step = 8 if color == WHITE else -8
+    ptype = PAWN if color == WHITE else BPAWN
+    opptype = PAWN if color == BLACK else BPAWN
+    tables = {
+        name: [0] * 64
+        for name in (
+            "passed",
+            "ray",
+            "front",
+            "front2",
+            "front3",
+            "ownAttack",
+            "opAttack",
+            "ownAttack2",
+            "opAttack2",
+            "ownAttack3",
+            "opAttack3",
+        )
+    }
+    for cord in range(64):
+        tables["passed"][cord] = passedPawnMask[color][cord]
+        tables["ray"][cord] = fromToRay[cord][cord | 56 if color == WHITE else cord & 7]
+        # Pawns on the first or last rank don't occur
+        if not 8 <= cord < 56:
+            continue
+        i = cord + step
+        tables["front"][cord] = passedPawnMask[opcolor][i] & ~fileBits[cord & 7]
+        tables["ownAttack"][cord] = moveArray[opptype][i]
+        tables["opAttack"][cord] = moveArray[ptype][i]
+        if bitPosArray[cord] & brank7[opcolor]:
+            for n in (2, 3):
+                i += step
+                tables["front%d" % n][cord] = passedPawnMask[opcolor][i] & ~fileBits[1]
+                tables["ownAttack%d" % n][cord] = moveArray[opptype][i]
+                tables["opAttack%d" % n][cord] = moveArray[ptype][i]
+    arrays = {name: np.array(table, dtype=np.uint64) for name, table in tables.items()}
+    arrays["square"] = np.array(squarePawnMask[color], dtype=np.uint64)
+    arrays["attack"] = np.array(moveArray[ptype], dtype=np.uint64)
+    arrays["step"] = step
+    return arrays
+
+
+PAWN_TABLES = (_passedPawnTables(WHITE), _passedPawnTables(BLACK))
+
+
+def _hunterTables(color):
+    """The squares of the pieces of the opponent, which can reach the
+    promotion square of a passed pawn of color on each cord before it, for
+    each piece"""
+    hunters = {}
+    for piece in range(KNIGHT, KING + 1):
+        table = [0] * 64
+        for pawn in range(64):
+            prom_cord = 7 << 3 | pawn & 7 if color == WHITE else pawn & 7
+            distance_to_promotion = distance[PAWN][pawn][prom_cord]
+            for cord in range(64):
+                if distance[piece][cord][prom_cord] <= distance_to_promotion:
+                    table[pawn] |= bitPosArray[cord]
+        hunters[piece] = np.array(table, dtype=np.uint64)
+    return hunters
+
+
+HUNTERS = (_hunterTables(WHITE), _hunterTables(BLACK))
+
+################################################################################
+# Bitboard operations                                                          #
+################################################################################
+
+if hasattr(np, "bitwise_count"):
+
+    def _popcount(bitboards):
+        return np.bitwise_count(bitboards).astype(np.int64)
+
+else:
+    # NumPy before 2.0
+
+    def _popcount(bitboards):
+        bitboards = np.ascontiguousarray(bitboards, dtype=np.uint64)
+        octets = bitboards.view(np.uint8).reshape(bitboards.shape + (8,))
+        return np.unpackbits(octets, axis=-1).sum(axis=-1, dtype=np.int64)
+
+
+def _squares(bitboards):
+    """The bits of bitboards as booleans, indexed by cord in a new last axis"""
+    return ((bitboards[..., None] >> SHIFTS) & np.uint64(1)).astype(bool)
+
+
+def _any(bitboards):
+    return bitboards != 0
+
+
+################################################################################
+# Packing of positions                                                         #
+################################################################################
+
+
+class PackedBoards:
+    """Arrays of the parts of n positions the evaluation depends on:
+    boards      uint64 (n, 2, 7): the bitboards of LBoard.boards
+    color       uint8 (n,): the side to move
+    castling    uint8 (n,): the castling flags
+    hasCastled  bool (n, 2)
+    plyCount    int64 (n,)
+    All positions are standard chess with both kings on the board."""
+
+    def __init__(self, boards, color, castling, hasCastled, plyCount):
+        self.boards = np.asarray(boards, dtype=np.uint64)
+        self.color = np.asarray(color, dtype=np.uint8)
+        self.castling = np.asarray(castling, dtype=np.uint8)
+        self.hasCastled = np.asarray(hasCastled, dtype=bool)
+        self.plyCount = np.asarray(plyCount, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.color)
+
+    def __getitem__(self, index):
+        """The positions of a slice or an index array"""
+        return PackedBoards(
+            self.boards[index],
+            self.color[index],
+            self.castling[index],
+            self.hasCastled[index],
+            self.plyCount[index],
+        )
+
+
+def packBoards(boards):
+    """Packs an iterable of LBoards"""
+    boards = list(boards)
+    return PackedBoards(
+        [
+            [board.boards[color][: KING + 1] for color in (WHITE, BLACK)]
+            for board in boards
+        ],
+        [board.color for board in boards],
+        [board.castling for board in boards],
+        [board.hasCastled for board in boards],
+        [board.plyCount for board in boards],
+    )
+
+
+def unpackBoard(packed, index):
+    """The LBoard of a packed position. What packing leaves out, like the en
+    passant square and the history, is lost."""
+    placement = []
+    bitboards = packed.boards[index]
+    for rank in range(7, -1, -1):
+        row = ""
+        empty = 0
+        for file in range(8):
+            cord = rank * 8 + file
+            sign = None
+            for color in (WHITE, BLACK):
+                for piece in PIECES:
+                    if int(bitboards[color][piece]) & bitPosArray[cord]:
+                        sign = reprSign[piece]
+                        sign = sign if color == WHITE else sign.lower()
+            if sign is None:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += sign
+        placement.append(row + (str(empty) if empty else ""))
+
+    castling = int(packed.castling[index])
+    castlingChars = "".join(
+        char
+        for flag, char in ((W_OO, "K"), (W_OOO, "Q"), (B_OO, "k"), (B_OOO, "q"))
+        if castling & flag
+    )
+    fen = "%s %s %s - 0 %d" % (
+        "/".join(placement),
+        "wb"[packed.color[index]],
+        castlingChars or "-",
+        packed.plyCount[index] // 2 + 1,
+    )
+    board = LBoard(NORMALCHESS)
+    board.applyFen(fen)
+    board.hasCastled = [bool(castled) for castled in packed.hasCastled[index]]
+    return board
+
+
+################################################################################
+# Evaluation                                                                   #
+################################################################################
+
+
+def evaluateBatch(packed, color=None):
+    """The evaluateComplete scores of packed positions, for color, which may
+    be a color or an array of one per position, or the side to move if None"""
+    scores = np.empty(len(packed), dtype=np.int64)
+    for start in range(0, len(packed), CHUNK_SIZE):
+        chunk = packed[start : start + CHUNK_SIZE]
+        scores[start : start + CHUNK_SIZE] = _Evaluation(chunk).whiteScore()
+    return _forColor(packed, scores, color)
+
+
+def evalMaterialBatch(packed, color=None):
+    """The evalMaterial scores and game phases of packed positions, for
+    color as in evaluateBatch"""
+    evaluation = _Evaluation(packed)
+    return _forColor(packed, evaluation.material, color), evaluation.phase
+
+
+def _forColor(packed, whiteScores, color):
+    # Each term of the evaluation is the negation of itself for the other side
+    if color is None:
+        color = packed.color
+    return np.where(np.asarray(color) == WHITE, whiteScores, -whiteScores)
+
+
+class _Evaluation:
+    """The terms of evaluateNormal of packed positions. The per color terms
+    are arrays of one value per position."""
+
+    def __init__(self, packed):
+        self.packed = packed
+        boards = packed.boards
+        self.n = n = len(packed)
+        self.rows = np.arange(n)
+        self.pawns = boards[:, :, PAWN]
+        self.friends = np.bitwise_or.reduce(boards[:, :, PAWN:], axis=2)
+        self.blocker = self.friends[:, WHITE] | self.friends[:, BLACK]
+        self.pieceCount = _popcount(boards)
+        self.kings = _squares(boards[:, :, KING]).argmax(axis=2)
+
+        material = (self.pieceCount * PIECE_VALUES).sum(axis=2)
+        self.phase = np.maximum(1, 8 - material.sum(axis=1) // PHASE_MATERIAL)
+        self.material = self._materialBalance(material)
+
+    def whiteScore(self):
+        s = self.material
+        for term in (self._kingSafety, self._pieces, self._dev):
+            s = s + term(WHITE) - term(BLACK)
+        pawnScore, passed, weaked = self._pawnInfo()
+        s = s + pawnScore
+        s = s + self._pawnStructure(WHITE, passed) - self._pawnStructure(BLACK, passed)
+        return s + self._trappedBishops()
+
+    def _materialBalance(self, material):
+        """materialBalance for white"""
+        white, black = material[:, WHITE], material[:, BLACK]
+        leading = np.where(white > black, WHITE, BLACK)
+        pawns = self.pieceCount[self.rows, leading, PAWN]
+        matDiff = np.abs(white - black)
+        matTotal = white + black
+        val = np.minimum(MATERIAL_DIFF_LIMIT, matDiff) + (
+            matDiff * (TRADE_DOWN_TOTAL - matTotal) * pawns
+        ) // (TRADE_DOWN_DIVISOR * (pawns + 1))
+        return np.where(leading == WHITE, val, -val)
+
+    def _kingSafety(self, color):
+        king = self.kings[:, color]
+        pawns = self.pawns[:, color]
+        wall1 = WALLS[color][(FILES[king] >= 3).astype(int)]
+        if color == WHITE:
+            wall2 = wall1 >> np.uint64(8)
+        else:
+            wall2 = wall1 << np.uint64(8)
+        total_in_front = _popcount(wall1 | wall2 & pawns)
+        s = _popcount(wall1 & pawns) * 2 + _popcount(wall2 & pawns)
+        castled = (s * NUMBERMOD[total_in_front] * 5) // 6
+
+        # As in evalKingSafety, a castled king is one on the first rank of
+        # the board, not the first rank of its color
+        isCastled = (FILES[king] != 3) & (FILES[king] != 4) & (RANKS[king] == 0)
+        return np.where(
+            self.phase >= 6, ENDING_KING[king], np.where(isCastled, castled, 0)
+        )
+
+    def _pieces(self, color):
+        return (
+            self._bishops(color)
+            + self._rooks(color)
+            + self._doubleQR7(color)
+            + self._kingTropism(color)
+        )
+
+    def _bishops(self, color):
+        opcolor = 1 - color
+        bishops = self.packed.boards[:, color, BISHOP]
+        squareMask = SQUARE_COLORS[_any(bishops & WHITE_SQUARES).astype(int)]
+        score = -_popcount(self.pawns[:, color] & squareMask) - (
+            _popcount(self.pawns[:, opcolor] & squareMask) // 2
+        )
+        score += np.where(
+            self.phase > 6, _popcount(self.friends[:, opcolor] & squareMask), 0
+        )
+        return np.where(self.pieceCount[:, color, BISHOP] == 1, score, 0)
+
+    def _rooks(self, color):
+        rooks = _squares(self.packed.boards[:, color, ROOK])
+        openFile = ~_any(self.pawns[:, color, None] & CORD_FILE_BITS)
+        opkingFile = FILES[self.kings[:, 1 - color]]
+        bonus = ROOK_OPEN_FILE + ROOK_OPEN_FILE_EXTRA
+        bonus = bonus + ROOK_F_FILE * ((FILES == 5) & (opkingFile[:, None] >= 4))
+        score = ((rooks & openFile) * bonus).sum(axis=1)
+        return np.where(self.phase < 7, score, 0)
+
+    def _doubleQR7(self, color):
+        # evalDoubleQR7 looks at the pieces of the side not to move
+        boards = self.packed.boards
+        opcolor = 1 - self.packed.color
+        majors = boards[:, color, QUEEN] | boards[:, color, ROOK]
+        opking = boards[self.rows, opcolor, KING]
+        oppawns = boards[self.rows, opcolor, PAWN]
+        double = (_popcount(majors & brank7[color]) >= 2) & (
+            _any(opking & brank8[color]) | _any(oppawns & brank7[color])
+        )
+        return np.where(double, DOUBLE_QR7, 0)
+
+    def _kingTropism(self, color):
+        opking = self.kings[:, 1 - color]
+        score = np.zeros(self.n, dtype=np.int64)
+        for piece in range(KNIGHT, KING):
+            pieces = _squares(self.packed.boards[:, color, piece])
+            score += (pieces * TROPISMS[piece][:, opking].T).sum(axis=1)
+        return score
+
+    def _dev(self, color):
+        packed = self.packed
+        queens = packed.boards[:, color, QUEEN]
+        score = np.full(self.n, -WING_PAWNS_DESTROYED, dtype=np.int64)
+        score -= np.where(
+            packed.castling & CAS_FLAGS[color][0], 0, NO_KING_SIDE_CASTLING
+        )
+        score -= np.where(
+            packed.castling & CAS_FLAGS[color][1], 0, NO_QUEEN_SIDE_CASTLING
+        )
+        queenHome = _any(queens & bitPosArray[QUEEN_HOME[color]]) & ~_any(
+            queens & BEFORE_QUEEN_HOME[color]
+        )
+        score -= np.where(queenHome, 0, QUEEN_MOVED)
+        # evalDev compares the wing pawns with 2, which as bitboards of
+        # pawns on the second and third ranks they never are. So it gives
+        # the penalty for a destroyed structure whatever the pawns.
+        developing = (packed.plyCount < DEVELOPMENT_PLIES) & ~packed.hasCastled[
+            :, color
+        ]
+        return np.where(developing, score, 0)
+
+    def _pawnInfo(self):
+        """cacheablePawnInfo"""
+        phase = self.phase[:, None]
+        allPawns = self.pawns[:, WHITE] | self.pawns[:, BLACK]
+        score = np.zeros(self.n, dtype=np.int64)
+        passed = np.zeros(self.n, dtype=np.uint64)
+        weaked = np.zeros(self.n, dtype=np.uint64)
+
+        for color in WHITE, BLACK:
+            tables = PAWN_TABLES[color]
+            pawns = self.pawns[:, color]
+            oppawns = self.pawns[:, 1 - color]
+            pawnSquares = _squares(pawns)
+            colorScore = (pawnSquares * PAWN_SCORES[color] * 2).sum(axis=1)
+
+            # Passed pawns
+            isPassed = (
+                pawnSquares
+                & ~_any(oppawns[:, None] & tables["passed"])
+                & ~_any(pawns[:, None] & tables["ray"])
+            )
+            passed |= np.bitwise_or.reduce(np.where(isPassed, BITPOS, 0), axis=1)
+            colorScore += (isPassed * CORD_PASSED_SCORES[color] * phase // 12).sum(
+                axis=1
+            )
+
+            # Backward pawns
+            def outnumbered(n):
+                suffix = "" if n == 1 else str(n)
+                front = tables["front" + suffix]
+                ownAttack = tables["ownAttack" + suffix]
+                opAttack = tables["opAttack" + suffix]
+                return ~_any(pawns[:, None] & front) & (
+                    _popcount(pawns[:, None] & ownAttack)
+                    < _popcount(oppawns[:, None] & opAttack)
+                )
+
+            frontSquares = np.clip(CORDS + tables["step"], 0, 63)
+            unblocked = ~_any(allPawns[:, None] & BITPOS[frontSquares])
+            onSecondRank = _any(BITPOS & brank7[1 - color])
+            backward = (
+                outnumbered(1) & unblocked
+                | onSecondRank & (outnumbered(2) | outnumbered(3))
+            ) & pawnSquares
+            weaked |= np.bitwise_or.reduce(np.where(backward, BITPOS, 0), axis=1)
+            colorScore -= backward.sum(axis=1) * (BACKWARD_PAWN + self.phase)
+
+            # Pawn base under attack
+            attack = tables["attack"]
+            underAttack = _any(oppawns[:, None] & attack) & _any(
+                pawns[:, None] & attack
+            )
+            colorScore -= (pawnSquares & underAttack).sum(axis=1) * PAWN_BASE_ATTACKED
+
+            # Doubled and isolated pawns, by file
+            nfile = pawnSquares.reshape(self.n, 8, 8).sum(axis=1)
+            colorScore -= (nfile > 1).sum(axis=1) * (DOUBLED_PAWN + self.phase)
+            isolated = (nfile > 0) & ~_any(pawns[:, None] & ISOLANI_MASK)
+            halfOpen = ~_any(oppawns[:, None] & FILE_BITS)
+            isolani = np.where(halfOpen, ISOLANI_WEAKER, ISOLANI_NORMAL)
+            colorScore += (isolated * isolani * nfile).sum(axis=1)
+            weaked |= np.bitwise_or.reduce(
+                np.where(isolated, pawns[:, None] & FILE_BITS, 0), axis=1
+            )
+
+            colorScore -= np.where(self.pieceCount[:, color, PAWN] == 8, EIGHT_PAWNS, 0)
+            colorScore += np.where(
+                (pawns & stonewall[color]) == stonewall[color], STONEWALL_BONUS, 0
+            )
+            locked = (pawns >> np.uint64(8)) & oppawns & lbox
+            colorScore -= _popcount(locked) * LOCKED_PAWN
+
+            score += colorScore if color == WHITE else -colorScore
+
+        return score, passed, weaked
+
+    def _pawnStructure(self, color, passed):
+        """evalPawnStructure"""
+        boards = self.packed.boards
+        opcolor = 1 - color
+        pawns = self.pawns[:, color]
+        king = self.kings[:, color]
+        opking = self.kings[:, opcolor]
+        score = np.zeros(self.n, dtype=np.int64)
+
+        passed = passed & pawns
+        passedSquares = _squares(passed)
+        passedScores = CORD_PASSED_SCORES[color]
+
+        # Connected passed pawns on 6th or 7th rank
+        t = passed & brank67[color]
+        opMajorCount = self.pieceCount[:, opcolor, KNIGHT:KING].sum(axis=1)
+        n1 = FILES[opking]
+        n2 = RANKS[opking]
+        kingAway = (n2 < 4) if color == WHITE else (n2 > 3)
+        for f in range(7):
+            connected = (
+                _any(t & fileBits[f])
+                & _any(t & fileBits[f + 1])
+                & ((n1 < f - 1) | (n1 > f + 1) | kingAway)
+            )
+            score += np.where(connected & (opMajorCount == 1), CONNECTED_PASSERS, 0)
+
+        # Enemy has no pieces & King is outcolor of passed pawn square
+        square = PAWN_TABLES[color]["square"]
+        outOfSquare = np.where(
+            (self.packed.color == color)[:, None],
+            ~_any(boards[:, opcolor, KING, None] & square),
+            ~_any(KING_MOVES[opking][:, None] & square),
+        )
+        unstoppable = passedSquares & outOfSquare & (opMajorCount == 0)[:, None]
+        score += (unstoppable * passedScores).sum(axis=1)
+
+        # Estimate if any majors are able to hunt us down
+        hunted = np.zeros(passedSquares.shape, dtype=bool)
+        for piece, hunters in HUNTERS[color].items():
+            hunted |= _any(boards[:, opcolor, piece, None] & hunters)
+        score += ((passedSquares & ~hunted) * (passedScores // 5)).sum(axis=1)
+
+        # Penalize Pawn on d2,e2/d7,e7 is blocked
+        if color == WHITE:
+            blocked = (pawns & d2e2[WHITE]) >> np.uint64(8)
+        else:
+            blocked = (pawns & d2e2[BLACK]) << np.uint64(8)
+        score -= np.where(_any(blocked & self.blocker), BLOCKED_CENTER_PAWN, 0)
+
+        # If both colors are castled on different colors, bonus for pawn storms
+        stormPawns = _squares((ISOLANI_MASK[n1] | FILE_BITS[n1]) & pawns)
+        storm = (stormPawns * (PAWN_STORM * (5 - KING_DISTANCE[:, opking].T))).sum(
+            axis=1
+        )
+        storming = (np.abs(FILES[king] - n1) >= 4) & (self.phase < 6)
+        score += np.where(storming, storm, 0)
+
+        return score
+
+    def _trappedBishops(self):
+        """evalTrappedBishops for white. The static exchange evaluation is
+        left to the scalar code, for the few positions needing it."""
+        boards = self.packed.boards
+        traps = (
+            (BLACK, A2, WHITE, B3),
+            (BLACK, H2, WHITE, G3),
+            (WHITE, A7, BLACK, B6),
+            (WHITE, H7, BLACK, G6),
+        )
+        trapped = np.zeros(self.n, dtype=bool)
+        for color, cord, opcolor, pawnCord in traps:
+            trapped |= _any(boards[:, color, BISHOP] & bitPosArray[cord]) & _any(
+                boards[:, opcolor, PAWN] & bitPosArray[pawnCord]
+            )
+
+        score = np.zeros(self.n, dtype=np.int64)
+        for index in np.flatnonzero(trapped):
+            board = unpackBoard(self.packed, index)
+            for color, cord, opcolor, pawnCord in traps:
+                if (
+                    board.boards[color][BISHOP] & bitPosArray[cord]
+                    and board.boards[opcolor][PAWN] & bitPosArray[pawnCord]
+                ):
+                    see = staticExchangeEvaluate(board, newMove(cord, pawnCord))
+                    if see < 0:
+                        score[index] += see if color == WHITE else -see
+        return score
@@ -1,10 +1,22 @@
+"""Times searches of a static list of positions, to catch changes in the speed
+and the node counts of the search.
+
+The results can be written as JSON, and compared with those of an earlier run.
+Run as a script it fails when they regressed beyond thresholds:
+
+    python -m pychess.Utils.lutils.Benchmark -d 6 -o new.json -b baseline.json"""
+
+import argparse
+import json
+import sys
+from time import time
+
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.leval import clearPawnTable
 from pychess.Utils.lutils.lmove import listToSan
-from pychess.Utils.lutils import lsearch
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
+from pychess.Utils.lutils import leval, lsearch
 from pychess.Utils.const import NORMALCHESS
-import sys
-from time import time
 
 # For now, we use the benchmark positions from Stockfish.
 benchmarkPositions = [
@@ -27,43 +39,221 @@ benchmarkPositions = [
 ]
 
 
-def benchmark(maxdepth=6):
-    """Times a search of a static list of positions."""
+# Default thresholds of compare: the share the nodes per second may drop by,
+# and the share the node count of a position may grow by
+NPS_THRESHOLD = 0.1
+NODES_THRESHOLD = 0.05
+
+# The default size of the transposition table of the searches in MB, whatever
+# size the engine's own table has, so that results stay comparable
+HASH_SIZE = 32
+
+
+def runBenchmark(
+    maxdepth=6, positions=benchmarkPositions, verbose=False, hashSize=HASH_SIZE
+):
+    """Searches each of positions to depth maxdepth - 1, and returns the
+    results as a dict, which can be written as JSON.
 
+    The searches use a context of their own, with a table of hashSize MB, so
+    the state of the engine is left alone except for the pawn structure
+    table. With verbose the result of each iteration is printed."""
+
+    ctx = lsearch.SearchContext(TranspositionTable(hashSize * 1024 * 1024))
+    ctx.endtime = sys.maxsize
+    ctx.searching = True
+
+    results = []
     suite_time = time()
-    suite_nodes = lsearch.nodes
-    lsearch.endtime = sys.maxsize
-    lsearch.searching = True
-    for i, fen in enumerate(benchmarkPositions):
-        lsearch.table.clear()
+    for i, fen in enumerate(positions):
+        ctx.table.clear()
         clearPawnTable()
+        lsearch.newSearch(ctx)
+        ctx.evalCache.resetStatistics()
+        ctx.nodes = 0
+        ctx.qnodes = 0
         board = LBoard(NORMALCHESS)
         board.applyFen(fen)
         pos_start_time = time()
-        pos_start_nodes = lsearch.nodes
         for depth in range(1, maxdepth):
-            mvs, scr = lsearch.alphaBeta(board, depth)
+            mvs, scr = lsearch.alphaBeta(board, depth, context=ctx)
             pos_time = time() - pos_start_time
-            pos_nodes = lsearch.nodes - pos_start_nodes
-            pv = " ".join(listToSan(board, mvs))
-            time_cs = int(100 * pos_time)
-            print(depth, scr, time_cs, pos_nodes, pv)
-        print(
-            "Searched position",
-            i,
-            "at",
-            int(pos_nodes / pos_time) if pos_time > 0 else pos_nodes,
-            "n/s",
+            pv = listToSan(board, mvs)
+            if verbose:
+                print(depth, scr, int(100 * pos_time), ctx.nodes, " ".join(pv))
+        probes = ctx.table.hits + ctx.table.misses
+        results.append(
+            {
+                "fen": fen,
+                "depth": maxdepth - 1,
+                "nodes": ctx.nodes,
+                "qnodes": ctx.qnodes,
+                "time": pos_time,
+                "nps": ctx.nodes / pos_time if pos_time > 0 else ctx.nodes,
+                "hashHits": ctx.table.hits,
+                "hashMisses": ctx.table.misses,
+                "hashOverwrites": ctx.table.overwrites,
+                "hashHitRate": ctx.table.hits / probes if probes else 0,
+                "pawnProbes": leval.pawnProbes,
+                "pawnHits": leval.pawnHits,
+                "pawnCollisions": leval.pawnCollisions,
+                "evalHits": ctx.evalCache.hits,
+                "evalMisses": ctx.evalCache.misses,
+                "bestmove": pv[0] if pv else None,
+                "score": scr,
+                "pv": pv,
+            }
         )
+        if verbose:
+            print(
+                "Searched position",
+                i,
+                "at",
+                int(results[-1]["nps"]),
+                "n/s",
+            )
     suite_time = time() - suite_time
-    suite_nodes = lsearch.nodes - suite_nodes
+
+    nodes = sum(result["nodes"] for result in results)
+    return {
+        "depth": maxdepth - 1,
+        "hashSize": hashSize,
+        "positions": results,
+        "nodes": nodes,
+        "qnodes": sum(result["qnodes"] for result in results),
+        "time": suite_time,
+        "nps": nodes / suite_time if suite_time > 0 else nodes,
+    }
+
+
+def benchmark(maxdepth=6, output=None, hashSize=HASH_SIZE):
+    """Times a search of a static list of positions, and prints the results.
+    With output, the results are also written to that file as JSON."""
+
+    results = runBenchmark(maxdepth, verbose=True, hashSize=hashSize)
+    positions = results["positions"]
+
+    def total(key):
+        return sum(result[key] for result in positions)
+
+    print(
+        "Nodes:",
+        results["nodes"] - results["qnodes"],
+        "in main search",
+        results["qnodes"],
+        "in quiescent search",
+    )
+    print(
+        "Hash table:",
+        total("hashHits"),
+        "hits",
+        total("hashMisses"),
+        "misses",
+        total("hashOverwrites"),
+        "overwrites",
+    )
+    print(
+        "Pawn hash table:",
+        total("pawnProbes"),
+        "probes",
+        total("pawnHits"),
+        "hits",
+        total("pawnCollisions"),
+        "collisions",
+    )
+    print("Evaluation cache:", total("evalHits"), "hits", total("evalMisses"), "misses")
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
     print(
         "Total:",
-        suite_nodes,
+        results["nodes"],
         "nodes in",
-        suite_time,
+        results["time"],
         "s: ",
-        suite_nodes / suite_time,
+        results["nps"],
         "n/s",
     )
-    lsearch.nodes = 0
+    return results
+
+
+def compare(
+    results, baseline, npsThreshold=NPS_THRESHOLD, nodesThreshold=NODES_THRESHOLD
+):
+    """Returns descriptions of the regressions of results from baseline, both
+    as returned by runBenchmark: nodes per second of the suite dropping by
+    more than the share npsThreshold, or the node count of a position growing
+    by more than the share nodesThreshold. Only positions searched to the same
+    depth in both are compared."""
+
+    regressions = []
+    if results["nps"] < baseline["nps"] * (1 - npsThreshold):
+        regressions.append(
+            "Speed dropped from %d to %d n/s" % (baseline["nps"], results["nps"])
+        )
+
+    before = {
+        (result["fen"], result["depth"]): result for result in baseline["positions"]
+    }
+    for result in results["positions"]:
+        old = before.get((result["fen"], result["depth"]))
+        if old is None:
+            continue
+        if result["nodes"] > old["nodes"] * (1 + nodesThreshold):
+            regressions.append(
+                "Nodes grew from %d to %d in %s"
+                % (old["nodes"], result["nodes"], result["fen"])
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Times searches of the benchmark positions, and compares "
+        "them with a baseline"
+    )
+    parser.add_argument(
+        "-d",
+        "--depth",
+        type=int,
+        default=6,
+        help="the positions are searched to one ply less than this",
+    )
+    parser.add_argument(
+        "-H",
+        "--hash",
+        type=int,
+        default=HASH_SIZE,
+        help="the size of the transposition table in MB",
+    )
+    parser.add_argument("-o", "--output", help="a file to write the results to")
+    parser.add_argument(
+        "-b", "--baseline", help="the results of an earlier run to compare with"
+    )
+    parser.add_argument(
+        "--nps-threshold",
+        type=float,
+        default=NPS_THRESHOLD,
+        help="the share the nodes per second may drop by",
+    )
+    parser.add_argument(
+        "--nodes-threshold",
+        type=float,
+        default=NODES_THRESHOLD,
+        help="the share the node count of a position may grow by",
+    )
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.depth, args.output, args.hash)
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.nps_threshold, args.nodes_threshold)
+    for regression in regressions:
+        print(regression)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
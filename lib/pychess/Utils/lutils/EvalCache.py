@@ -0,0 +1,51 @@
+from array import array
+
+# An entry consists of:
+# key         board hash
+# generation  counter telling which search the entry belongs to
+# value       static evaluation from the side to move's point of view
+entrySize = array("Q").itemsize + array("B").itemsize + array("i").itemsize
+
+
+class EvalCache:
+    """A cache of static evaluations for the positions of a search. It has a
+    fixed number of entries, and new entries always replace old ones.
+    Entries are valid until newSearch() is called, so they are reused by all
+    iterations of an iterative deepening search."""
+
+    def __init__(self, maxSize):
+        """A cache of about maxSize bytes"""
+        assert maxSize > 0
+        self.size = max(1, maxSize // entrySize)
+        self.keys = array("Q", bytes(8 * self.size))
+        self.generations = array("B", bytes(self.size))
+        self.values = array("i", bytes(4 * self.size))
+        # Entries of generation 0 are empty
+        self.generation = 1
+        self.resetStatistics()
+
+    def resetStatistics(self):
+        self.hits = 0
+        self.misses = 0
+
+    def newSearch(self):
+        """Invalidate all entries"""
+        self.generation = self.generation % 255 + 1
+        if self.generation == 1:
+            # Entries of the last search with this generation may remain
+            self.generations = array("B", bytes(self.size))
+
+    def probe(self, hash):
+        """Returns the value recorded for hash in this search, or None"""
+        index = hash % self.size
+        if self.keys[index] == hash and self.generations[index] == self.generation:
+            self.hits += 1
+            return self.values[index]
+        self.misses += 1
+        return None
+
+    def record(self, hash, value):
+        index = hash % self.size
+        self.keys[index] = hash
+        self.generations[index] = self.generation
+        self.values[index] = value
@@ -70,7 +70,7 @@ from pychess.Utils.const import (
     QUEEN_PROMOTION,
 )
 from pychess.Utils.repr import reprColor
-from .ldata import FILE, fileBits
+from .ldata import FILE, fileBits, materialValues
 from .attack import isAttacked
 from .bitboard import clearBit, iterBits, setBit, bitPosArray
 from .PolyglotHash import (
@@ -107,6 +107,20 @@ class LBoard:
     fin_kings = ((C1, G1), (C8, G8))
     fin_rooks = ((D1, F1), (D8, F8))
 
+    # The attributes below are rarely set, so they default to these class
+    # attributes. CPython's attribute lookups get slower when instances have
+    # more than 30 attributes, which would slow down searching.
+
+    # the next and prev lboard objects in the variation list
+    next = None
+    prev = None
+
+    # The high level owner Board (with Piece objects) in gamemodel
+    pieceBoard = None
+
+    # Older history shared with clones of the board, see clone()
+    hist_parent = None
+
     holding = (
         {
             PAWN: 0,
@@ -132,19 +146,13 @@ class LBoard:
 
     def __init__(self, variant=NORMALCHESS):
         self.variant = variant
+        self.materialValues = materialValues(variant)
 
         self.nags = []
         # children can contain comments and variations
         # variations are lists of lboard objects
         self.children = []
 
-        # the next and prev lboard objects in the variation list
-        self.next = None
-        self.prev = None
-
-        # The high level owner Board (with Piece objects) in gamemodel
-        self.pieceBoard = None
-
         # This will True except in so called null_board
         # null_board act as parent of the variation
         # when we add a variation to last played board from hint panel
@@ -159,14 +167,43 @@ class LBoard:
             else None
         )
 
-    def repetitionCount(self, draw_threshold=3):
-        rc = 1
-        for ply in range(4, 1 + min(len(self.hist_hash), self.fifty), 2):
-            if self.hist_hash[-ply] == self.hash:
-                rc += 1
-                if rc >= draw_threshold:
-                    break
-        return rc
+    def repetitionCount(self):
+        """How many times the position occurred since the fifty move counter
+        was last reset, this time included"""
+        return self.repetitions[-1].get(self.hash, 1)
+
+    def _countPosition(self):
+        """Adds the position applyMove reached to the repetition counts.
+        self.repetitions holds a dict of the counts of the positions by hash
+        for each reset of the fifty move counter, so popMove can go back to
+        the counts from before it."""
+        if self.fifty == 0:
+            self.repetitions.append({self.hash: 1})
+        else:
+            counts = self.repetitions[-1]
+            counts[self.hash] = counts.get(self.hash, 0) + 1
+
+    def _uncountPosition(self):
+        """Removes the position popMove leaves from the repetition counts"""
+        repetitions = self.repetitions
+        if self.fifty == 0:
+            if len(repetitions) > 1:
+                repetitions.pop()
+            else:
+                # A clone only got the counts since the last reset, so count
+                # the positions from the reset before that
+                fifty = self.hist_state[-1][2]
+                counts = {}
+                for hash in self.hist_hash[max(0, len(self.hist_hash) - 1 - fifty) :]:
+                    counts[hash] = counts.get(hash, 0) + 1
+                self.repetitions = [counts]
+        else:
+            counts = repetitions[-1]
+            count = counts.get(self.hash, 0)
+            if count > 1:
+                counts[self.hash] = count - 1
+            else:
+                counts.pop(self.hash, None)
 
     def iniAtomic(self):
         self.hist_exploding_around = []
@@ -249,15 +286,15 @@ class LBoard:
         self.hist_move = []  # The move that was applied to get the position
         self.hist_tpiece = []
         # The piece the move captured, == EMPTY for normal moves
-        self.hist_enpassant = []
-        self.hist_castling = []
         self.hist_hash = []
-        self.hist_fifty = []
-        self.hist_checked = []
-        self.hist_opchecked = []
+        # The rest of the state applyMove overwrites, one tuple per move of
+        # (enpassant, castling, fifty, checked, opchecked)
+        self.hist_state = []
 
         # piece counts
         self.pieceCount = ([0] * 9, [0] * 9)
+        # Sum of self.materialValues of the pieces on the board
+        self.material = [0, 0]
 
         # initial cords of rooks and kings for castling in Chess960
         if self.variant == FISCHERRANDOMCHESS:
@@ -349,7 +386,6 @@ class LBoard:
             raise SyntaxError(_("En passant cord is not legal. \n\n%s") % fenstr)
 
         # Parse piece placement field
-        promoted = False
         # if there is a holding within [] we change it to BFEN style first
         if pieceChrs.endswith("]"):
             pieceChrs = pieceChrs[:-1].replace("[", "/").replace("-", "")
@@ -373,17 +409,15 @@ class LBoard:
                 if char.isdigit():
                     cord += int(char)
                 elif char == "~":
-                    promoted = True
+                    # "~" after a piece letter denotes promoted piece
+                    if self.variant in DROP_VARIANTS:
+                        self.promoted[cord - 1] = 1
                 else:
                     color = char.islower() and BLACK or WHITE
                     piece = chrU2Sign[char.upper()]
                     self._addPiece(cord, piece, color)
                     self.pieceCount[color][piece] += 1
 
-                    if self.variant in DROP_VARIANTS and promoted:
-                        self.promoted[cord] = 1
-                        promoted = False
-
                     if self.variant == CAMBODIANCHESS:
                         if piece == KING and self.kings[color] != self.ini_kings[color]:
                             self.is_first_move[KING][color] = False
@@ -535,6 +569,7 @@ class LBoard:
         else:
             self.plyCount = 1
 
+        self.repetitions = [{self.hash: 1}]
         self.fen_was_applied = True
 
     def isChecked(self):
@@ -561,6 +596,9 @@ class LBoard:
         elif self.variant == ATOMICCHESS:
             if not self.boards[1 - self.color][KING]:
                 return False
+            # Exploding the other king wins, even out of check
+            if not self.boards[self.color][KING]:
+                return False
             if (
                 -2 < (self.kings[0] >> 3) - (self.kings[1] >> 3) < 2
                 and -2 < (self.kings[0] & 7) - (self.kings[1] & 7) < 2
@@ -596,6 +634,7 @@ class LBoard:
         elif piece == KING:
             self.kings[color] = cord
         self.hash ^= pieceHashes[color][piece][cord]
+        self.material[color] += self.materialValues[piece]
         self.arBoard[cord] = piece
 
     def _removePiece(self, cord, piece, color):
@@ -608,6 +647,7 @@ class LBoard:
             self.pawnhash ^= pieceHashes[color][PAWN][cord]
 
         self.hash ^= pieceHashes[color][piece][cord]
+        self.material[color] -= self.materialValues[piece]
         self.arBoard[cord] = EMPTY
 
     def setColor(self, color):
@@ -689,12 +729,10 @@ class LBoard:
         )
 
         self.hist_move.append(move)
-        self.hist_enpassant.append(self.enpassant)
-        self.hist_castling.append(self.castling)
         self.hist_hash.append(self.hash)
-        self.hist_fifty.append(self.fifty)
-        self.hist_checked.append(self.checked)
-        self.hist_opchecked.append(self.opchecked)
+        self.hist_state.append(
+            (self.enpassant, self.castling, self.fifty, self.checked, self.opchecked)
+        )
         if self.variant in DROP_VARIANTS and self.variant != SCHESS:
             self.hist_capture_promoting.append(self.capture_promoting)
         if self.variant == CAMBODIANCHESS:
@@ -709,8 +747,11 @@ class LBoard:
 
         # null move
         if fcord == tcord and flag != DROP and flag != QUEEN_PROMOTION:
+            self.hist_tpiece.append(EMPTY)
+            self.setEnpassant(None)
             self.setColor(opcolor)
             self.plyCount += 1
+            self._countPosition()
             return move
 
         if self.variant == CAMBODIANCHESS:
@@ -898,6 +939,7 @@ class LBoard:
 
         self.setColor(opcolor)
         self.plyCount += 1
+        self._countPosition()
 
     def popMove(self):
         # Note that we remove the last made move, which was not made by boards
@@ -905,6 +947,9 @@ class LBoard:
         color = 1 - self.color
         opcolor = self.color
 
+        if self.hist_parent is not None and len(self.hist_move) <= 1:
+            self._unshareHistory()
+        self._uncountPosition()
         move = self.hist_move.pop()
         cpiece = self.hist_tpiece.pop()
 
@@ -915,7 +960,9 @@ class LBoard:
         tpiece = self.arBoard[tcord]
 
         if fcord == tcord and flag != DROP and flag != QUEEN_PROMOTION:
-            self.setColor(color)
+            if self.variant in DROP_VARIANTS and self.variant != SCHESS:
+                self.capture_promoting = self.hist_capture_promoting.pop()
+            self._popHistory(color)
             return
 
         if flag in GATINGS:
@@ -1031,19 +1078,32 @@ class LBoard:
                     self.promoted[tcord] = 0
             self.capture_promoting = self.hist_capture_promoting.pop()
 
+        self._popHistory(color)
+
+    def _popHistory(self, color):
+        """Restore the state saved by applyMove, which is not derived from the
+        piece placement"""
+        # The history entries may be shared with clones, so don't make them
+        # our own lists which get changed in place
         if self.variant == CAMBODIANCHESS:
-            self.is_first_move = self.hist_is_first_move.pop()
+            is_first_move = self.hist_is_first_move.pop()
+            self.is_first_move = {
+                KING: is_first_move[KING][:],
+                QUEEN: is_first_move[QUEEN][:],
+            }
         elif self.variant == SCHESS:
-            self.virgin = self.hist_virgin.pop()
+            self.virgin = self.hist_virgin.pop()[:]
 
         self.setColor(color)
 
-        self.checked = self.hist_checked.pop()
-        self.opchecked = self.hist_opchecked.pop()
-        self.enpassant = self.hist_enpassant.pop()
-        self.castling = self.hist_castling.pop()
+        (
+            self.enpassant,
+            self.castling,
+            self.fifty,
+            self.checked,
+            self.opchecked,
+        ) = self.hist_state.pop()
         self.hash = self.hist_hash.pop()
-        self.fifty = self.hist_fifty.pop()
         self.plyCount -= 1
 
     def __eq__(self, other):
@@ -1171,7 +1231,7 @@ class LBoard:
                         sign = sign.lower()
                     fenstr.append(sign)
                     if self.variant in (BUGHOUSECHESS, CRAZYHOUSECHESS):
-                        if self.promoted[r * 8 + i]:
+                        if self.promoted[(7 - r) * 8 + i]:
                             fenstr.append("~")
                 else:
                     empty += 1
@@ -1257,7 +1317,42 @@ class LBoard:
 
         return "".join(fenstr)
 
-    def clone(self):
+    def _historyNames(self):
+        """The names of the history lists which get an entry for every move"""
+        names = ("hist_move", "hist_tpiece", "hist_hash", "hist_state")
+        if self.variant == CAMBODIANCHESS:
+            names += ("hist_is_first_move",)
+        elif self.variant == SCHESS:
+            names += ("hist_virgin",)
+        elif self.variant in DROP_VARIANTS:
+            names += ("hist_capture_promoting",)
+        return names
+
+    def _unshareHistory(self):
+        """Give the board history lists of its own, containing the whole
+        history, so they can be popped and changed freely"""
+        names = self._historyNames()
+        segments = []
+        node = self.hist_parent
+        while node is not None:
+            lists, end, node = node
+            segments.append((lists, end))
+        history = [[] for name in names]
+        for lists, end in reversed(segments):
+            for full, part in zip(history, lists):
+                full.extend(part[:end])
+        for name, full in zip(names, history):
+            full.extend(getattr(self, name))
+            setattr(self, name, full)
+        self.hist_parent = None
+
+    def clone(self, shareHistory=False):
+        """Returns a copy of the board.
+
+        If shareHistory is True, only the part of the move history needed for
+        detecting repetitions is copied. The rest is shared with this board,
+        and only copied if the clone pops moves that far back. This makes
+        cloning cheap in long games, no matter how many moves were played."""
         copy = LBoard(self.variant)
         copy.blocker = self.blocker
 
@@ -1266,6 +1361,7 @@ class LBoard:
         copy.boards = (self.boards[WHITE][:], self.boards[BLACK][:])
         copy.arBoard = self.arBoard[:]
         copy.pieceCount = (self.pieceCount[WHITE][:], self.pieceCount[BLACK][:])
+        copy.material = self.material[:]
 
         copy.color = self.color
         copy.plyCount = self.plyCount
@@ -1276,17 +1372,33 @@ class LBoard:
         copy.hash = self.hash
         copy.pawnhash = self.pawnhash
         copy.fifty = self.fifty
+        copy.repetitions = [self.repetitions[-1].copy()]
         copy.checked = self.checked
         copy.opchecked = self.opchecked
 
-        copy.hist_move = self.hist_move[:]
-        copy.hist_tpiece = self.hist_tpiece[:]
-        copy.hist_enpassant = self.hist_enpassant[:]
-        copy.hist_castling = self.hist_castling[:]
-        copy.hist_hash = self.hist_hash[:]
-        copy.hist_fifty = self.hist_fifty[:]
-        copy.hist_checked = self.hist_checked[:]
-        copy.hist_opchecked = self.hist_opchecked[:]
+        if shareHistory:
+            names = self._historyNames()
+            lists = tuple(getattr(self, name) for name in names)
+            end = len(self.hist_move)
+            start = max(0, end - max(self.fifty, 1))
+            if start > 0 or self.hist_parent is not None:
+                # The lists become a read only part of the history of both
+                # boards, which continue with copies of the tail
+                node = (lists, start, self.hist_parent)
+                for name, hist in zip(names, lists):
+                    setattr(self, name, hist[start:])
+                self.hist_parent = node
+                copy.hist_parent = node
+            for name, hist in zip(names, lists):
+                setattr(copy, name, hist[start:])
+        else:
+            copy.hist_move = self.hist_move[:]
+            copy.hist_tpiece = self.hist_tpiece[:]
+            copy.hist_hash = self.hist_hash[:]
+            copy.hist_state = self.hist_state[:]
+            # The lists of a board sharing its history only hold the tail of
+            # it. The rest is read only, so the copy can share it too.
+            copy.hist_parent = self.hist_parent
 
         if self.variant == FISCHERRANDOMCHESS:
             copy.ini_kings = self.ini_kings[:]
@@ -1299,10 +1411,12 @@ class LBoard:
             copy.promoted = self.promoted[:]
             copy.holding = (self.holding[0].copy(), self.holding[1].copy())
             copy.capture_promoting = self.capture_promoting
-            copy.hist_capture_promoting = self.hist_capture_promoting[:]
+            if not shareHistory:
+                copy.hist_capture_promoting = self.hist_capture_promoting[:]
             if self.variant == SCHESS:
                 copy.virgin = self.virgin[:]
-                copy.hist_virgin = self.hist_virgin[:]
+                if not shareHistory:
+                    copy.hist_virgin = self.hist_virgin[:]
         elif self.variant == ATOMICCHESS:
             copy.hist_exploding_around = [a[:] for a in self.hist_exploding_around]
         elif self.variant == THREECHECKCHESS:
@@ -1314,7 +1428,8 @@ class LBoard:
                 KING: self.is_first_move[KING][:],
                 QUEEN: self.is_first_move[QUEEN][:],
             }
-            copy.hist_is_first_move = self.hist_is_first_move[:]
+            if not shareHistory:
+                copy.hist_is_first_move = self.hist_is_first_move[:]
 
         copy.fen_was_applied = self.fen_was_applied
         return copy
@@ -0,0 +1,189 @@
+"""Lazy SMP: helper processes searching the same root position as the main
+search, communicating only through a transposition table in shared memory.
+
+Every helper runs its own iterative deepening with a depth offset, so the
+processes disagree slightly about move ordering and fill the shared table
+with entries the main search can pick up. The helpers' own results are
+thrown away. Table entries are written without locking, like in most lazy
+SMP engines."""
+
+import multiprocessing
+import os
+from threading import Lock, Thread
+from time import sleep, time
+
+from pychess.Utils.lutils import leval, lsearch
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
+
+# Seconds between the checks of a helper's watcher thread
+WATCH_INTERVAL = 0.01
+
+# The options of the main search, which the helpers search with too, so that
+# they don't fill the shared table with entries the main search wouldn't make
+SEARCH_OPTIONS = (
+    "skipPruneChance",
+    "nullMove",
+    "lateMoveReductions",
+    "futilityPruning",
+    "razoring",
+    "deltaPruning",
+    "seePruning",
+    "qsearchChecks",
+)
+
+
+def _helperMain(helperId, data, commands, stopped, generation, nodeCounts):
+    if isinstance(data, str):
+        # The path of a table file
+        lsearch.table = TranspositionTable(os.path.getsize(data), path=data)
+    else:
+        lsearch.table = TranspositionTable(len(data), data=data)
+
+    # The generation of the running search, or 0 while waiting for one
+    running = 0
+    lock = Lock()
+
+    def watch():
+        # Ends the running search once it is stopped, or superseded by a
+        # newer one. A stop of an earlier search leaves it alone.
+        while True:
+            sleep(WATCH_INTERVAL)
+            with lock:
+                if running and (
+                    stopped.value >= running or generation.value != running
+                ):
+                    lsearch.searching = False
+
+    watcher = Thread(target=watch, name="LazySMP watcher %d" % helperId)
+    watcher.daemon = True
+    watcher.start()
+
+    while True:
+        command = commands.get()
+        if command is None:
+            return
+        board, maxdepth, endtime, searchId, tableSearchId, options, pawnHashSize = (
+            command
+        )
+        if searchId != generation.value or stopped.value >= searchId:
+            # Superseded by a newer start(), or stopped, before we got to it
+            continue
+
+        for name, value in options.items():
+            setattr(lsearch, name, value)
+        if pawnHashSize != leval.pawnHashSize:
+            leval.setPawnHashSize(pawnHashSize * leval.pawnEntryType.size)
+
+        # The age of the table entries of the main search, which newSearch()
+        # counting on its own would drift away from
+        lsearch.table.search_id = tableSearchId
+        lsearch.evalCache.newSearch()
+        lsearch.endtime = endtime
+        lsearch.nodes = 0
+        lsearch.timecheck_counter = lsearch.TIMECHECK_FREQ
+        with lock:
+            running = searchId
+            lsearch.searching = True
+
+        # Odd helpers search one ply deeper than the main search does at
+        # the same time, even ones start together with it.
+        for depth in range(1 + helperId % 2, maxdepth + 1):
+            lsearch.alphaBeta(board, depth)
+            nodeCounts[helperId] = lsearch.nodes
+            if not lsearch.searching or time() > lsearch.endtime:
+                break
+        with lock:
+            running = 0
+
+
+class LazySMP:
+    def __init__(self):
+        self.helpers = []
+        self.commands = []
+        self.stopped = None
+        self.generation = None
+        self.nodeCounts = None
+
+    def setCores(self, cores):
+        """Use cores-1 helper processes besides the main search. Must not be
+        called while searching. Switches lsearch.table to shared memory if
+        helpers are wanted, unless it's stored in a file the helpers can
+        open themselves."""
+        self.shutdown()
+        count = max(0, cores - 1)
+        if not count:
+            return
+
+        table = lsearch.table
+        if not table.shared and table.path is None:
+            size = table.buckets * table.bucketSize
+            table = lsearch.table = TranspositionTable(size, shared=True)
+
+        context = multiprocessing.get_context()
+        # The generation of the latest stopped search
+        self.stopped = context.RawValue("i", 0)
+        self.generation = context.RawValue("i", 0)
+        self.nodeCounts = context.RawArray("q", count)
+        for helperId in range(count):
+            commands = context.SimpleQueue()
+            helper = context.Process(
+                target=_helperMain,
+                name="LazySMP helper %d" % helperId,
+                args=(
+                    helperId,
+                    table.data if table.path is None else table.path,
+                    commands,
+                    self.stopped,
+                    self.generation,
+                    self.nodeCounts,
+                ),
+            )
+            helper.daemon = True
+            helper.start()
+            self.helpers.append(helper)
+            self.commands.append(commands)
+
+    def shutdown(self):
+        self.stop()
+        for commands in self.commands:
+            commands.put(None)
+        for helper in self.helpers:
+            helper.join(1)
+            if helper.is_alive():
+                helper.terminate()
+        self.helpers = []
+        self.commands = []
+        self.stopped = None
+        self.generation = None
+        self.nodeCounts = None
+
+    def start(self, board, maxdepth, endtime):
+        """Let the helpers search board until stop() or endtime, with the
+        options lsearch has now and a pawn table of the size leval has now"""
+        if not self.helpers:
+            return
+        self.generation.value += 1
+        for i in range(len(self.nodeCounts)):
+            self.nodeCounts[i] = 0
+        command = (
+            board,
+            maxdepth,
+            endtime,
+            self.generation.value,
+            lsearch.table.search_id,
+            {name: getattr(lsearch, name) for name in SEARCH_OPTIONS},
+            leval.pawnHashSize,
+        )
+        for commands in self.commands:
+            commands.put(command)
+
+    def stop(self):
+        if self.helpers:
+            self.stopped.value = self.generation.value
+
+    @property
+    def nodes(self):
+        """Nodes searched by the helpers since start()"""
+        if not self.helpers:
+            return 0
+        return sum(self.nodeCounts)
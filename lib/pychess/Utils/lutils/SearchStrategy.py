@@ -0,0 +1,217 @@
+"""The rules and knowledge lsearch needs about the variant it searches.
+
+A strategy tells the search when a game has ended by the rules of the variant,
+which moves to search in which order, how to evaluate a position and whether
+the pruning of lsearch is sound. The search looks up the strategy of the board
+once when it starts, so standard chess doesn't test the variant at every node,
+and each variant can be sped up without touching the others."""
+
+from pychess.Utils.const import (
+    ATOMICCHESS,
+    CRAZYHOUSECHESS,
+    GIVEAWAYCHESS,
+    KINGOFTHEHILLCHESS,
+    LOSERSCHESS,
+    RACINGKINGSCHESS,
+    SUICIDECHESS,
+    THREECHECKCHESS,
+    ASEAN_VARIANTS,
+    DROP_VARIANTS,
+    KING,
+)
+from pychess.Variants.atomic import kingExplode
+from pychess.Variants.kingofthehill import testKingInCenter
+from pychess.Variants.suicide import pieceCount
+from pychess.Variants.threecheck import checkCount
+from .leval import (
+    evaluateNormal,
+    evaluateCrazyhouse,
+    evaluateAtomic,
+    evaluateAsean,
+    evaluateLosers,
+    evaluateRacingKings,
+    evaluateThreeCheck,
+)
+from .lmovegen import genAllMoves, genCaptures, genCheckEvasions
+from .lsort import (
+    getCaptureValue,
+    getAseanCaptureValue,
+    getMoveValue,
+    getAtomicMoveValue,
+    getAseanMoveValue,
+    genStagedMoves,
+)
+
+
+class SearchStrategy:
+    """Standard chess, and the variants searched like it"""
+
+    # Whether null move, late move reductions, futility pruning, razoring,
+    # delta and SEE pruning are sound
+    pruning = True
+    # Whether captures are resolved by a quiescent search at the horizon, or
+    # the evaluation is taken as it is
+    quiescence = True
+    # A function telling if the side to move of a board has won (1) or lost
+    # (-1) by the rules of the variant, or 0 if not. None when only mates and
+    # draws end the game.
+    terminal = None
+
+    evaluate = staticmethod(evaluateNormal)
+    getCaptureValue = staticmethod(getCaptureValue)
+    getMoveValue = staticmethod(getMoveValue)
+
+    def sortMoves(self, board, table, depth, moves):
+        """(-value, move) pairs of moves, best first"""
+        getMoveValue = self.getMoveValue
+        moves = [(-getMoveValue(board, table, depth, move), move) for move in moves]
+        moves.sort()
+        return moves
+
+    def genMoves(self, board, table, depth, isCheck):
+        """(-value, move) pairs of the moves to search, best first. Moves
+        leaving the king in check are left to the search to skip."""
+        if isCheck:
+            return self.sortMoves(board, table, depth, genCheckEvasions(board))
+        # Already sorted, and only generated as far as the search gets
+        return genStagedMoves(board, table, depth)
+
+
+class DropStrategy(SearchStrategy):
+    """Variants with drops, which genStagedMoves doesn't generate"""
+
+    def genMoves(self, board, table, depth, isCheck):
+        if isCheck:
+            return self.sortMoves(board, table, depth, genCheckEvasions(board))
+        return self.sortMoves(board, table, depth, genAllMoves(board))
+
+
+class CrazyhouseStrategy(DropStrategy):
+    evaluate = staticmethod(evaluateCrazyhouse)
+
+
+class AseanStrategy(DropStrategy):
+    """The Asean variants, whose pieces genStagedMoves doesn't know"""
+
+    evaluate = staticmethod(evaluateAsean)
+    getCaptureValue = staticmethod(getAseanCaptureValue)
+    getMoveValue = staticmethod(getAseanMoveValue)
+
+
+class AtomicStrategy(SearchStrategy):
+    pruning = False
+    quiescence = False
+    evaluate = staticmethod(evaluateAtomic)
+    getMoveValue = staticmethod(getAtomicMoveValue)
+
+    @staticmethod
+    def terminal(board):
+        # Our king exploded
+        return -1 if not board.boards[board.color][KING] else 0
+
+    def genMoves(self, board, table, depth, isCheck):
+        color = board.color
+        moves = genCheckEvasions(board) if isCheck else genAllMoves(board)
+        moves = [move for move in moves if not kingExplode(board, move, color)]
+        return self.sortMoves(board, table, depth, moves)
+
+
+class LosersStrategy(SearchStrategy):
+    """Losers: captures are compulsory, and losing all pieces but the king
+    wins"""
+
+    pruning = False
+    quiescence = False
+    evaluate = staticmethod(evaluateLosers)
+
+    @staticmethod
+    def terminal(board):
+        return 1 if pieceCount(board, board.color) == 1 else 0
+
+    def genMoves(self, board, table, depth, isCheck):
+        captures = list(genCaptures(board))
+        if isCheck:
+            evasions = list(genCheckEvasions(board))
+            moves = [move for move in evasions if move in captures] or evasions
+        else:
+            moves = []
+            for move in captures:
+                board.applyMove(move)
+                if not board.opIsChecked():
+                    moves.append(move)
+                board.popMove()
+            if not moves:
+                moves = genAllMoves(board)
+        return self.sortMoves(board, table, depth, moves)
+
+
+class SuicideStrategy(SearchStrategy):
+    """Suicide and giveaway: captures are compulsory, and losing all pieces
+    wins"""
+
+    pruning = False
+    quiescence = False
+    evaluate = staticmethod(evaluateLosers)
+
+    @staticmethod
+    def terminal(board):
+        return 1 if pieceCount(board, board.color) == 0 else 0
+
+    def genMoves(self, board, table, depth, isCheck):
+        moves = list(genCaptures(board))
+        if not moves and not isCheck:
+            moves = genAllMoves(board)
+        return self.sortMoves(board, table, depth, moves)
+
+
+class KingOfTheHillStrategy(SearchStrategy):
+    pruning = False
+
+    @staticmethod
+    def terminal(board):
+        # The king of the opponent reached the centre
+        return -1 if testKingInCenter(board) else 0
+
+
+class ThreeCheckStrategy(SearchStrategy):
+    pruning = False
+    evaluate = staticmethod(evaluateThreeCheck)
+
+    @staticmethod
+    def terminal(board):
+        return -1 if checkCount(board, board.color) == 3 else 0
+
+
+class RacingKingsStrategy(SearchStrategy):
+    """Racing kings, where giving check is not allowed"""
+
+    pruning = False
+    quiescence = False
+    evaluate = staticmethod(evaluateRacingKings)
+
+    def genMoves(self, board, table, depth, isCheck):
+        moves = [move for move in genAllMoves(board) if not board.willGiveCheck(move)]
+        return self.sortMoves(board, table, depth, moves)
+
+
+standardStrategy = SearchStrategy()
+
+# The strategy of each variant, which standardStrategy is used for if missing
+strategies = {
+    ATOMICCHESS: AtomicStrategy(),
+    LOSERSCHESS: LosersStrategy(),
+    SUICIDECHESS: SuicideStrategy(),
+    GIVEAWAYCHESS: SuicideStrategy(),
+    KINGOFTHEHILLCHESS: KingOfTheHillStrategy(),
+    THREECHECKCHESS: ThreeCheckStrategy(),
+    RACINGKINGSCHESS: RacingKingsStrategy(),
+}
+for variant in DROP_VARIANTS:
+    strategies[variant] = DropStrategy()
+strategies[CRAZYHOUSECHESS] = CrazyhouseStrategy()
+for variant in ASEAN_VARIANTS:
+    strategies[variant] = AseanStrategy()
+
+
+def getStrategy(variant):
+    return strategies.get(variant, standardStrategy)
@@ -0,0 +1,123 @@
+"""Decides how long the engine searches a move in a timed game.
+
+A search gets a soft and a hard time limit. The hard limit is the deadline
+lsearch aborts at. The soft limit is the time we'd like to use: no new
+iteration of the iterative deepening is started after it, and none is started
+when the cost predicted from the branching factor of the earlier iterations
+would take it past the hard limit, as an aborted iteration is wasted. When the
+score drops or the best move changes between iterations the position is
+harder than expected, and the soft limit is extended."""
+
+from time import time
+
+from pychess.Utils.lutils.lsearch import TIMECHECK_FREQ
+
+# Seconds reserved for communication lag on every move
+MOVE_OVERHEAD = 0.05
+# The hard limit is at most this many times the planned time, and never more
+# than this share of the clock
+HARD_LIMIT_FACTOR = 4
+MAX_CLOCK_SHARE = 0.5
+
+# A score this much below the one of the previous iteration is a fail low
+FAIL_LOW_MARGIN = 30
+# Extensions of the soft limit, which fade by EXTENSION_DECAY in every stable
+# iteration
+FAIL_LOW_EXTENSION = 2.0
+PV_CHANGE_EXTENSION = 1.5
+MAX_EXTENSION = 3.0
+EXTENSION_DECAY = 0.8
+
+# Used until two iterations have been measured
+DEFAULT_BRANCHING_FACTOR = 3.0
+MIN_BRANCHING_FACTOR = 1.5
+MAX_BRANCHING_FACTOR = 10.0
+
+# Seconds between two looks at the clock in lsearch
+TIMECHECK_INTERVAL = 0.005
+MIN_TIMECHECK_FREQ = 10
+MAX_TIMECHECK_FREQ = 10000
+
+
+class TimeManager:
+    def __init__(self):
+        # Nodes per second, measured in the searches so far
+        self.nps = TIMECHECK_FREQ / TIMECHECK_INTERVAL
+        self.start(0, 0)
+
+    def start(self, usetime, clock, nodes=0):
+        """Starts timing a search planned to take usetime seconds, with clock
+        seconds left on our clock. A search continuing from pondering has
+        already searched nodes nodes."""
+        self.starttime = time()
+        self.startNodes = nodes
+        available = max(clock - MOVE_OVERHEAD, 0)
+        self.softLimit = min(usetime, available)
+        self.hardLimit = max(
+            self.softLimit,
+            min(usetime * HARD_LIMIT_FACTOR, available * MAX_CLOCK_SHARE),
+        )
+        self.extension = 1.0
+        # The time and nodes spent in each finished iteration
+        self.iterationTimes = []
+        self.iterationNodes = []
+        self.bestMove = None
+        self.score = None
+
+    @property
+    def hardDeadline(self):
+        return self.starttime + self.hardLimit
+
+    def elapsed(self):
+        return time() - self.starttime
+
+    def failLow(self):
+        """Tells that the score of the current iteration dropped"""
+        self.extension = max(self.extension, FAIL_LOW_EXTENSION)
+
+    def iterationDone(self, nodes, bestMove, score):
+        """Tells that an iteration finished, with nodes counting the nodes of
+        all iterations so far"""
+        elapsed = self.elapsed()
+        nodes -= self.startNodes
+        self.iterationTimes.append(elapsed - sum(self.iterationTimes))
+        self.iterationNodes.append(nodes - sum(self.iterationNodes))
+        if elapsed > 0 and nodes >= MIN_TIMECHECK_FREQ:
+            self.nps = nodes / elapsed
+
+        if self.score is not None:
+            self.extension = max(1.0, self.extension * EXTENSION_DECAY)
+            if score < self.score - FAIL_LOW_MARGIN:
+                self.failLow()
+            if bestMove != self.bestMove:
+                self.extension = min(
+                    self.extension * PV_CHANGE_EXTENSION, MAX_EXTENSION
+                )
+        self.bestMove = bestMove
+        self.score = score
+
+    def branchingFactor(self):
+        """The growth of the node count from one iteration to the next,
+        averaged over the last two iterations"""
+        nodes = self.iterationNodes[-3:]
+        if len(nodes) < 2 or not all(nodes):
+            return DEFAULT_BRANCHING_FACTOR
+        factor = (nodes[-1] / nodes[0]) ** (1 / (len(nodes) - 1))
+        return min(max(factor, MIN_BRANCHING_FACTOR), MAX_BRANCHING_FACTOR)
+
+    def predictedTime(self):
+        """The time the next iteration is expected to take"""
+        if not self.iterationTimes:
+            return 0
+        return self.iterationTimes[-1] * self.branchingFactor()
+
+    def nextIteration(self):
+        """Whether another iteration should be started"""
+        elapsed = self.elapsed()
+        softLimit = min(self.softLimit * self.extension, self.hardLimit)
+        return elapsed < softLimit and elapsed + self.predictedTime() <= self.hardLimit
+
+    def timecheckFreq(self):
+        """How many nodes lsearch should search between looks at the clock"""
+        freq = int(self.nps * TIMECHECK_INTERVAL)
+        return min(max(freq, MIN_TIMECHECK_FREQ), MAX_TIMECHECK_FREQ)
@@ -1,4 +1,7 @@
-from ctypes import create_string_buffer, memset
+import mmap
+import os
+from ctypes import c_char, create_string_buffer, memset
+from multiprocessing.sharedctypes import RawArray
 from struct import Struct
 
 from pychess.Utils.const import hashfALPHA, hashfBETA, hashfEXACT, hashfBAD
@@ -12,14 +15,44 @@ from pychess.Utils.lutils.ldata import MATE_VALUE, MAXPLY
 # score       search score
 # move        best move (or cutoff move)
 entryType = Struct("=I B B H h H")
+# All 4 entries of a bucket, so that they can be read in one go
+bucketType = Struct("=" + "I B B H h H " * 4)
+
+# The first entries of a bucket are only replaced by entries searched at
+# least as deep, or when they are left over from earlier searches. The last
+# one is always replaced, so that new positions always get an entry.
+DEPTH_PREFERRED = 3
+ALWAYS_REPLACE = 3
 
 
 class TranspositionTable:
-    def __init__(self, maxSize):
+    bucketSize = bucketType.size
+
+    def __init__(self, maxSize, shared=False, data=None, path=None):
+        """A table of about maxSize bytes. With shared=True the entries live
+        in shared memory, which other processes can attach to by passing the
+        data attribute of this table as data to their own table.
+
+        With a path, the entries live in that file, memory mapped. If the
+        file already has the size of the table it's used as it is, so a table
+        saved by an earlier process can be loaded again. Other processes can
+        share the table by opening the same file."""
         assert maxSize > 0
-        self.buckets = maxSize // (4 * entryType.size)
-        self.data = create_string_buffer(self.buckets * 4 * entryType.size)
+        self.buckets = maxSize // self.bucketSize
+        self.path = path
+        self.mmap = None
+        if data is not None:
+            self.data = data
+            shared = True
+        elif path is not None:
+            self.data = self._mapFile(path)
+        elif shared:
+            self.data = RawArray(c_char, self.buckets * self.bucketSize)
+        else:
+            self.data = create_string_buffer(self.buckets * self.bucketSize)
+        self.shared = shared
         self.search_id = 0
+        self.resetStatistics()
 
         self.killer1 = [-1] * 80
         self.killer2 = [-1] * 80
@@ -27,8 +60,35 @@ class TranspositionTable:
 
         self.butterfly = [0] * (64 * 64)
 
+    def _mapFile(self, path):
+        size = self.buckets * self.bucketSize
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                # Entries of a table of another size are of no use to us
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+            self.mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        return (c_char * size).from_buffer(self.mmap)
+
+    def save(self):
+        """Writes the entries of a table with a path to its file"""
+        if self.mmap is not None:
+            self.mmap.flush()
+
+    def resetStatistics(self):
+        """Reset the counters for tuning the table size: probes finding
+        their position, probes not finding it, and records replacing the
+        entry of another position"""
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+
     def clear(self):
-        memset(self.data, 0, self.buckets * 4 * entryType.size)
+        memset(self.data, 0, self.buckets * self.bucketSize)
+        self.resetStatistics()
         self.killer1 = [-1] * 80
         self.killer2 = [-1] * 80
         self.hashmove = [-1] * 80
@@ -38,48 +98,66 @@ class TranspositionTable:
         self.search_id = (self.search_id + 1) & 0xFF
         # TODO: consider clearing butterfly table
 
+    def hashfull(self):
+        """The permill of entries used by the current search, estimated from
+        the first thousand entries"""
+        buckets = min(self.buckets, 250)
+        used = 0
+        for index in range(buckets):
+            bucket = bucketType.unpack_from(self.data, index * self.bucketSize)
+            for i in range(0, len(bucket), 6):
+                if bucket[i] and bucket[i + 1] == self.search_id:
+                    used += 1
+        return used * 1000 // (buckets * 4)
+
     def probe(self, board, depth, alpha, beta):
-        baseIndex = (board.hash % self.buckets) * 4
-        key = (board.hash // self.buckets) & 0xFFFFFFFF
-        for i in range(baseIndex, baseIndex + 4):
-            tkey, search_id, hashf, tdepth, score, move = entryType.unpack_from(
-                self.data, i * entryType.size
-            )
-            if tkey == key:
-                # Mate score bounds are guaranteed to be accurate at any depth.
-                if tdepth < depth and abs(score) < MATE_VALUE - MAXPLY:
-                    return move, score, hashfBAD
-                if hashf == hashfEXACT:
-                    return move, score, hashf
-                if hashf == hashfALPHA and score <= alpha:
-                    return move, alpha, hashf
-                if hashf == hashfBETA and score >= beta:
-                    return move, beta, hashf
+        key, index = divmod(board.hash, self.buckets)
+        key &= 0xFFFFFFFF
+        bucket = bucketType.unpack_from(self.data, index * self.bucketSize)
+        keys = bucket[::6]
+        if key not in keys:
+            self.misses += 1
+            return None
+        self.hits += 1
+        i = keys.index(key) * 6
+        search_id, hashf, tdepth, score, move = bucket[i + 1 : i + 6]
+        # Mate score bounds are guaranteed to be accurate at any depth.
+        if tdepth < depth and abs(score) < MATE_VALUE - MAXPLY:
+            return move, score, hashfBAD
+        if hashf == hashfEXACT:
+            return move, score, hashf
+        if hashf == hashfALPHA and score <= alpha:
+            return move, alpha, hashf
+        if hashf == hashfBETA and score >= beta:
+            return move, beta, hashf
 
     def record(self, board, move, score, hashf, depth):
-        baseIndex = (board.hash % self.buckets) * 4
-        key = (board.hash // self.buckets) & 0xFFFFFFFF
-        # We always overwrite *something*: an empty slot, this position's last entry, or else the least relevant.
-        staleIndex = baseIndex
-        staleRelevance = 0xFFFF
-        for i in range(baseIndex, baseIndex + 4):
-            tkey, search_id, thashf, tdepth, tscore, tmove = entryType.unpack_from(
-                self.data, i * entryType.size
-            )
-            if tkey == 0 or tkey == key:
-                staleIndex = i
+        key, index = divmod(board.hash, self.buckets)
+        key &= 0xFFFFFFFF
+        offset = index * self.bucketSize
+        bucket = bucketType.unpack_from(self.data, offset)
+
+        # Find the least valuable of the depth-preferred entries, which is
+        # this position's own entry if it has one. Empty entries and those
+        # from earlier searches go first, then the shallowest.
+        slot = 0
+        slotValue = 0x1FFFF
+        for i in range(DEPTH_PREFERRED):
+            tkey, search_id, thashf, tdepth, tscore, tmove = bucket[i * 6 : i * 6 + 6]
+            value = tdepth if tkey and search_id == self.search_id else -1
+            if tkey == key:
+                slot, slotValue = i, value
                 break
-            relevance = (
-                (0x8000 if search_id != self.search_id and thashf == hashfEXACT else 0)
-                + (0x4000 if ((self.search_id - search_id) & 0xFF) > 1 else 0)
-                + tdepth
-            )
-            if relevance < staleRelevance:
-                staleIndex = i
-                staleRelevance = relevance
+            if value < slotValue:
+                slot, slotValue = i, value
+        if slotValue > depth:
+            slot = ALWAYS_REPLACE
+        if bucket[slot * 6] not in (0, key):
+            self.overwrites += 1
+
         entryType.pack_into(
             self.data,
-            staleIndex * entryType.size,
+            offset + slot * entryType.size,
             key,
             self.search_id,
             hashf,
@@ -1,5 +1,23 @@
+import os
+from array import array
+
 from .bitboard import bitPosArray, notBitPosArray, lastBit, firstBit, clearBit, lsb
-from .ldata import moveArray, rays, directions, fromToRay, PIECE_VALUES, PAWN_VALUE
+from .ldata import (
+    moveArray,
+    rays,
+    directions,
+    fromToRay,
+    PIECE_VALUES,
+    PAWN_VALUE,
+    ray00,
+    ray45,
+    ray90,
+    ray135,
+    attack00,
+    attack45,
+    attack90,
+    attack135,
+)
 from pychess.Utils.const import (
     ASEAN_VARIANTS,
     ASEAN_BBISHOP,
@@ -21,6 +39,99 @@ from pychess.Utils.const import (
     ELEPHANT,
 )
 
+################################################################################
+# Sliding attacks                                                              #
+################################################################################
+
+# ldata keeps the attacks of sliding pieces in dicts, keyed by the occupancy of
+# the line through the cord. With PYCHESS_SLIDING_ATTACKS=arrays in the
+# environment the same attacks are read from flat arrays instead, indexed by
+# the line occupancy compressed into a byte: a rank is just shifted down, the
+# bits of a diagonal land in the top byte when multiplied by 0x0101010101010101,
+# and a file does the same when shifted to the edge and multiplied by the main
+# diagonal.
+# Measured with perft on CPython the dicts are faster, as an array lookup
+# allocates a new int for every 64 bit attack board, so they stay the default.
+SLIDING_ATTACKS = os.environ.get("PYCHESS_SLIDING_ATTACKS", "dicts")
+
+FILES_TO_TOP = 0x0101010101010101
+RANKS_TO_TOP = 0x8040201008040201
+
+
+def _rankIndex(cord, occupancy):
+    return cord << 8 | (occupancy >> (56 - (cord & 56))) & 255
+
+
+def _fileIndex(cord, occupancy):
+    return (
+        cord << 8
+        | ((occupancy >> (7 - (cord & 7))) & FILES_TO_TOP) * RANKS_TO_TOP >> 56 & 255
+    )
+
+
+def _diagonalIndex(cord, occupancy):
+    return cord << 8 | occupancy * FILES_TO_TOP >> 56 & 255
+
+
+def _attackArray(attacks, index):
+    table = array("Q", bytes(8 * 64 * 256))
+    for cord in range(64):
+        for occupancy, attackBoard in attacks[cord].items():
+            table[index(cord, occupancy)] = attackBoard
+    return table
+
+
+if SLIDING_ATTACKS == "arrays":
+    rankAttacks = _attackArray(attack00, _rankIndex)
+    fileAttacks = _attackArray(attack90, _fileIndex)
+    diagonal45Attacks = _attackArray(attack45, _diagonalIndex)
+    diagonal135Attacks = _attackArray(attack135, _diagonalIndex)
+
+    def rookAttacks(cord, blocker):
+        """The cords a rook on cord attacks, blocker must include cord"""
+        return (
+            rankAttacks[cord << 8 | (blocker >> (56 - (cord & 56))) & 255]
+            | fileAttacks[
+                cord << 8
+                | ((blocker >> (7 - (cord & 7))) & FILES_TO_TOP) * RANKS_TO_TOP >> 56
+                & 255
+            ]
+        )
+
+    def bishopAttacks(cord, blocker):
+        """The cords a bishop on cord attacks, blocker must include cord"""
+        return (
+            diagonal45Attacks[
+                cord << 8 | (ray45[cord] & blocker) * FILES_TO_TOP >> 56 & 255
+            ]
+            | diagonal135Attacks[
+                cord << 8 | (ray135[cord] & blocker) * FILES_TO_TOP >> 56 & 255
+            ]
+        )
+
+else:
+
+    def rookAttacks(cord, blocker):
+        """The cords a rook on cord attacks, blocker must include cord"""
+        try:
+            return (
+                attack00[cord][ray00[cord] & blocker]
+                | attack90[cord][ray90[cord] & blocker]
+            )
+        except KeyError:
+            return 0
+
+    def bishopAttacks(cord, blocker):
+        """The cords a bishop on cord attacks, blocker must include cord"""
+        try:
+            return (
+                attack45[cord][ray45[cord] & blocker]
+                | attack135[cord][ray135[cord] & blocker]
+            )
+        except KeyError:
+            return 0
+
+
 #
 # Caveat: Many functions in this module has very similar code. If you fix a
 # bug, or write a performance enhancement, please update all functions. Apologies
@@ -279,6 +390,37 @@ def pinnedOnKing(board, cord, color):
     return False
 
 
+def pinnedPieces(board, color):
+    """A bitboard of the pieces of color pinned against their king, found for
+    all pieces at once, unlike with pinnedOnKing.
+    Does not support the Asean variants."""
+
+    kingCord = board.kings[color]
+    opboards = board.boards[1 - color]
+    blocker = board.blocker
+    friends = board.friends[color]
+    rayto = fromToRay[kingCord]
+
+    pinners = (opboards[BISHOP] | opboards[QUEEN] | opboards[HAWK]) & moveArray[BISHOP][
+        kingCord
+    ]
+    pinners |= (opboards[ROOK] | opboards[QUEEN] | opboards[ELEPHANT]) & moveArray[
+        ROOK
+    ][kingCord]
+
+    pinned = 0
+    # inlined iterBits()
+    while pinners:
+        bit = pinners & -pinners
+        # The pieces between the king and the pinner
+        between = rayto[lsb[bit]] & blocker & ~bit
+        # A single one of ours is pinned
+        if between & friends and not between & (between - 1):
+            pinned |= between
+        pinners -= bit
+    return pinned
+
+
 def staticExchangeEvaluate(board, moveOrTcord, color=None):
     """The GnuChess Static Exchange Evaluator (or SEE for short).
     First determine the target square.  Create a bitboard of all squares
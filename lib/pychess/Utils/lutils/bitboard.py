@@ -1,5 +1,7 @@
 from array import array
 
+from .tablecache import loadTables, saveTables
+
 
 # setBit returns a bitboard with the ith bit set
 def setBit(bitboard, i):
@@ -32,14 +34,21 @@ def firstBit(bitboard):
 # The bitCount array returns the leading non-zero bit in the 16 bit
 # input argument.
 
-lzArray = array("B", [0] * 65536)
-
-s = n = 1
-for i in range(16):
-    for j in range(s, s + n):
-        lzArray[j] = 16 - 1 - i
-    s += n
-    n += n
+_tables = loadTables(__name__, (__file__,))
+if _tables is None:
+    lzArray = array("B", [0] * 65536)
+
+    s = n = 1
+    for i in range(16):
+        for j in range(s, s + n):
+            lzArray[j] = 16 - 1 - i
+        s += n
+        n += n
+
+    saveTables(__name__, (__file__,), {"lzArray": lzArray.tobytes()})
+else:
+    lzArray = array("B")
+    lzArray.frombytes(_tables["lzArray"])
 
 
 # lastBit returns the bit closest to 63 (H8) that is set in the board
@@ -41,9 +41,40 @@ from pychess.Utils.const import (
     B3,
     B6,
     sliders,
+    ASEAN_VARIANTS,
+    ATOMICCHESS,
+    CRAZYHOUSECHESS,
+    LOSERSCHESS,
+    SUICIDECHESS,
+    GIVEAWAYCHESS,
 )
 
+from pychess.Utils import const
+from . import bitboard
 from .bitboard import bitPosArray, iterBits, setBit
+from .tablecache import loadTables, saveTables
+
+# The tables below that take long to build are cached on disk. A cache hit
+# fills them in here, and the code building them is skipped.
+CACHED_TABLES = (
+    "taxicab",
+    "sdistance",
+    "distance",
+    "moveArray",
+    "frontWall",
+    "directions",
+    "rays",
+    "fromToRay",
+    "attack00",
+    "attack45",
+    "attack90",
+    "attack135",
+)
+# The tables are built with the bitboard helpers and the constants of const too
+SOURCES = (__file__, bitboard.__file__, const.__file__)
+_tables = loadTables(__name__, SOURCES)
+if _tables is not None:
+    globals().update(_tables)
 
 
 def RANK(cord):
@@ -80,6 +111,23 @@ ASEAN_PIECE_VALUES = (0, 100, 450, 300, 630, 180, 2000)
 CRAZY_PIECE_VALUES = (0, 100, 200, 240, 240, 380, 2000)
 ATOMIC_PIECE_VALUES = (0, 100, 90, 0, 220, 850, 2000)
 
+
+def materialValues(variant):
+    """The value of each piece on the board, as summed up by evalMaterial and
+    kept up to date in LBoard.material. Pieces not counted are worth 0."""
+    if variant == CRAZYHOUSECHESS:
+        return CRAZY_PIECE_VALUES[:KING] + (0, 0, 0)
+    if variant == LOSERSCHESS:
+        return (0, 1, 1, 1, 1, 1, 0, 0, 0)
+    if variant == SUICIDECHESS or variant == GIVEAWAYCHESS:
+        return (0, 1, 1, 1, 1, 1, 1, 0, 0)
+    if variant == ATOMICCHESS:
+        return ATOMIC_PIECE_VALUES + (0, 0)
+    if variant in ASEAN_VARIANTS:
+        return ASEAN_PIECE_VALUES + (0, 0)
+    return tuple(PIECE_VALUES[:KING]) + (0, 0, 0)
+
+
 # Maximum possible search depth. The hash structure only allows 8-bit depths.
 MAXPLY = 10
 # Maximum possible score. Mate in n ply is +/- (MATE_VALUE-n).
@@ -114,24 +162,25 @@ isolani_weaker = (-22, -24, -26, -28, -28, -26, -24, -22)
 
 # Distance boards for different pieces
 
-taxicab = [[0] * 64 for i in range(64)]
-sdistance = [[0] * 64 for i in range(64)]
-for fcord in range(64):
-    for tcord in range(fcord + 1, 64):
-        fx = FILE(fcord)
-        fy = RANK(fcord)
-        tx = FILE(tcord)
-        ty = RANK(tcord)
-        taxicab[fcord][tcord] = taxicab[fcord][tcord] = abs(fx - tx) + abs(fy - ty)
-        sdistance[fcord][tcord] = sdistance[fcord][tcord] = min(
-            abs(fx - tx), abs(fy - ty)
-        )
-
-distance = [[[0] * 64 for i in range(64)] for j in range(KING + 1)]
-
-distance[EMPTY] = None
-distance[KING] = sdistance
-distance[PAWN] = sdistance
+if _tables is None:
+    taxicab = [[0] * 64 for i in range(64)]
+    sdistance = [[0] * 64 for i in range(64)]
+    for fcord in range(64):
+        for tcord in range(fcord + 1, 64):
+            fx = FILE(fcord)
+            fy = RANK(fcord)
+            tx = FILE(tcord)
+            ty = RANK(tcord)
+            taxicab[fcord][tcord] = taxicab[fcord][tcord] = abs(fx - tx) + abs(fy - ty)
+            sdistance[fcord][tcord] = sdistance[fcord][tcord] = min(
+                abs(fx - tx), abs(fy - ty)
+            )
+
+    distance = [[[0] * 64 for i in range(64)] for j in range(KING + 1)]
+
+    distance[EMPTY] = None
+    distance[KING] = sdistance
+    distance[PAWN] = sdistance
 
 # Special table for knightdistances
 
@@ -365,46 +414,51 @@ knightDistance = [
 
 # Calculate
 
-for fcord in range(64):
-    frank = RANK(fcord)
-    ffile = FILE(fcord)
-
-    for tcord in range(fcord + 1, 64):
-        # Notice, that we skip fcord == tcord, as all fields are zero from
-        # scratch in anyway
-
-        trank = RANK(tcord)
-        tfile = FILE(tcord)
-
-        # Knight
-        field = (7 - frank + trank) * 15 + 7 - ffile + tfile
-        distance[KNIGHT][tcord][fcord] = distance[KNIGHT][fcord][tcord] = (
-            knightDistance[field]
-        )
-
-        # Rook
-        if frank == trank or ffile == tfile:
-            distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 1
-        else:
-            distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 2
-
-        # Bishop
-        if abs(frank - trank) == abs(ffile - tfile):
-            distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 1
-        else:
-            distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 2
-
-        # Queen
-        if frank == trank or ffile == tfile or abs(frank - trank) == abs(ffile - tfile):
-            distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 1
-        else:
-            distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 2
-
-# Special cases for knights in corners
-distance[KNIGHT][A1][B2] = distance[KNIGHT][B2][A1] = 4
-distance[KNIGHT][H1][G2] = distance[KNIGHT][G2][H1] = 4
-distance[KNIGHT][A8][B7] = distance[KNIGHT][B7][A8] = 4
-distance[KNIGHT][H8][G7] = distance[KNIGHT][G7][H8] = 4
+if _tables is None:
+    for fcord in range(64):
+        frank = RANK(fcord)
+        ffile = FILE(fcord)
+
+        for tcord in range(fcord + 1, 64):
+            # Notice, that we skip fcord == tcord, as all fields are zero from
+            # scratch in anyway
+
+            trank = RANK(tcord)
+            tfile = FILE(tcord)
+
+            # Knight
+            field = (7 - frank + trank) * 15 + 7 - ffile + tfile
+            distance[KNIGHT][tcord][fcord] = distance[KNIGHT][fcord][tcord] = (
+                knightDistance[field]
+            )
+
+            # Rook
+            if frank == trank or ffile == tfile:
+                distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 1
+            else:
+                distance[ROOK][tcord][fcord] = distance[ROOK][fcord][tcord] = 2
+
+            # Bishop
+            if abs(frank - trank) == abs(ffile - tfile):
+                distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 1
+            else:
+                distance[BISHOP][tcord][fcord] = distance[BISHOP][fcord][tcord] = 2
+
+            # Queen
+            if (
+                frank == trank
+                or ffile == tfile
+                or abs(frank - trank) == abs(ffile - tfile)
+            ):
+                distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 1
+            else:
+                distance[QUEEN][tcord][fcord] = distance[QUEEN][fcord][tcord] = 2
+
+    # Special cases for knights in corners
+    distance[KNIGHT][A1][B2] = distance[KNIGHT][B2][A1] = 4
+    distance[KNIGHT][H1][G2] = distance[KNIGHT][G2][H1] = 4
+    distance[KNIGHT][A8][B7] = distance[KNIGHT][B7][A8] = 4
+    distance[KNIGHT][H8][G7] = distance[KNIGHT][G7][H8] = 4
 
 ###############################################################################
 # Boards used for evaluating
@@ -1139,35 +1193,36 @@ map = [
     -1,
 ]
 
-moveArray = [[0] * 64 for i in range(len(dir))]  # moveArray[len(dir)][64]
-
-for piece in range(1, len(dir)):
-    for fcord in range(120):
-        f = map[fcord]
-        if f == -1:
-            # We only generate moves for squares inside the board
-            continue
-        # Create a new bitboard
-        b = 0
-        for d in dir[piece]:
-            tcord = fcord
-            while True:
-                tcord += d
-                t = map[tcord]
-                if t == -1:
-                    # If we landed outside of board, there is no more to look
-                    # for
-                    break
-                b = setBit(b, t)
-                if not sliders[piece]:
-                    # If we are a slider, we should not break, but add the dir
-                    # value once again
-                    break
-        moveArray[piece][f] = b
+if _tables is None:
+    moveArray = [[0] * 64 for i in range(len(dir))]  # moveArray[len(dir)][64]
 
-frontWall = (moveArray[-2], moveArray[-1])
-del moveArray[-1]
-del moveArray[-1]
+    for piece in range(1, len(dir)):
+        for fcord in range(120):
+            f = map[fcord]
+            if f == -1:
+                # We only generate moves for squares inside the board
+                continue
+            # Create a new bitboard
+            b = 0
+            for d in dir[piece]:
+                tcord = fcord
+                while True:
+                    tcord += d
+                    t = map[tcord]
+                    if t == -1:
+                        # If we landed outside of board, there is no more to look
+                        # for
+                        break
+                    b = setBit(b, t)
+                    if not sliders[piece]:
+                        # If we are a slider, we should not break, but add the dir
+                        # value once again
+                        break
+            moveArray[piece][f] = b
+
+    frontWall = (moveArray[-2], moveArray[-1])
+    del moveArray[-1]
+    del moveArray[-1]
 del dir[-1]
 del dir[-1]
 del sliders[-1]
@@ -1180,50 +1235,52 @@ del sliders[-1]
 # Also initialize the directions[][] array.  directions[f][t] returns
 # the index into rays[f] array allow us to find the ray in that direction.
 
-directions = [[-1] * 64 for i in range(64)]  # directions[64][64]
-rays = [[0] * 8 for i in range(64)]  # rays[64][8]
+if _tables is None:
+    directions = [[-1] * 64 for i in range(64)]  # directions[64][64]
+    rays = [[0] * 8 for i in range(64)]  # rays[64][8]
 
-for fcord in range(120):
-    f = map[fcord]
-    if f == -1:
-        continue
-    ray = -1
-    for piece in BISHOP, ROOK:
-        for d in dir[piece]:
-            ray += 1
-            b = 0
-            tcord = fcord
-            while True:
-                tcord += d
-                t = map[tcord]
-                if t == -1:
-                    break
-                rays[f][ray] = setBit(rays[f][ray], t)
-                directions[f][t] = ray
+    for fcord in range(120):
+        f = map[fcord]
+        if f == -1:
+            continue
+        ray = -1
+        for piece in BISHOP, ROOK:
+            for d in dir[piece]:
+                ray += 1
+                b = 0
+                tcord = fcord
+                while True:
+                    tcord += d
+                    t = map[tcord]
+                    if t == -1:
+                        break
+                    rays[f][ray] = setBit(rays[f][ray], t)
+                    directions[f][t] = ray
 
 # The FromToRay[b2][f6] gives the diagonal ray from c3 to f6;
 # It also produces horizontal/vertical rays as well. If no
 # ray is possible, then a 0 is returned.
 
-fromToRay = [[0] * 64 for i in range(64)]  # fromToRay[64][64]
+if _tables is None:
+    fromToRay = [[0] * 64 for i in range(64)]  # fromToRay[64][64]
 
-for piece in BISHOP, ROOK:
-    for fcord in range(120):
-        f = map[fcord]
-        if f == -1:
-            continue
-        for d in dir[piece]:
-            tcord = fcord
-            t = map[tcord]
-
-            while True:
-                b = fromToRay[f][t]
-                tcord += d
+    for piece in BISHOP, ROOK:
+        for fcord in range(120):
+            f = map[fcord]
+            if f == -1:
+                continue
+            for d in dir[piece]:
+                tcord = fcord
                 t = map[tcord]
-                if t == -1:
-                    break
-                fromToRay[f][t] = setBit(fromToRay[f][t], t)
-                fromToRay[f][t] |= b
+
+                while True:
+                    b = fromToRay[f][t]
+                    tcord += d
+                    t = map[tcord]
+                    if t == -1:
+                        break
+                    fromToRay[f][t] = setBit(fromToRay[f][t], t)
+                    fromToRay[f][t] |= b
 
 # The PassedPawnMask variable is used to determine if a pawn is passed.
 #  his mask is basically all 1's from the square in front of the pawn to
@@ -1292,89 +1349,99 @@ ray45 = [rays[cord][0] | rays[cord][3] | 1 << (63 - cord) for cord in range(64)]
 ray90 = [rays[cord][4] | rays[cord][7] | 1 << (63 - cord) for cord in range(64)]
 ray135 = [rays[cord][1] | rays[cord][2] | 1 << (63 - cord) for cord in range(64)]
 
-attack00 = [{} for a in range(64)]
-attack45 = [{} for a in range(64)]
-attack90 = [{} for a in range(64)]
-attack135 = [{} for a in range(64)]
-
-cmap = [128, 64, 32, 16, 8, 4, 2, 1]
-rot1 = [A1, A2, A3, A4, A5, A6, A7, A8]
-rot2 = [A1, B2, C3, D4, E5, F6, G7, H8]
-rot3 = [A8, B7, C6, D5, E4, F3, G2, H1]
-
-# To save time, we init a main line for each of the four directions, and next
-# we will translate it for each possible cord
-for cord in range(8):
-    for map in range(1, 256):
-        # Skip entries without cord set, as cord will always be set
-        if not map & cmap[cord]:
-            continue
-
-        # Find limits inclusive
-        cord1 = cord2 = cord
-        while cord1 > 0:
-            cord1 -= 1
-            if cmap[cord1] & map:
-                break
-        while cord2 < 7:
-            cord2 += 1
-            if cmap[cord2] & map:
-                break
-
-        # Remember A1 is the left most bit
-        map00 = map << 56
-
-        attack00[cord][map00] = fromToRay[cord][cord1] | fromToRay[cord][cord2]
-
-        map90 = reduce(or_, (1 << 63 - rot1[c] for c in iterBits(map00)))
-        attack90[rot1[cord]][map90] = (
-            fromToRay[rot1[cord]][rot1[cord1]] | fromToRay[rot1[cord]][rot1[cord2]]
-        )
-
-        map45 = reduce(or_, (1 << 63 - rot2[c] for c in iterBits(map00)))
-        attack45[rot2[cord]][map45] = (
-            fromToRay[rot2[cord]][rot2[cord1]] | fromToRay[rot2[cord]][rot2[cord2]]
-        )
-
-        map135 = reduce(or_, (1 << 63 - rot3[c] for c in iterBits(map00)))
-        attack135[rot3[cord]][map135] = (
-            fromToRay[rot3[cord]][rot3[cord1]] | fromToRay[rot3[cord]][rot3[cord2]]
-        )
-
 MAXBITBOARD = (1 << 64) - 1
 
-for r in range(A2, A8 + 1, 8):
-    for cord in iterBits(ray00[r]):
-        attack00[cord] = {map >> 8: ray >> 8 for map, ray in attack00[cord - 8].items()}
-
-for r in range(B1, H1 + 1):
-    for cord in iterBits(ray90[r]):
-        attack90[cord] = {map >> 1: ray >> 1 for map, ray in attack90[cord - 1].items()}
-
-# Bottom right
-for r in range(B1, H1 + 1):
-    for cord in iterBits(ray45[r]):
-        attack45[cord] = {
-            map << 8 & MAXBITBOARD: ray << 8 & MAXBITBOARD
-            for map, ray in attack45[cord + 8].items()
-        }
-
-# Top left
-for r in reversed(range(A8, H8)):
-    for cord in iterBits(ray45[r]):
-        attack45[cord] = {map >> 8: ray >> 8 for map, ray in attack45[cord - 8].items()}
-
-# Top right
-for r in range(B8, H8 + 1):
-    for cord in iterBits(ray135[r]):
-        attack135[cord] = {
-            map >> 8: ray >> 8 for map, ray in attack135[cord - 8].items()
-        }
-
-# Bottom left
-for r in reversed(range(A1, H1)):
-    for cord in iterBits(ray135[r]):
-        attack135[cord] = {
-            map << 8 & MAXBITBOARD: ray << 8 & MAXBITBOARD
-            for map, ray in attack135[cord + 8].items()
-        }
+if _tables is None:
+    attack00 = [{} for a in range(64)]
+    attack45 = [{} for a in range(64)]
+    attack90 = [{} for a in range(64)]
+    attack135 = [{} for a in range(64)]
+
+    cmap = [128, 64, 32, 16, 8, 4, 2, 1]
+    rot1 = [A1, A2, A3, A4, A5, A6, A7, A8]
+    rot2 = [A1, B2, C3, D4, E5, F6, G7, H8]
+    rot3 = [A8, B7, C6, D5, E4, F3, G2, H1]
+
+    # To save time, we init a main line for each of the four directions, and next
+    # we will translate it for each possible cord
+    for cord in range(8):
+        for map in range(1, 256):
+            # Skip entries without cord set, as cord will always be set
+            if not map & cmap[cord]:
+                continue
+
+            # Find limits inclusive
+            cord1 = cord2 = cord
+            while cord1 > 0:
+                cord1 -= 1
+                if cmap[cord1] & map:
+                    break
+            while cord2 < 7:
+                cord2 += 1
+                if cmap[cord2] & map:
+                    break
+
+            # Remember A1 is the left most bit
+            map00 = map << 56
+
+            attack00[cord][map00] = fromToRay[cord][cord1] | fromToRay[cord][cord2]
+
+            map90 = reduce(or_, (1 << 63 - rot1[c] for c in iterBits(map00)))
+            attack90[rot1[cord]][map90] = (
+                fromToRay[rot1[cord]][rot1[cord1]] | fromToRay[rot1[cord]][rot1[cord2]]
+            )
+
+            map45 = reduce(or_, (1 << 63 - rot2[c] for c in iterBits(map00)))
+            attack45[rot2[cord]][map45] = (
+                fromToRay[rot2[cord]][rot2[cord1]] | fromToRay[rot2[cord]][rot2[cord2]]
+            )
+
+            map135 = reduce(or_, (1 << 63 - rot3[c] for c in iterBits(map00)))
+            attack135[rot3[cord]][map135] = (
+                fromToRay[rot3[cord]][rot3[cord1]] | fromToRay[rot3[cord]][rot3[cord2]]
+            )
+
+    for r in range(A2, A8 + 1, 8):
+        for cord in iterBits(ray00[r]):
+            attack00[cord] = {
+                map >> 8: ray >> 8 for map, ray in attack00[cord - 8].items()
+            }
+
+    for r in range(B1, H1 + 1):
+        for cord in iterBits(ray90[r]):
+            attack90[cord] = {
+                map >> 1: ray >> 1 for map, ray in attack90[cord - 1].items()
+            }
+
+    # Bottom right
+    for r in range(B1, H1 + 1):
+        for cord in iterBits(ray45[r]):
+            attack45[cord] = {
+                map << 8 & MAXBITBOARD: ray << 8 & MAXBITBOARD
+                for map, ray in attack45[cord + 8].items()
+            }
+
+    # Top left
+    for r in reversed(range(A8, H8)):
+        for cord in iterBits(ray45[r]):
+            attack45[cord] = {
+                map >> 8: ray >> 8 for map, ray in attack45[cord - 8].items()
+            }
+
+    # Top right
+    for r in range(B8, H8 + 1):
+        for cord in iterBits(ray135[r]):
+            attack135[cord] = {
+                map >> 8: ray >> 8 for map, ray in attack135[cord - 8].items()
+            }
+
+    # Bottom left
+    for r in reversed(range(A1, H1)):
+        for cord in iterBits(ray135[r]):
+            attack135[cord] = {
+                map << 8 & MAXBITBOARD: ray << 8 & MAXBITBOARD
+                for map, ray in attack135[cord + 8].items()
+            }
+
+if _tables is None:
+    saveTables(__name__, SOURCES, {name: globals()[name] for name in CACHED_TABLES})
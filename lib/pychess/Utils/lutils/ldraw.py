@@ -96,8 +96,4 @@ def testPlayerMatingMaterial(board, color):
 
 def test(board):
     """Test if the position is drawn. Two-fold repetitions are counted."""
-    return (
-        board.repetitionCount(draw_threshold=2) > 1
-        or testFifty(board)
-        or testMaterial(board)
-    )
+    return board.repetitionCount() > 1 or testFifty(board) or testMaterial(board)
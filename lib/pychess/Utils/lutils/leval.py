@@ -38,14 +38,11 @@ from .bitboard import iterBits, firstBit, lsb
 from .ldata import (
     fileBits,
     bitPosArray,
-    PIECE_VALUES,
     FILE,
     RANK,
     PAWN_VALUE,
     WHITE_SQUARES,
     BLACK_SQUARES,
-    ASEAN_PIECE_VALUES,
-    ATOMIC_PIECE_VALUES,
     CRAZY_PIECE_VALUES,
     kwingpawns1,
     kwingpawns2,
@@ -88,29 +85,32 @@ CHECK_BONUS = (0, 100, 500, 2000)
 
 def evaluateComplete(board, color):
     """A detailed evaluation function, taking into account
-    several positional factors"""
+    several positional factors. The evaluation of the variant of board is
+    looked up in evaluators, the search uses it directly."""
+    return evaluators.get(board.variant, evaluateNormal)(board, color)
+
+
+def evalPieces(board, color, phase):
+    """The placement of the pieces other than pawns and kings"""
+    return (
+        evalBishops(board, color, phase)
+        + evalRooks(board, color, phase)
+        + evalDoubleQR7(board, color, phase)
+        + evalKingTropism(board, color, phase)
+    )
 
-    s, phase = evalMaterial(board, color)
-    if board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS):
-        return s
-
-    s += evalKing(board, color, phase) - evalKing(board, 1 - color, phase)
-    if board.variant == RACINGKINGSCHESS or board.variant == THREECHECKCHESS:
-        return s
-
-    s += evalBishops(board, color, phase) - evalBishops(board, 1 - color, phase)
-    s += evalRooks(board, color, phase) - evalRooks(board, 1 - color, phase)
-    s += evalDoubleQR7(board, color, phase) - evalDoubleQR7(board, 1 - color, phase)
-    s += evalKingTropism(board, color, phase) - evalKingTropism(board, 1 - color, phase)
-    if board.variant in ASEAN_VARIANTS:
-        return s
-    s += evalDev(board, color, phase) - evalDev(board, 1 - color, phase)
-    if board.variant == ATOMICCHESS:
-        return s
+
+def evaluatePosition(board, color, material, phase):
+    """Adds the positional factors of standard chess to the material score"""
+    opcolor = 1 - color
+    s = material
+    s += evalKingSafety(board, color, phase) - evalKingSafety(board, opcolor, phase)
+    s += evalPieces(board, color, phase) - evalPieces(board, opcolor, phase)
+    s += evalDev(board, color, phase) - evalDev(board, opcolor, phase)
     pawnScore, passed, weaked = cacheablePawnInfo(board, phase)
     s += pawnScore if color == WHITE else -pawnScore
     s += evalPawnStructure(board, color, phase, passed, weaked) - evalPawnStructure(
-        board, 1 - color, phase, passed, weaked
+        board, opcolor, phase, passed, weaked
     )
 
     s += evalTrappedBishops(board, color)
@@ -119,54 +119,133 @@ def evaluateComplete(board, color):
     return s
 
 
+def evaluateNormal(board, color):
+    """The evaluation of standard chess, and of the variants without one of
+    their own"""
+    s, phase = materialBalance(board.material, board.pieceCount, color)
+    return evaluatePosition(board, color, s, phase)
+
+
+def evaluateCrazyhouse(board, color):
+    s, phase = materialBalance(crazyhouseMaterial(board), board.pieceCount, color)
+    return evaluatePosition(board, color, s, phase)
+
+
+def evaluateAtomic(board, color):
+    # Pawn structure doesn't matter much, when pieces explode
+    opcolor = 1 - color
+    s, phase = materialBalance(board.material, board.pieceCount, color)
+    s += evalKingSafety(board, color, phase) - evalKingSafety(board, opcolor, phase)
+    s += evalPieces(board, color, phase) - evalPieces(board, opcolor, phase)
+    s += evalDev(board, color, phase) - evalDev(board, opcolor, phase)
+    return s
+
+
+def evaluateAsean(board, color):
+    opcolor = 1 - color
+    s, phase = materialBalance(board.material, board.pieceCount, color)
+    s += evalKingSafety(board, color, phase) - evalKingSafety(board, opcolor, phase)
+    s += evalPieces(board, color, phase) - evalPieces(board, opcolor, phase)
+    return s
+
+
+def evaluateLosers(board, color):
+    """For losers, suicide and giveaway, where the side with less material
+    is better off"""
+    return losersMaterial(board.material, color)[0]
+
+
+def evaluateRacingKings(board, color):
+    # While opp reached rank 8 we can save the game if we also reach it
+    # but for this we have to force the shortest (one king move) draw line!
+    if testKingInEightRow(board):
+        s = 0
+    else:
+        s, phase = materialBalance(board.material, board.pieceCount, color)
+    return s + racingKing[board.kings[color]] - racingKing[board.kings[1 - color]]
+
+
+def evaluateThreeCheck(board, color):
+    s, phase = materialBalance(board.material, board.pieceCount, color)
+    return (
+        s
+        + CHECK_BONUS[min(3, checkCount(board, 1 - color))]
+        - CHECK_BONUS[min(3, checkCount(board, color))]
+    )
+
+
+# The evaluation of each variant, which evaluateNormal is used for if missing
+evaluators = {
+    CRAZYHOUSECHESS: evaluateCrazyhouse,
+    ATOMICCHESS: evaluateAtomic,
+    LOSERSCHESS: evaluateLosers,
+    SUICIDECHESS: evaluateLosers,
+    GIVEAWAYCHESS: evaluateLosers,
+    RACINGKINGSCHESS: evaluateRacingKings,
+    THREECHECKCHESS: evaluateThreeCheck,
+}
+for variant in ASEAN_VARIANTS:
+    evaluators[variant] = evaluateAsean
+
+
 ################################################################################
 # evalMaterial                                                                 #
 ################################################################################
 
 
 def evalMaterial(board, color):
+    """The material score and the game phase of board, in any variant"""
     # While opp reached rank 8 we can save the game if we also reach it
     # but for this we have to force the shortest (one king move) draw line!
     if board.variant == RACINGKINGSCHESS and testKingInEightRow(board):
         return [0, 0]
 
-    pieceCount = board.pieceCount
-    opcolor = 1 - color
-    material = [0, 0]
     if board.variant == CRAZYHOUSECHESS:
-        for piece in range(PAWN, KING):
-            material[WHITE] += CRAZY_PIECE_VALUES[piece] * pieceCount[WHITE][piece]
-            material[BLACK] += CRAZY_PIECE_VALUES[piece] * pieceCount[BLACK][piece]
-            material[WHITE] += CRAZY_PIECE_VALUES[piece] * board.holding[WHITE][piece]
-            material[BLACK] += CRAZY_PIECE_VALUES[piece] * board.holding[BLACK][piece]
-    elif board.variant == LOSERSCHESS:
-        for piece in range(PAWN, KING):
-            material[WHITE] += pieceCount[WHITE][piece]
-            material[BLACK] += pieceCount[BLACK][piece]
-    elif board.variant == SUICIDECHESS or board.variant == GIVEAWAYCHESS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += pieceCount[WHITE][piece]
-            material[BLACK] += pieceCount[BLACK][piece]
-    elif board.variant == ATOMICCHESS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += ATOMIC_PIECE_VALUES[piece] * pieceCount[WHITE][piece]
-            material[BLACK] += ATOMIC_PIECE_VALUES[piece] * pieceCount[BLACK][piece]
-    elif board.variant in ASEAN_VARIANTS:
-        for piece in range(PAWN, KING + 1):
-            material[WHITE] += ASEAN_PIECE_VALUES[piece] * pieceCount[WHITE][piece]
-            material[BLACK] += ASEAN_PIECE_VALUES[piece] * pieceCount[BLACK][piece]
+        material = crazyhouseMaterial(board)
     else:
-        for piece in range(PAWN, KING):
-            material[WHITE] += PIECE_VALUES[piece] * pieceCount[WHITE][piece]
-            material[BLACK] += PIECE_VALUES[piece] * pieceCount[BLACK][piece]
+        material = board.material
 
-    phase = max(1, 8 - (material[WHITE] + material[BLACK]) // 1150)
+    if board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS):
+        return losersMaterial(material, color)
+    return materialBalance(material, board.pieceCount, color)
+
+
+def crazyhouseMaterial(board):
+    """The material on the board, and in the holdings"""
+    # LBoard keeps the sums of the pieces on the board up to date
+    material = board.material[:]
+    for piece in range(PAWN, KING):
+        material[WHITE] += CRAZY_PIECE_VALUES[piece] * board.holding[WHITE][piece]
+        material[BLACK] += CRAZY_PIECE_VALUES[piece] * board.holding[BLACK][piece]
+    return material
+
+
+# The game phase goes from 1 to 8, one phase for every this much material
+# traded off
+PHASE_MATERIAL = 1150
+# materialBalance counts a material difference up to this much, and adds to
+# it the more, the more material was traded off from this total, and the
+# more pawns are left to the leading side
+MATERIAL_DIFF_LIMIT = 2400
+TRADE_DOWN_TOTAL = 12000
+TRADE_DOWN_DIVISOR = 6400
+
+
+def gamePhase(material):
+    return max(1, 8 - (material[WHITE] + material[BLACK]) // PHASE_MATERIAL)
+
+
+def materialBalance(material, pieceCount, color):
+    """The score of the material sums of both sides for color, and the game
+    phase"""
+    phase = gamePhase(material)
 
     # If both sides are equal, we don't need to compute anything!
     if material[BLACK] == material[WHITE]:
         return 0, phase
 
-    matTotal = sum(material)
+    opcolor = 1 - color
+    matTotal = material[WHITE] + material[BLACK]
 
     # Who is leading the game, material-wise?
     if material[color] > material[opcolor]:
@@ -174,23 +253,38 @@ def evalMaterial(board, color):
     else:
         leading = opcolor
 
-    if board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS):
-        val = material[leading] - material[1 - leading]
-        val = int(100 * PAWN_VALUE * val / max(material[WHITE], material[BLACK]))
-        if leading == 1 - color:
-            return val, phase
-        return -val, phase
-
     pawns = pieceCount[leading][PAWN]
     matDiff = material[leading] - material[1 - leading]
-    val = min(2400, matDiff) + (matDiff * (12000 - matTotal) * pawns) // (
-        6400 * (pawns + 1)
-    )
+    val = min(MATERIAL_DIFF_LIMIT, matDiff) + (
+        matDiff * (TRADE_DOWN_TOTAL - matTotal) * pawns
+    ) // (TRADE_DOWN_DIVISOR * (pawns + 1))
 
     if leading == color:
         return val, phase
     return -val, phase
 
+
+def losersMaterial(material, color):
+    """The score of the material sums of both sides for color in losers,
+    suicide and giveaway, and the game phase"""
+    phase = gamePhase(material)
+
+    # If both sides are equal, we don't need to compute anything!
+    if material[BLACK] == material[WHITE]:
+        return 0, phase
+
+    # Who is leading the game, material-wise?
+    if material[color] > material[1 - color]:
+        leading = color
+    else:
+        leading = 1 - color
+
+    val = material[leading] - material[1 - leading]
+    val = int(100 * PAWN_VALUE * val / max(material[WHITE], material[BLACK]))
+    if leading == 1 - color:
+        return val, phase
+    return -val, phase
+
     ################################################################################
     # evalKingTropism                                                              #
     ################################################################################
@@ -263,38 +357,83 @@ def evalKingTropism(board, color, phase):
 ################################################################################
 
 # For pawn hash, don't use buckets. Store:
-# key         high 16 bits of pawn hash key
+# key         pawn hash key
+# phase       game phase the entry was evaluated in, 0 for empty entries
 # score       score from white's point of view
 # passed      bitboard of passed pawns
 # weaked      bitboard of weak pawns
-pawnEntryType = Struct("=H h Q Q")
+pawnEntryType = Struct("=Q B h Q Q")
+# The default number of entries
 PAWN_HASH_SIZE = 16384
 PAWN_PHASE_KEY = (0x343D, 0x055D, 0x3D3C, 0x1A1C, 0x28AA, 0x19EE, 0x1538, 0x2A99)
-pawntable = create_string_buffer(PAWN_HASH_SIZE * pawnEntryType.size)
+pawnHashSize = PAWN_HASH_SIZE
+pawntable = create_string_buffer(pawnHashSize * pawnEntryType.size)
+
+# Counters for sizing the table: probes, probes finding their entry, and
+# probes finding the entry of another pawn structure or phase
+pawnProbes = 0
+pawnHits = 0
+pawnCollisions = 0
+
+
+def setPawnHashSize(maxSize):
+    """Replaces the pawn table with an empty one of about maxSize bytes"""
+    global pawnHashSize, pawntable
+    pawnHashSize = max(1, maxSize // pawnEntryType.size)
+    pawntable = create_string_buffer(pawnHashSize * pawnEntryType.size)
+    resetPawnStatistics()
+
+
+def resetPawnStatistics():
+    global pawnProbes, pawnHits, pawnCollisions
+    pawnProbes = 0
+    pawnHits = 0
+    pawnCollisions = 0
 
 
 def clearPawnTable():
-    memset(pawntable, 0, PAWN_HASH_SIZE * pawnEntryType.size)
+    memset(pawntable, 0, pawnHashSize * pawnEntryType.size)
+    resetPawnStatistics()
 
 
 def probePawns(board, phase):
-    index = (board.pawnhash % PAWN_HASH_SIZE) ^ PAWN_PHASE_KEY[phase - 1]
-    key, score, passed, weaked = pawnEntryType.unpack_from(
+    global pawnProbes, pawnHits, pawnCollisions
+    pawnProbes += 1
+    index = (board.pawnhash ^ PAWN_PHASE_KEY[phase - 1]) % pawnHashSize
+    key, tphase, score, passed, weaked = pawnEntryType.unpack_from(
         pawntable, index * pawnEntryType.size
     )
-    if key == (board.pawnhash >> 14) & 0xFFFF:
+    if key == board.pawnhash and tphase == phase:
+        pawnHits += 1
         return score, passed, weaked
+    if tphase:
+        pawnCollisions += 1
     return None
 
 
 def recordPawns(board, phase, score, passed, weaked):
-    index = (board.pawnhash % PAWN_HASH_SIZE) ^ PAWN_PHASE_KEY[phase - 1]
-    key = (board.pawnhash >> 14) & 0xFFFF
+    index = (board.pawnhash ^ PAWN_PHASE_KEY[phase - 1]) % pawnHashSize
     pawnEntryType.pack_into(
-        pawntable, index * pawnEntryType.size, key, score, passed, weaked
+        pawntable,
+        index * pawnEntryType.size,
+        board.pawnhash,
+        phase,
+        score,
+        passed,
+        weaked,
     )
 
 
+# Penalties, and bonuses, of cacheablePawnInfo. Backward and doubled pawns
+# cost their penalty plus the game phase.
+BACKWARD_PAWN = 8
+DOUBLED_PAWN = 8
+PAWN_BASE_ATTACKED = 18
+EIGHT_PAWNS = 10
+STONEWALL_BONUS = 10
+LOCKED_PAWN = 10
+
+
 def cacheablePawnInfo(board, phase):
     entry = probePawns(board, phase)
     if entry:
@@ -360,11 +499,11 @@ def cacheablePawnInfo(board, phase):
 
             if backward:
                 weaked |= bitPosArray[cord]
-                score += -(8 + phase)  # Backward pawn penalty
+                score += -(BACKWARD_PAWN + phase)
 
             # Pawn base under attack
             if moveArray[ptype][cord] & oppawns and moveArray[ptype][cord] & pawns:
-                score += -18
+                score += -PAWN_BASE_ATTACKED
 
             # Increment file count for isolani & doubled pawn evaluation
             nfile[cord & 7] += 1
@@ -372,7 +511,7 @@ def cacheablePawnInfo(board, phase):
         for i in range(8):
             # Doubled pawns
             if nfile[i] > 1:
-                score += -(8 + phase)
+                score += -(DOUBLED_PAWN + phase)
 
             # Isolated pawns
             if nfile[i] and not pawns & isolaniMask[i]:
@@ -386,15 +525,15 @@ def cacheablePawnInfo(board, phase):
 
         # Penalize having eight pawns
         if board.pieceCount[color][PAWN] == 8:
-            score -= 10
+            score -= EIGHT_PAWNS
 
         # Detect stonewall formation in our pawns
         if stonewall[color] & pawns == stonewall[color]:
-            score += 10
+            score += STONEWALL_BONUS
 
         # Penalize Locked pawns
         n = bin((pawns >> 8) & oppawns & lbox).count("1")
-        score -= n * 10
+        score -= n * LOCKED_PAWN
 
         # Switch point of view when switching colors
         score = -score
@@ -403,6 +542,13 @@ def cacheablePawnInfo(board, phase):
     return score, passed, weaked
 
 
+# Bonuses, and penalties, of evalPawnStructure. A pawn storm gets its bonus
+# for every step it is closer than 5 to the king.
+CONNECTED_PASSERS = 50
+BLOCKED_CENTER_PAWN = 48
+PAWN_STORM = 10
+
+
 def evalPawnStructure(board, color, phase, passed, weaked):
     """
     Pawn evaluation is based on the following factors:
@@ -458,7 +604,7 @@ def evalPawnStructure(board, color, phase, passed, weaked):
                         or (color == BLACK and n2 > 3)
                     )
                 ):
-                    score += 50
+                    score += CONNECTED_PASSERS
 
             # Enemy has no pieces & King is outcolor of passed pawn square
         if not opMajorCount:
@@ -492,19 +638,23 @@ def evalPawnStructure(board, color, phase, passed, weaked):
     # Penalize Pawn on d2,e2/d7,e7 is blocked
     blocker = board.blocker
     if color == WHITE and ((pawns & d2e2[WHITE]) >> 8) & blocker:
-        score -= 48
+        score -= BLOCKED_CENTER_PAWN
     elif color == BLACK and ((pawns & d2e2[BLACK]) << 8) & blocker:
-        score -= 48
+        score -= BLOCKED_CENTER_PAWN
 
     # If both colors are castled on different colors, bonus for pawn storms
     if abs(FILE(king) - FILE(opking)) >= 4 and phase < 6:
         n1 = FILE(opking)
         p = (isolaniMask[n1] | fileBits[n1]) & pawns
-        score += sum(10 * (5 - distance[KING][c][opking]) for c in iterBits(p))
+        score += sum(PAWN_STORM * (5 - distance[KING][c][opking]) for c in iterBits(p))
 
     return score
 
 
+# The bonus of evalDoubleQR7
+DOUBLE_QR7 = 30
+
+
 # evalBateries
 def evalDoubleQR7(board, color, phase):
     """Tests for QR, RR, QB and BB combos on the 7th rank. These are dangerous
@@ -517,7 +667,7 @@ def evalDoubleQR7(board, color, phase):
     if bin((boards[QUEEN] | boards[ROOK]) & brank7[color]).count("1") >= 2 and (
         opboards[KING] & brank8[color] or opboards[PAWN] & brank7[color]
     ):
-        return 30
+        return DOUBLE_QR7
 
     return 0
 
@@ -542,14 +692,24 @@ def evalKing(board, color, phase):
     # - - - - - n - -
     # - - - K - - - R
 
-    king = board.kings[color]
-
     if board.variant == RACINGKINGSCHESS:
-        return racingKing[king]
+        return racingKing[board.kings[color]]
 
     if board.variant == THREECHECKCHESS:
         return CHECK_BONUS[min(3, checkCount(board, 1 - color))]
 
+    return evalKingSafety(board, color, phase)
+
+
+# How good a pawn wall in front of a castled king is, by the number of pawns
+# in it and in the row before it
+PAWN_WALL_MOD = (0, 3, 6, 9, 7, 5, 3)
+
+
+def evalKingSafety(board, color, phase):
+    """evalKing of standard chess"""
+    king = board.kings[color]
+
     # If we are in endgame, we want our king in the center, and theirs far away
     if phase >= 6:
         return endingKing[king]
@@ -571,7 +731,7 @@ def evalKing(board, color, phase):
 
         pawns = board.boards[color][PAWN]
         total_in_front = (wall1 | wall2 & pawns).bit_count()
-        numbermod = (0, 3, 6, 9, 7, 5, 3)[total_in_front]
+        numbermod = PAWN_WALL_MOD[total_in_front]
 
         s = (wall1 & pawns).bit_count() * 2 + (wall2 & pawns).bit_count()
         return (s * numbermod * 5) // 6
@@ -579,6 +739,16 @@ def evalKing(board, color, phase):
     return 0
 
 
+# evalDev looks at the first plies of the game only, and gives these
+# penalties, and the bonus for every wing pawn
+DEVELOPMENT_PLIES = 38
+NO_KING_SIDE_CASTLING = 40
+NO_QUEEN_SIDE_CASTLING = 50
+QUEEN_MOVED = 30
+WING_PAWNS_DESTROYED = 35
+WING_PAWN = 6
+
+
 def evalDev(board, color, phase):
     """
     Calculate the development score for side (for opening only).
@@ -590,7 +760,7 @@ def evalDev(board, color, phase):
 
     # If we are castled or beyond the 20th move, no more evalDev
 
-    if board.plyCount >= 38:
+    if board.plyCount >= DEVELOPMENT_PLIES:
         return 0
 
     score = 0
@@ -601,24 +771,24 @@ def evalDev(board, color, phase):
 
         # We don't encourage castling, but it should always be possible
         if not board.castling & CAS_FLAGS[color][0]:
-            score -= 40
+            score -= NO_KING_SIDE_CASTLING
         if not board.castling & CAS_FLAGS[color][1]:
-            score -= 50
+            score -= NO_QUEEN_SIDE_CASTLING
 
         # Should keep queen home
         cord = firstBit(boards[QUEEN])
         if cord != D1 + 56 * color:
-            score -= 30
+            score -= QUEEN_MOVED
 
         qpawns = max(qwingpawns1[color] & pawns, qwingpawns2[color] & pawns)
         kpawns = max(kwingpawns1[color] & pawns, kwingpawns2[color] & pawns)
 
         if qpawns != 2 and kpawns != 2:
             # Structure destroyed in both sides
-            score -= 35
+            score -= WING_PAWNS_DESTROYED
         else:
             # Discourage any wing pawn moves
-            score += (qpawns + kpawns) * 6
+            score += (qpawns + kpawns) * WING_PAWN
 
     return score
 
@@ -681,6 +851,14 @@ def evalTrappedBishops(board, color):
     return score if color == WHITE else -score
 
 
+# The bonuses of evalRooks for a rook on a file without pawns of its own,
+# which gets both of the first two, and for one on the f file facing the
+# king side
+ROOK_OPEN_FILE = 5
+ROOK_OPEN_FILE_EXTRA = 6
+ROOK_F_FILE = 40
+
+
 def evalRooks(board, color, phase):
     """rooks on open/half-open files"""
 
@@ -699,9 +877,9 @@ def evalRooks(board, color, phase):
             file = cord & 7
             if not boards[PAWN] & fileBits[file]:
                 if file == 5 and opking & 7 >= 4:
-                    score += 40
-                score += 5
+                    score += ROOK_F_FILE
+                score += ROOK_OPEN_FILE
                 if not boards[PAWN] & fileBits[file]:
-                    score += 6
+                    score += ROOK_OPEN_FILE_EXTRA
 
     return score
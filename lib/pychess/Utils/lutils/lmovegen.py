@@ -1,19 +1,18 @@
 from .bitboard import bitPosArray, iterBits, clearBit, firstBit
-from .attack import isAttacked, pinnedOnKing, getAttacks
+from .attack import (
+    isAttacked,
+    pinnedOnKing,
+    pinnedPieces,
+    getAttacks,
+    bishopAttacks,
+    rookAttacks,
+)
 from .ldata import (
     fromToRay,
     moveArray,
     directions,
     fileBits,
     rankBits,
-    ray45,
-    attack45,
-    ray135,
-    attack135,
-    ray90,
-    attack90,
-    ray00,
-    attack00,
     FILE,
     rays,
 )
@@ -229,13 +228,7 @@ def genPieceMoves(board, piece, tcord):
         else:
             blocker = board.blocker
             for fcord in iterBits(bishops):
-                try:
-                    attackBoard = (
-                        attack45[fcord][ray45[fcord] & blocker]
-                        | attack135[fcord][ray135[fcord] & blocker]
-                    )
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks(fcord, blocker)
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
             return moves
@@ -244,13 +237,7 @@ def genPieceMoves(board, piece, tcord):
         blocker = board.blocker
         rooks = board.boards[board.color][ROOK]
         for fcord in iterBits(rooks):
-            try:
-                attackBoard = (
-                    attack00[fcord][ray00[fcord] & blocker]
-                    | attack90[fcord][ray90[fcord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks(fcord, blocker)
             if tcord in iterBits(attackBoard & notfriends):
                 moves.add(newMove(fcord, tcord))
         return moves
@@ -275,23 +262,11 @@ def genPieceMoves(board, piece, tcord):
         else:
             blocker = board.blocker
             for fcord in iterBits(queens):
-                try:
-                    attackBoard = (
-                        attack45[fcord][ray45[fcord] & blocker]
-                        | attack135[fcord][ray135[fcord] & blocker]
-                    )
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks(fcord, blocker)
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
 
-                try:
-                    attackBoard = (
-                        attack00[fcord][ray00[fcord] & blocker]
-                        | attack90[fcord][ray90[fcord] & blocker]
-                    )
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = rookAttacks(fcord, blocker)
                 if tcord in iterBits(attackBoard & notfriends):
                     moves.add(newMove(fcord, tcord))
             return moves
@@ -311,6 +286,56 @@ def genPieceMoves(board, piece, tcord):
     return moves
 
 
+def isPseudoLegal(board, move):
+    """Cheap test of whether a move from the transposition table or the killer
+    slots can be played in this position, as if genAllMoves had generated it.
+    Only plain moves of standard pieces are checked; castling, en passant,
+    promotions, drops, gatings and the ASEAN pieces always return False, so
+    callers must fall back to generating them."""
+    from pychess.Variants import variants
+
+    if move >> 12 != NORMAL_MOVE or board.variant in ASEAN_VARIANTS:
+        return False
+
+    fcord = (move >> 6) & 63
+    tcord = move & 63
+    color = board.color
+    friends = board.friends[color]
+    tbit = bitPosArray[tcord]
+    if not friends & bitPosArray[fcord] or friends & tbit:
+        return False
+
+    piece = board.arBoard[fcord]
+    if piece == KNIGHT:
+        return bool(moveArray[KNIGHT][fcord] & tbit)
+
+    if piece in (BISHOP, ROOK, QUEEN):
+        if not moveArray[piece][fcord] & tbit:
+            return False
+        return not clearBit(fromToRay[fcord][tcord], tcord) & board.blocker
+
+    if piece == KING:
+        if board.variant == ATOMICCHESS and board.arBoard[tcord] != EMPTY:
+            return False
+        return bool(moveArray[KING][fcord] & tbit)
+
+    if piece == PAWN:
+        if tcord in variants[board.variant].PROMOTION_ZONE[color]:
+            return False
+        if board.arBoard[tcord] != EMPTY:
+            return bool(moveArray[color == WHITE and PAWN or BPAWN][fcord] & tbit)
+        step = 8 if color == WHITE else -8
+        if tcord - fcord == step:
+            return True
+        if tcord - fcord == 2 * step and board.arBoard[fcord + step] == EMPTY:
+            rank = fcord >> 3
+            if color == WHITE:
+                return rank == 1 or rank == 0 and board.variant == HORDECHESS
+            return rank == 6
+
+    return False
+
+
 def gen_sittuyin_promotions(board):
     from pychess.Variants import variants
 
@@ -419,13 +444,7 @@ def genAllMoves(board, drops=True):
     if board.variant in ASEAN_VARIANTS:
         # Rooks
         for cord in iterBits(rooks):
-            try:
-                attackBoard = (
-                    attack00[cord][ray00[cord] & blocker]
-                    | attack90[cord][ray90[cord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks(cord, blocker)
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
@@ -446,25 +465,13 @@ def genAllMoves(board, drops=True):
     else:
         # Rooks and Queens and Elephants
         for cord in iterBits(rooks | queens | elephants):
-            try:
-                attackBoard = (
-                    attack00[cord][ray00[cord] & blocker]
-                    | attack90[cord][ray90[cord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks(cord, blocker)
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
         if board.variant == SCHESS and (holding[HAWK] > 0 or holding[ELEPHANT] > 0):
             for cord in iterBits((rooks | queens) & board.virgin[board.color]):
-                try:
-                    attackBoard = (
-                        attack00[cord][ray00[cord] & blocker]
-                        | attack90[cord][ray90[cord] & blocker]
-                    )
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = rookAttacks(cord, blocker)
                 for c in iterBits(attackBoard & notfriends):
                     if holding[HAWK] > 0:
                         yield newMove(cord, c, HAWK_GATE)
@@ -473,25 +480,13 @@ def genAllMoves(board, drops=True):
 
         # Bishops and Queens, Hawks
         for cord in iterBits(bishops | queens | hawks):
-            try:
-                attackBoard = (
-                    attack45[cord][ray45[cord] & blocker]
-                    | attack135[cord][ray135[cord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = bishopAttacks(cord, blocker)
             for c in iterBits(attackBoard & notfriends):
                 yield newMove(cord, c)
 
         if board.variant == SCHESS and (holding[HAWK] > 0 or holding[ELEPHANT] > 0):
             for cord in iterBits((bishops | queens) & board.virgin[board.color]):
-                try:
-                    attackBoard = (
-                        attack45[cord][ray45[cord] & blocker]
-                        | attack135[cord][ray135[cord] & blocker]
-                    )
-                except KeyError:
-                    attackBoard = 0
+                attackBoard = bishopAttacks(cord, blocker)
                 for c in iterBits(attackBoard & notfriends):
                     if holding[HAWK] > 0:
                         yield newMove(cord, c, HAWK_GATE)
@@ -645,6 +640,93 @@ def genAllMoves(board, drops=True):
         yield from genCastles(board)
 
 
+################################################################################
+#   Generate legal moves                                                       #
+################################################################################
+
+# Variants where a move is legal if it doesn't leave the king in check in the
+# usual way, so genLegalMoves can tell it from the checks and pins of the king.
+# In the others it tries each move on the board.
+NOT_PIN_LEGAL_VARIANTS = (
+    SUICIDECHESS,
+    GIVEAWAYCHESS,
+    ATOMICCHESS,
+    SCHESS,
+) + tuple(ASEAN_VARIANTS)
+
+
+def genLegalMoves(board):
+    """The moves of genAllMoves which don't leave the king of the side to move
+    in check, as found by applying them and asking opIsChecked.
+
+    Instead, the pieces checking the king and those pinned against it are
+    found once, and only the moves of the king and en passant captures are
+    tried on the board."""
+
+    color = board.color
+    kcord = board.kings[color]
+    if board.variant in NOT_PIN_LEGAL_VARIANTS or kcord == -1:
+        # An atomic capture must not explode the own king, not even along
+        # with the other one
+        atomic = board.variant == ATOMICCHESS and kcord != -1
+        for move in genAllMoves(board):
+            board.applyMove(move)
+            illegal = board.opIsChecked() or (atomic and not board.boards[color][KING])
+            board.popMove()
+            if not illegal:
+                yield move
+        return
+
+    checkers = getAttacks(board, kcord, 1 - color)
+    if checkers:
+        if checkers & (checkers - 1):
+            # Only the king can escape a double check
+            evasions = 0
+        else:
+            # Capture the checking piece, or block a sliding one
+            chkcord = firstBit(checkers)
+            evasions = checkers
+            if sliders[board.arBoard[chkcord]]:
+                evasions |= fromToRay[kcord][chkcord]
+    pinned = pinnedPieces(board, color)
+    kingRays = rays[kcord]
+    kingDirections = directions[kcord]
+
+    for move in genAllMoves(board):
+        flag = move >> 12
+        tcord = move & 63
+        if flag == DROP:
+            if not checkers or bitPosArray[tcord] & evasions:
+                yield move
+            continue
+
+        fcord = (move >> 6) & 63
+        if (
+            fcord == kcord
+            or flag == ENPASSANT
+            or flag == KING_CASTLE
+            or flag == QUEEN_CASTLE
+        ):
+            # The king may walk into an attack, and an en passant capture
+            # may uncover one along the rank of both pawns
+            board.applyMove(move)
+            illegal = board.opIsChecked()
+            board.popMove()
+            if not illegal:
+                yield move
+            continue
+
+        if checkers and not bitPosArray[tcord] & evasions:
+            continue
+        # A pinned piece can only move along the line of the pin
+        if (
+            bitPosArray[fcord] & pinned
+            and not bitPosArray[tcord] & kingRays[kingDirections[fcord]]
+        ):
+            continue
+        yield move
+
+
 ################################################################################
 #   Generate capturing moves                                                   #
 ################################################################################
@@ -692,24 +774,12 @@ def genCaptures(board):
     # Rooks and Queens
     if board.variant in ASEAN_VARIANTS:
         for cord in iterBits(rooks):
-            try:
-                attackBoard = (
-                    attack00[cord][ray00[cord] & blocker]
-                    | attack90[cord][ray90[cord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks(cord, blocker)
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
     else:
         for cord in iterBits(rooks | queens | elephants):
-            try:
-                attackBoard = (
-                    attack00[cord][ray00[cord] & blocker]
-                    | attack90[cord][ray90[cord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = rookAttacks(cord, blocker)
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
 
@@ -727,13 +797,7 @@ def genCaptures(board):
                 yield newMove(cord, c)
     else:
         for cord in iterBits(bishops | queens | hawks):
-            try:
-                attackBoard = (
-                    attack45[cord][ray45[cord] & blocker]
-                    | attack135[cord][ray135[cord] & blocker]
-                )
-            except KeyError:
-                attackBoard = 0
+            attackBoard = bishopAttacks(cord, blocker)
             for c in iterBits(attackBoard & enemies):
                 yield newMove(cord, c)
 
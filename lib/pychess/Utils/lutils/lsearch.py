@@ -1,21 +1,20 @@
+import os
+import sys
 from time import time
 from random import random
+from types import ModuleType
 from heapq import heappush, heappop
 
 from .lmovegen import genAllMoves, genCheckEvasions, genCaptures
 from .egtb_gaviota import EgtbGaviota
 from pychess.Utils.const import (
-    ATOMICCHESS,
-    KINGOFTHEHILLCHESS,
-    THREECHECKCHESS,
-    LOSERSCHESS,
-    SUICIDECHESS,
-    GIVEAWAYCHESS,
     EMPTY,
     PROMOTIONS,
+    ENPASSANT,
     DROP,
-    KING,
-    RACINGKINGSCHESS,
+    KNIGHT,
+    QUEEN,
+    NORMAL_MOVE,
     hashfALPHA,
     hashfBETA,
     hashfEXACT,
@@ -24,33 +23,97 @@ from pychess.Utils.const import (
     WHITE,
     WHITEWON,
 )
-from .leval import evaluateComplete
-from .lsort import getCaptureValue, getMoveValue
-from .ldata import MATE_VALUE, VALUE_AT_PLY
+from .leval import setPawnHashSize
+from .SearchStrategy import getStrategy, standardStrategy
+from .ldata import MATE_VALUE, MATE_DEPTH, VALUE_AT_PLY
 from .TranspositionTable import TranspositionTable
-from pychess.Variants.atomic import kingExplode
-from pychess.Variants.kingofthehill import testKingInCenter
-from pychess.Variants.suicide import pieceCount
-from pychess.Variants.threecheck import checkCount
+from .validator import validateMove
+from .EvalCache import EvalCache
 from . import ldraw
 
+# The default number of nodes searched between looks at the clock
 TIMECHECK_FREQ = 500
 
-table = TranspositionTable(32 * 1024 * 1024)
-skipPruneChance = 0
-searching = False
-nodes = 0
-endtime = 0
-timecheck_counter = TIMECHECK_FREQ
-egtb = None
-
-# Evaluation cache for quiescent stand-pat. Keyed by board.hash (Zobrist, encodes
-# position + side-to-move). Cleared at the start of each root alphaBeta call so
-# stale entries from previous iterative-deepening steps don't linger too long.
-_eval_cache = {}
-
-
-def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
+# A1-A1, which LBoard.applyMove() treats as passing the turn
+NULL_MOVE = 0
+
+# Scores beyond this are mate scores, and can't be used for pruning decisions
+MATE_BOUND = MATE_VALUE - MATE_DEPTH
+
+# By how much the static evaluation must fall short of alpha, at depth 1 and
+# 2, to prune quiet moves (futility) or to drop into quiescence (razoring)
+FUTILITY_MARGIN = (0, 200, 500)
+RAZOR_MARGIN = (0, 300, 600)
+
+# Captures in the quiescent search, which even with this much extra can't
+# bring the static evaluation up to alpha, are pruned (delta pruning)
+DELTA_MARGIN = 200
+
+
+class SearchContext:
+    """The state of one search: its transposition table, node counter, time
+    limit and so on. Searches using different contexts are independent of
+    each other and may run concurrently in separate threads."""
+
+    def __init__(self, table=None):
+        self.table = (
+            table if table is not None else TranspositionTable(32 * 1024 * 1024)
+        )
+        self.skipPruneChance = 0
+        self.searching = False
+        self.nodes = 0
+        # The part of nodes searched in quiescent search
+        self.qnodes = 0
+        self.endtime = 0
+        # The search stops after about this many nodes
+        self.nodeLimit = sys.maxsize
+        # Root moves left out of the search, to find the next best line in
+        # multi-PV analysis
+        self.excludedMoves = ()
+        self.timecheck_counter = TIMECHECK_FREQ
+        self.timecheckFreq = TIMECHECK_FREQ
+        self.egtb = None
+        # The SearchStrategy of the variant of the board searched
+        self.strategy = standardStrategy
+
+        # Selectivity, each of which can be switched off for testing
+        self.nullMove = True
+        self.lateMoveReductions = True
+        self.futilityPruning = True
+        self.razoring = True
+        # Quiescent search: skip captures which can't raise alpha, skip
+        # captures losing material by static exchange evaluation, and search
+        # quiet checks in its first ply
+        self.deltaPruning = True
+        self.seePruning = True
+        self.qsearchChecks = False
+
+        # Static evaluations of the positions of the current search, used by
+        # the pruning decisions and quiescent stand-pat
+        self.evalCache = EvalCache(2 * 1024 * 1024)
+
+
+# The context used when none is given. Its state is also available as module
+# attributes (lsearch.searching, lsearch.nodes, ...), see the end of this file.
+defaultContext = SearchContext()
+
+
+def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0, context=None):
+    """Search board using context, or the default context if None.
+    See _alphaBeta."""
+    ctx = defaultContext if context is None else context
+    ctx.strategy = getStrategy(board.variant)
+    return _alphaBeta(ctx, board, depth, alpha, beta, ply)
+
+
+def quiescent(board, alpha, beta, ply, context=None):
+    """Quiescent search board using context, or the default context if None"""
+    ctx = defaultContext if context is None else context
+    ctx.strategy = getStrategy(board.variant)
+    return _quiescent(ctx, board, alpha, beta, ply)
+
+
+def _alphaBeta(ctx, board, depth, alpha, beta, ply):
     """This is a alphabeta/negamax/quiescent/iterativedeepend search algorithm
     Based on moves found by the validator.py findmoves2 function and
     evaluated by eval.py.
@@ -62,10 +125,14 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
         the deepest)
     *   a score of your standing the the last possition."""
 
-    global searching, nodes, table, endtime, timecheck_counter, _eval_cache
+    table = ctx.table
+    strategy = ctx.strategy
     foundPv = False
     hashf = hashfALPHA
     amove = []
+    # The table and the endgame table know about the best root move only, so
+    # they are of no use to a search leaving some root moves out
+    excluded = ctx.excludedMoves if ply == 0 else ()
 
     ############################################################################
     # Mate distance pruning
@@ -81,29 +148,20 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
         if alpha >= beta:
             return [], MATE_IN_1
 
-    if board.variant == ATOMICCHESS:
-        if (board.boards[board.color][KING]).bit_count() == 0:
+    # Won or lost by the rules of the variant
+    if strategy.terminal is not None:
+        result = strategy.terminal(board)
+        if result < 0:
             return [], MATED
-    elif board.variant == LOSERSCHESS:
-        if pieceCount(board, board.color) == 1:
+        if result > 0:
             return [], -MATED
-    elif board.variant == SUICIDECHESS or board.variant == GIVEAWAYCHESS:
-        if pieceCount(board, board.color) == 0:
-            return [], -MATED
-    elif board.variant == KINGOFTHEHILLCHESS:
-        if testKingInCenter(board):
-            return [], MATED
-    elif board.variant == THREECHECKCHESS:
-        if checkCount(board, board.color) == 3:
-            return [], MATED
 
     ############################################################################
     # Look in the end game table
     ############################################################################
 
-    global egtb
-    if egtb:
-        tbhits = egtb.scoreAllMoves(board)
+    if ctx.egtb and not excluded:
+        tbhits = ctx.egtb.scoreAllMoves(board)
         if tbhits:
             move, state, steps = tbhits[0]
 
@@ -134,13 +192,13 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     ############################################################################
     # Look up transposition table                                              #
     ############################################################################
-    if ply == 0:
-        table.newSearch()
-        _eval_cache.clear()
-
     table.setHashMove(depth, -1)
     probe = table.probe(board, depth, alpha, beta)
-    if probe:
+    # The root move is played, so don't trust an entry that a helper may be
+    # writing just now, or that only shares the 32 bit key with the position
+    if probe and ply == 0 and not validateMove(board, probe[0]):
+        probe = None
+    if probe and not excluded:
         move, score, hashf = probe
         score = VALUE_AT_PLY(score, ply)
         table.setHashMove(depth, move)
@@ -159,18 +217,18 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     # Cheking the time                                                         #
     ############################################################################
 
-    timecheck_counter -= 1
-    if timecheck_counter == 0:
-        if time() > endtime:
-            searching = False
-        timecheck_counter = TIMECHECK_FREQ
+    ctx.timecheck_counter -= 1
+    if ctx.timecheck_counter == 0:
+        if time() > ctx.endtime or ctx.nodes >= ctx.nodeLimit:
+            ctx.searching = False
+        ctx.timecheck_counter = ctx.timecheckFreq
 
     ############################################################################
     # Break itereation if interupted or if times up                            #
     ############################################################################
 
-    if not searching:
-        return [], -evaluateComplete(board, 1 - board.color)
+    if not ctx.searching:
+        return [], -ctx.strategy.evaluate(board, 1 - board.color)
 
     ############################################################################
     # Go for quiescent search                                                  #
@@ -182,76 +240,88 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
         if isCheck:
             # Being in check is that serious, that we want to take a deeper look
             depth += 1
-        elif board.variant in (
-            LOSERSCHESS,
-            SUICIDECHESS,
-            GIVEAWAYCHESS,
-            ATOMICCHESS,
-            RACINGKINGSCHESS,
-        ):
-            return [], evaluateComplete(board, board.color)
+        elif not strategy.quiescence:
+            return [], strategy.evaluate(board, board.color)
         else:
-            mvs, val = quiescent(board, alpha, beta, ply)
+            mvs, val = _quiescent(ctx, board, alpha, beta, ply, ctx.qsearchChecks)
             return mvs, val
 
+    ############################################################################
+    # Selectivity: null move, razoring and futility pruning                    #
+    ############################################################################
+
+    selective = (
+        ply > 0
+        and not isCheck
+        and strategy.pruning
+        and -MATE_BOUND < alpha
+        and beta < MATE_BOUND
+    )
+    futile = False
+
+    if selective:
+        staticEval = None
+
+        # Give the opponent a free move. If we are still above beta after a
+        # reduced search, a real move will most likely be too.
+        if (
+            ctx.nullMove
+            and depth >= 2
+            and board.hist_move[-1] != NULL_MOVE
+            and sum(board.pieceCount[board.color][KNIGHT : QUEEN + 1])
+        ):
+            staticEval = _staticEval(ctx, board)
+            if staticEval >= beta:
+                reduction = 3 if depth > 6 else 2
+                board.applyMove(NULL_MOVE)
+                mvs, val = _alphaBeta(
+                    ctx, board, depth - 1 - reduction, -beta, -beta + 1, ply + 1
+                )
+                board.popMove()
+                if -val >= beta and ctx.searching:
+                    return [], beta
+
+        if depth <= 2 and (ctx.razoring or ctx.futilityPruning):
+            if staticEval is None:
+                staticEval = _staticEval(ctx, board)
+
+            # Hopeless positions near the horizon only get a quiescent search
+            if ctx.razoring and staticEval + RAZOR_MARGIN[depth] <= alpha:
+                ralpha = alpha - RAZOR_MARGIN[depth]
+                mvs, val = _quiescent(ctx, board, ralpha, ralpha + 1, ply)
+                if val <= ralpha:
+                    return [], val
+
+            futile = (
+                ctx.futilityPruning and staticEval + FUTILITY_MARGIN[depth] <= alpha
+            )
+
     ############################################################################
     # Find and sort moves                                                      #
     ############################################################################
 
-    if board.variant in (LOSERSCHESS, SUICIDECHESS, GIVEAWAYCHESS):
-        mlist = [m for m in genCaptures(board)]
-        if board.variant == LOSERSCHESS:
-            if isCheck:
-                evasions = [m for m in genCheckEvasions(board)]
-                eva_cap = [m for m in evasions if m in mlist]
-                mlist = eva_cap if eva_cap else evasions
-            else:
-                valid_captures = []
-                for move in mlist:
-                    board.applyMove(move)
-                    if not board.opIsChecked():
-                        valid_captures.append(move)
-                    board.popMove()
-                mlist = valid_captures
-        if not mlist and not isCheck:
-            mlist = [m for m in genAllMoves(board)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
-    elif board.variant == ATOMICCHESS:
-        if isCheck:
-            mlist = [
-                m
-                for m in genCheckEvasions(board)
-                if not kingExplode(board, m, board.color)
-            ]
-        else:
-            mlist = [
-                m for m in genAllMoves(board) if not kingExplode(board, m, board.color)
-            ]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
-    elif board.variant == RACINGKINGSCHESS:
-        mlist = [m for m in genAllMoves(board) if not board.willGiveCheck(m)]
-        moves = [(-getMoveValue(board, table, depth, m), m) for m in mlist]
-    else:
-        if isCheck:
-            moves = [
-                (-getMoveValue(board, table, depth, m), m)
-                for m in genCheckEvasions(board)
-            ]
-        else:
-            moves = [
-                (-getMoveValue(board, table, depth, m), m) for m in genAllMoves(board)
-            ]
-    moves.sort()
+    moves = strategy.genMoves(board, table, depth, isCheck)
 
     # This is needed on checkmate
     catchFailLow = None
+    legalMoves = 0
+    reduce = selective and ctx.lateMoveReductions and depth >= 3
 
     ############################################################################
     # Loop moves                                                               #
     ############################################################################
 
     for moveValue, move in moves:
-        nodes += 1
+        if move in excluded:
+            continue
+        ctx.nodes += 1
+
+        # Not a capture, promotion, drop, killer or hash move
+        quiet = (
+            moveValue > -1000
+            and move >> 12 == NORMAL_MOVE
+            and board.arBoard[move & 63] == EMPTY
+        )
 
         board.applyMove(move)
         if not isCheck:
@@ -259,23 +329,41 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
                 board.popMove()
                 continue
 
+        legalMoves += 1
         catchFailLow = move
 
-        if foundPv:
-            mvs, val = alphaBeta(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+        if futile and legalMoves > 1 and quiet and not board.isChecked():
+            board.popMove()
+            continue
+
+        # Late, quiet moves are unlikely to be best. Try a reduced depth first,
+        # and only search them fully if they surprise us.
+        reduction = 0
+        if reduce and legalMoves > 3 and quiet and not board.isChecked():
+            reduction = 1 if legalMoves <= 8 or depth < 5 else 2
+            mvs, val = _alphaBeta(
+                ctx, board, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1
+            )
             val = -val
-            if val > alpha and val < beta:
-                mvs, val = alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
+
+        if not reduction or val > alpha:
+            if foundPv:
+                mvs, val = _alphaBeta(
+                    ctx, board, depth - 1, -alpha - 1, -alpha, ply + 1
+                )
+                val = -val
+                if val > alpha and val < beta:
+                    mvs, val = _alphaBeta(ctx, board, depth - 1, -beta, -alpha, ply + 1)
+                    val = -val
+            else:
+                mvs, val = _alphaBeta(ctx, board, depth - 1, -beta, -alpha, ply + 1)
                 val = -val
-        else:
-            mvs, val = alphaBeta(board, depth - 1, -beta, -alpha, ply + 1)
-            val = -val
 
         board.popMove()
 
         if val > alpha:
             if val >= beta:
-                if searching and move >> 12 != DROP:
+                if ctx.searching and move >> 12 != DROP and not excluded:
                     table.record(
                         board, move, VALUE_AT_PLY(beta, -ply), hashfBETA, depth
                     )
@@ -299,14 +387,14 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     ############################################################################
 
     if amove:
-        if searching:
+        if ctx.searching and not excluded:
             table.record(board, amove[0], VALUE_AT_PLY(alpha, -ply), hashf, depth)
             if board.arBoard[amove[0] & 63] == EMPTY:
                 table.addKiller(depth, amove[0])
         return amove, alpha
 
     if catchFailLow:
-        if searching:
+        if ctx.searching and not excluded:
             table.record(board, catchFailLow, VALUE_AT_PLY(alpha, -ply), hashf, depth)
         return [catchFailLow], alpha
 
@@ -317,43 +405,56 @@ def alphaBeta(board, depth, alpha=-MATE_VALUE, beta=MATE_VALUE, ply=0):
     return [], 0
 
 
-def quiescent(board, alpha, beta, ply):
-    if skipPruneChance and random() < skipPruneChance:
-        return [], (alpha + beta) // 2
+def _staticEval(ctx, board):
+    evalCache = ctx.evalCache
+    value = evalCache.probe(board.hash)
+    if value is None:
+        value = ctx.strategy.evaluate(board, board.color)
+        evalCache.record(board.hash, value)
+    return value
 
-    global searching, nodes, endtime, timecheck_counter, _eval_cache
+
+def _quiescent(ctx, board, alpha, beta, ply, checks=False):
+    """Search captures only, or evasions when in check, and with checks=True
+    also quiet moves giving check"""
+    if ctx.skipPruneChance and random() < ctx.skipPruneChance:
+        return [], (alpha + beta) // 2
 
     if ldraw.test(board):
         return [], 0
 
-    timecheck_counter -= 1
-    if timecheck_counter == 0:
-        if time() > endtime:
-            searching = False
-        timecheck_counter = TIMECHECK_FREQ
+    ctx.timecheck_counter -= 1
+    if ctx.timecheck_counter == 0:
+        if time() > ctx.endtime or ctx.nodes >= ctx.nodeLimit:
+            ctx.searching = False
+        ctx.timecheck_counter = ctx.timecheckFreq
 
     ############################################################################
     # Break itereation if interupted or if times up                            #
     ############################################################################
 
-    if not searching:
-        return [], -evaluateComplete(board, 1 - board.color)
+    if not ctx.searching:
+        return [], -ctx.strategy.evaluate(board, 1 - board.color)
 
     isCheck = board.isChecked()
 
     # no stand-pat when in check
     if not isCheck:
-        _key = board.hash
-        if _key in _eval_cache:
-            value = _eval_cache[_key]
-        else:
-            value = evaluateComplete(board, board.color)
-            _eval_cache[_key] = value
+        value = _staticEval(ctx, board)
         if value >= beta:
             return [], beta
         if value > alpha:
             alpha = value
 
+    strategy = ctx.strategy
+    pruning = strategy.pruning
+    deltaPruning = pruning and ctx.deltaPruning and not isCheck
+    seePruning = pruning and ctx.seePruning
+    if deltaPruning:
+        deltaBase = value + DELTA_MARGIN
+        materialValues = board.materialValues
+        arBoard = board.arBoard
+
     amove = []
 
     heap = []
@@ -368,10 +469,38 @@ def quiescent(board, alpha, beta, ply):
             return [], -MATE_VALUE + ply
     else:
         for move in genCaptures(board):
-            heappush(heap, (-getCaptureValue(board, move), move))
+            flag = move >> 12
+            # The captured piece alone must make up for the deficit
+            if (
+                deltaPruning
+                and flag != ENPASSANT
+                and flag not in PROMOTIONS
+                and deltaBase + materialValues[arBoard[move & 63]] <= alpha
+            ):
+                continue
+            captureValue = strategy.getCaptureValue(board, move)
+            if seePruning and captureValue == -sys.maxsize:
+                continue
+            heappush(heap, (-captureValue, move))
+        if checks:
+            for move in genAllMoves(board):
+                flag = move >> 12
+                if (
+                    board.arBoard[move & 63] != EMPTY
+                    or flag in PROMOTIONS
+                    or flag == ENPASSANT
+                    or flag == DROP
+                ):
+                    continue
+                board.applyMove(move)
+                givesCheck = board.isChecked()
+                board.popMove()
+                if givesCheck:
+                    heappush(heap, (0, move))
 
     while heap:
-        nodes += 1
+        ctx.nodes += 1
+        ctx.qnodes += 1
 
         v, move = heappop(heap)
 
@@ -381,7 +510,7 @@ def quiescent(board, alpha, beta, ply):
                 board.popMove()
                 continue
 
-        mvs, val = quiescent(board, -beta, -alpha, ply + 1)
+        mvs, val = _quiescent(ctx, board, -beta, -alpha, ply + 1)
         val = -val
 
         board.popMove()
@@ -422,6 +551,93 @@ class EndgameTable:
         return []
 
 
-def enableEGTB():
-    global egtb
-    egtb = EndgameTable()
+def enableEGTB(context=None):
+    (defaultContext if context is None else context).egtb = EndgameTable()
+
+
+def newSearch(context=None):
+    """Lets the transposition table of context, or the default context if
+    None, replace the entries of earlier searches, and empties its evaluation
+    cache. Call it once per search, not per iterative deepening iteration."""
+    ctx = defaultContext if context is None else context
+    ctx.table.newSearch()
+    ctx.evalCache.newSearch()
+
+
+# The parts of the memory given to setHashSize, which are used for the pawn
+# structure table of leval and for the evaluation cache
+PAWN_HASH_SHARE = 1 / 16
+EVAL_CACHE_SHARE = 1 / 16
+
+
+def setHashSize(megabytes, context=None):
+    """Replaces the transposition table and evaluation cache of context, or
+    the default context if None, with empty ones. Together with the share of
+    the pawn structure table they use about megabytes MB. The pawn structure
+    table is shared by all contexts, so it's only replaced when sizing the
+    default context."""
+    ctx = defaultContext if context is None else context
+    size = megabytes * 1024 * 1024
+    pawnSize = int(size * PAWN_HASH_SHARE)
+    evalSize = int(size * EVAL_CACHE_SHARE)
+    if context is None:
+        setPawnHashSize(pawnSize)
+    ctx.evalCache = EvalCache(evalSize)
+    ctx.table = TranspositionTable(
+        size - pawnSize - evalSize, shared=ctx.table.shared, path=ctx.table.path
+    )
+
+
+def setHashFile(path, context=None):
+    """Replaces the transposition table of context, or the default context if
+    None, with one stored in the file path, or in memory if path is None.
+    An existing file is loaded, and decides the size of the table."""
+    ctx = defaultContext if context is None else context
+    table = ctx.table
+    if path == table.path:
+        return
+    table.save()
+    size = table.buckets * table.bucketSize
+    if path is not None and os.path.isfile(path) and os.path.getsize(path):
+        size = os.path.getsize(path)
+    ctx.table = TranspositionTable(
+        size, shared=table.shared and path is None, path=path
+    )
+
+
+class _LsearchModule(ModuleType):
+    """Makes the state of defaultContext readable and writable as module
+    attributes, as it was before search contexts were introduced."""
+
+
+def _forwardToDefault(name):
+    return property(
+        lambda module: getattr(defaultContext, name),
+        lambda module, value: setattr(defaultContext, name, value),
+    )
+
+
+for _name in (
+    "table",
+    "skipPruneChance",
+    "searching",
+    "nodes",
+    "qnodes",
+    "endtime",
+    "nodeLimit",
+    "excludedMoves",
+    "timecheck_counter",
+    "timecheckFreq",
+    "egtb",
+    "evalCache",
+    "nullMove",
+    "lateMoveReductions",
+    "futilityPruning",
+    "razoring",
+    "deltaPruning",
+    "seePruning",
+    "qsearchChecks",
+):
+    setattr(_LsearchModule, _name, _forwardToDefault(_name))
+
+sys.modules[__name__].__class__ = _LsearchModule
@@ -1,14 +1,15 @@
 import sys
 
 from .attack import staticExchangeEvaluate
+from .bitboard import bitPosArray
 from .ldata import PIECE_VALUES, ASEAN_PIECE_VALUES, PAWN_VALUE, MATE_VALUE
 from .lmove import GATE_PIECE
+from .lmovegen import genAllMoves, genCaptures, isPseudoLegal
 from pychess.Utils.const import (
     DROP,
     EMPTY,
-    ASEAN_VARIANTS,
+    ENPASSANT,
     PROMOTIONS,
-    ATOMICCHESS,
     GATINGS,
 )
 from pychess.Utils.eval import pos as position_values
@@ -16,12 +17,18 @@ from pychess.Variants.atomic import kingExplode
 
 
 def getCaptureValue(board, move):
-    if board.variant in ASEAN_VARIANTS:
-        mpV = ASEAN_PIECE_VALUES[board.arBoard[move >> 6 & 63]]
-        cpV = ASEAN_PIECE_VALUES[board.arBoard[move & 63]]
+    mpV = PIECE_VALUES[board.arBoard[move >> 6 & 63]]
+    cpV = PIECE_VALUES[board.arBoard[move & 63]]
+    if mpV < cpV:
+        return cpV - mpV
     else:
-        mpV = PIECE_VALUES[board.arBoard[move >> 6 & 63]]
-        cpV = PIECE_VALUES[board.arBoard[move & 63]]
+        temp = staticExchangeEvaluate(board, move)
+        return temp < 0 and -sys.maxsize or temp
+
+
+def getAseanCaptureValue(board, move):
+    mpV = ASEAN_PIECE_VALUES[board.arBoard[move >> 6 & 63]]
+    cpV = ASEAN_PIECE_VALUES[board.arBoard[move & 63]]
     if mpV < cpV:
         return cpV - mpV
     else:
@@ -43,7 +50,8 @@ def getMoveValue(board, table, depth, move):
     2.  Captures as above.
     3.  Killers.
     4.  History.
-    5.  Moves to the centre."""
+    5.  Moves to the centre.
+    The Asean variants and atomic have their own versions below."""
 
     # As we only return directly from transposition table if hashf == hashfEXACT
     # There could be a non  hashfEXACT very promising move for us to test
@@ -60,20 +68,11 @@ def getMoveValue(board, table, depth, move):
     tpiece = arBoard[tcord]
 
     if tpiece != EMPTY:
-        if board.variant == ATOMICCHESS:
-            if kingExplode(board, move, board.color):
-                return MATE_VALUE
         # We add some extra to ensure also bad captures will be searched early
-        if board.variant in ASEAN_VARIANTS:
-            return ASEAN_PIECE_VALUES[tpiece] - PIECE_VALUES[fpiece] + 1000
-        else:
-            return PIECE_VALUES[tpiece] - PIECE_VALUES[fpiece] + 1000
+        return PIECE_VALUES[tpiece] - PIECE_VALUES[fpiece] + 1000
 
     if flag in PROMOTIONS:
-        if board.variant in ASEAN_VARIANTS:
-            return ASEAN_PIECE_VALUES[flag - 3] - PAWN_VALUE + 1000
-        else:
-            return PIECE_VALUES[flag - 3] - PAWN_VALUE + 1000
+        return PIECE_VALUES[flag - 3] - PAWN_VALUE + 1000
 
     if flag == DROP:
         return PIECE_VALUES[tpiece] + 1000
@@ -90,20 +89,17 @@ def getMoveValue(board, table, depth, move):
     # opking = board.kings[1-board.color]
     # score = distance[fpiece][fcord][opking] - distance[fpiece][tcord][opking]
 
-    if board.variant in ASEAN_VARIANTS:
-        score = 0
-    else:
-        try:
-            score = (
-                position_values[fpiece][board.color][tcord]
-                - position_values[fpiece][board.color][fcord]
-            )
-            # print("NOT EMPTY fpiece", fpiece, fcord, tcord)
-            # print(board)
-        except KeyError:
-            print("EMPTY fpiece!!!", fpiece, fcord, tcord)
-            print(board)
-            raise
+    try:
+        score = (
+            position_values[fpiece][board.color][tcord]
+            - position_values[fpiece][board.color][fcord]
+        )
+        # print("NOT EMPTY fpiece", fpiece, fcord, tcord)
+        # print(board)
+    except KeyError:
+        print("EMPTY fpiece!!!", fpiece, fcord, tcord)
+        print(board)
+        raise
 
     # History heuristic
     score += table.getButterfly(move)
@@ -111,9 +107,96 @@ def getMoveValue(board, table, depth, move):
     return score
 
 
+def getAtomicMoveValue(board, table, depth, move):
+    # Captures blowing up the enemy king win at once
+    if (
+        board.arBoard[move & 63] != EMPTY
+        and not table.isHashMove(depth, move)
+        and kingExplode(board, move, board.color)
+    ):
+        return MATE_VALUE
+    return getMoveValue(board, table, depth, move)
+
+
+def getAseanMoveValue(board, table, depth, move):
+    if table.isHashMove(depth, move):
+        return sys.maxsize
+
+    fcord = (move >> 6) & 63
+    tcord = move & 63
+    flag = move >> 12
+
+    arBoard = board.arBoard
+    fpiece = fcord if flag == DROP else arBoard[fcord]
+    tpiece = arBoard[tcord]
+
+    if tpiece != EMPTY:
+        return ASEAN_PIECE_VALUES[tpiece] - PIECE_VALUES[fpiece] + 1000
+
+    if flag in PROMOTIONS:
+        return ASEAN_PIECE_VALUES[flag - 3] - PAWN_VALUE + 1000
+
+    if flag == DROP:
+        return PIECE_VALUES[tpiece] + 1000
+
+    killervalue = table.isKiller(depth, move)
+    if killervalue:
+        return 1000 + killervalue
+
+    # No centre tables for the Asean pieces, so history only
+    return table.getButterfly(move)
+
+
 def sortMoves(board, table, ply, hashmove, moves):
     def sort_moves_func(move):
         return getMoveValue(board, table, ply, hashmove, move)
 
     moves.sort(key=sort_moves_func, reverse=True)
     return moves
+
+
+def genStagedMoves(board, table, depth):
+    """Yields (-value, move) pairs in about the order getMoveValue would sort
+    them, but generates each group of moves only when the previous groups
+    didn't give a cutoff:
+    1.  The move from the hash table, when isPseudoLegal vouches for it.
+    2.  Captures winning or trading material, best first.
+    3.  Non captures: promotions, killers, then history and centre moves.
+    4.  Captures losing material according to the SEE.
+    Not for positions in check, and not for variants with drops or ASEAN
+    pieces, as isPseudoLegal and genCaptures don't cover those."""
+
+    hashMove = table.hashmove[depth]
+    if hashMove != -1 and isPseudoLegal(board, hashMove):
+        yield -sys.maxsize, hashMove
+    else:
+        hashMove = -1
+
+    goodCaptures = []
+    badCaptures = []
+    for move in genCaptures(board):
+        if move == hashMove:
+            continue
+        value = getCaptureValue(board, move)
+        if value < 0:
+            badCaptures.append((-getMoveValue(board, table, depth, move), move))
+        else:
+            goodCaptures.append((-1000 - value, move))
+    goodCaptures.sort()
+    yield from goodCaptures
+
+    # The board is back in the same position when we get here, as the search
+    # pops every move it applies before asking for the next one.
+    enemies = board.friends[1 - board.color]
+    quiets = [
+        (-getMoveValue(board, table, depth, move), move)
+        for move in genAllMoves(board)
+        if not enemies & bitPosArray[move & 63]
+        and move >> 12 != ENPASSANT
+        and move != hashMove
+    ]
+    quiets.sort()
+    yield from quiets
+
+    badCaptures.sort()
+    yield from badCaptures
@@ -1,35 +1,245 @@
+"""Perft counts the leaf nodes of the move tree of a position to a fixed depth.
+Comparing the counts with known ones checks the move generator, and timing
+them measures its speed.
+
+Run as a script it counts the positions of EPD files, like the perftsuite
+files of testing/gamefiles, which give the known counts as ;D1 20 ;D2 400 ...
+
+    python -m pychess.Utils.lutils.perft -d 4 -H 64 -j 4 perftsuite.epd
+
+With --divide N the deepest count of each position is broken down by the
+moves of its first N plies, to find the move a wrong count comes from."""
+
+import argparse
+import multiprocessing
+import sys
+from array import array
 from time import time
 
-from pychess.Utils.lutils.lmovegen import genAllMoves
+from pychess.Utils.const import (
+    NORMALCHESS,
+    FISCHERRANDOMCHESS,
+    CRAZYHOUSECHESS,
+    ATOMICCHESS,
+)
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmovegen import genLegalMoves
 from pychess.Utils.lutils.lmove import toLAN
 
+# The variants of the EPD files the script can count
+VARIANTS = {
+    "normal": NORMALCHESS,
+    "fischerandom": FISCHERRANDOMCHESS,
+    "crazyhouse": CRAZYHOUSECHESS,
+    "atomic": ATOMICCHESS,
+}
 
-def do_perft(board, depth, root):
-    nodes = 0
+# An entry consists of:
+# key    board hash
+# depth  depth of the count
+# count  leaf nodes
+entrySize = array("Q").itemsize * 2 + array("B").itemsize
+
+
+class PerftTable:
+    """Counts of positions at depths, so that transpositions are counted
+    only once. It has a fixed number of entries, and new entries always
+    replace old ones."""
+
+    def __init__(self, maxSize):
+        """A table of about maxSize bytes"""
+        assert maxSize > 0
+        self.size = max(1, maxSize // entrySize)
+        self.keys = array("Q", bytes(8 * self.size))
+        self.depths = array("B", bytes(self.size))
+        self.counts = array("Q", bytes(8 * self.size))
+
+    def probe(self, hash, depth):
+        """Returns the count recorded for hash at depth, or None"""
+        index = (hash ^ depth * 0x9E3779B97F4A7C15) % self.size
+        if self.keys[index] == hash and self.depths[index] == depth:
+            return self.counts[index]
+        return None
+
+    def record(self, hash, depth, count):
+        index = (hash ^ depth * 0x9E3779B97F4A7C15) % self.size
+        self.keys[index] = hash
+        self.depths[index] = depth
+        self.counts[index] = count
+
+
+def do_perft(board, depth, root=0, table=None):
+    """Counts the leaf nodes of board at depth. The moves of the first root
+    plies are printed with their counts. Counts of depths above 1 are looked
+    up in, and recorded to, table if given."""
     if depth == 0:
         return 1
+    useTable = table is not None and depth > 1 and root <= 0
+    if useTable:
+        nodes = table.probe(board.hash, depth)
+        if nodes is not None:
+            return nodes
 
-    for move in genAllMoves(board):
-        board.applyMove(move)
-        if board.opIsChecked():
-            board.popMove()
-            continue
+    if depth == 1 and root <= 0:
+        # The legal moves are the leaves themselves
+        nodes = 0
+        for move in genLegalMoves(board):
+            nodes += 1
+        return nodes
 
-        count = do_perft(board, depth - 1, root - 1)
+    nodes = 0
+    for move in list(genLegalMoves(board)):
+        board.applyMove(move)
+        count = do_perft(board, depth - 1, root - 1, table)
         nodes += count
         board.popMove()
         if root > 0:
             print("%8s %10d %10d" % (toLAN(board, move), count, nodes))
 
+    if useTable:
+        table.record(board.hash, depth, nodes)
     return nodes
 
 
-def perft(board, depth, root):
+# The table of a process of the pool of countNodes
+_table = None
+
+
+def _initProcess(hashSize):
+    global _table
+    _table = PerftTable(hashSize) if hashSize else None
+
+
+def _countMove(args):
+    board, move, depth = args
+    board.applyMove(move)
+    return do_perft(board, depth - 1, table=_table)
+
+
+def createPool(processes, hashSize=0):
+    """A pool for countNodes, in which each process has a table of about
+    hashSize bytes if hashSize isn't 0"""
+    return multiprocessing.Pool(processes, _initProcess, (hashSize,))
+
+
+def countNodes(board, depth, table=None, pool=None):
+    """Counts the leaf nodes of board at depth. With a pool of createPool, the
+    root moves are shared out between its processes."""
+    if pool is None or depth < 2:
+        return do_perft(board, depth, table=table)
+    jobs = [(board, move, depth) for move in genLegalMoves(board)]
+    return sum(pool.imap_unordered(_countMove, jobs))
+
+
+def perft(board, depth, root, table=None):
     for i in range(depth):
         start_time = time()
-        nodes = do_perft(board, i + 1, root)
+        nodes = do_perft(board, i + 1, root, table)
         ttime = time() - start_time
         print(
             "%2d %10d %5.2f %12.2fnps"
             % (i + 1, nodes, ttime, nodes / ttime if ttime > 0 else nodes)
         )
+
+
+def readEpd(path):
+    """Yields the FEN and the known counts, indexed by depth - 1, of the
+    positions of an EPD file"""
+    with open(path) as f:
+        for line in f:
+            fields = line.split(";")
+            fen = fields[0].strip()
+            if not fen:
+                continue
+            counts = []
+            for field in fields[1:]:
+                op, count = field.split()
+                assert op == "D%d" % (len(counts) + 1), op
+                counts.append(int(count))
+            yield fen, counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Counts the leaf nodes of the positions of EPD files, and "
+        "compares them with the counts the files give"
+    )
+    parser.add_argument("epdfiles", nargs="+", metavar="EPDFILE")
+    parser.add_argument(
+        "-d", "--depth", type=int, default=4, help="the deepest depth to count"
+    )
+    parser.add_argument("-v", "--variant", choices=sorted(VARIANTS), default="normal")
+    parser.add_argument(
+        "-H",
+        "--hash",
+        type=int,
+        default=0,
+        metavar="MB",
+        help="the size of the perft hash table of each process, 0 for none",
+    )
+    parser.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        default=1,
+        help="the number of processes to share the root moves out to",
+    )
+    parser.add_argument(
+        "--divide",
+        type=int,
+        default=0,
+        metavar="N",
+        help="print the count of each move of the first N plies at the deepest "
+        "depth, counting in this process only",
+    )
+    args = parser.parse_args(argv)
+
+    hashSize = args.hash * 1024 * 1024
+    table = PerftTable(hashSize) if hashSize else None
+    # The moves are printed in order, so the pool isn't used to divide
+    pool = (
+        createPool(args.processes, hashSize)
+        if args.processes > 1 and not args.divide
+        else None
+    )
+
+    failures = 0
+    total_nodes = 0
+    start_time = time()
+    try:
+        for path in args.epdfiles:
+            for fen, counts in readEpd(path):
+                board = LBoard(VARIANTS[args.variant])
+                board.applyFen(fen)
+                print(fen)
+                counts = counts[: args.depth]
+                for depth, expected in enumerate(counts, 1):
+                    pos_time = time()
+                    if args.divide and depth == len(counts):
+                        nodes = do_perft(board, depth, args.divide, table)
+                    else:
+                        nodes = countNodes(board, depth, table, pool)
+                    pos_time = time() - pos_time
+                    total_nodes += nodes
+                    status = "ok" if nodes == expected else "FAILED"
+                    print(
+                        "%2d %12d %12d %8.2f s  %s"
+                        % (depth, expected, nodes, pos_time, status)
+                    )
+                    if nodes != expected:
+                        failures += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    ttime = time() - start_time
+    print(
+        "Total: %d nodes in %.2f s: %.0f nps, %d failures"
+        % (total_nodes, ttime, total_nodes / ttime if ttime > 0 else 0, failures)
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
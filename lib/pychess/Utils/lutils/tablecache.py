@@ -0,0 +1,69 @@
+"""Disk cache for the lookup tables lutils modules build when imported.
+
+Building the tables takes a good part of the start up time of the PyChess
+engine, which matters when many short lived engine processes are spawned.
+Each module's tables are marshalled to a file in the user cache dir, tagged
+with a checksum of the sources of the module and of the modules its tables are
+built from, so that changing any of them makes the cache stale and it's rebuilt
+on the next import."""
+
+import marshal
+import os
+import zlib
+
+from pychess.System.prefix import getUserCachePrefix
+
+# Bump when the layout of the cache files changes
+CACHE_FORMAT = 1
+
+# The directory of the cache files, or None to build the tables on every
+# import. Unit tests don't leave files behind in the user cache dir.
+cacheDir = None if os.environ.get("PYCHESS_UNITTEST") else getUserCachePrefix()
+
+
+def _version(sourcefiles):
+    checksum = 0
+    for sourcefile in sourcefiles:
+        with open(sourcefile, "rb") as f:
+            checksum = zlib.crc32(f.read(), checksum)
+    return (CACHE_FORMAT, marshal.version, checksum)
+
+
+def _path(name):
+    return os.path.join(cacheDir, "%s.tables" % name)
+
+
+def loadTables(name, sourcefiles):
+    """Returns the dict of tables saved by saveTables for the module name, or
+    None if there are none or they were built by another version of one of
+    sourcefiles, the sources the tables are built from"""
+    if cacheDir is None:
+        return None
+    try:
+        version = _version(sourcefiles)
+        with open(_path(name), "rb") as f:
+            cached_version, tables = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cached_version != version:
+        return None
+    return tables
+
+
+def saveTables(name, sourcefiles, tables):
+    """Saves tables, a dict of names to marshallable values. Errors are ignored,
+    as we can always build the tables again."""
+    if cacheDir is None:
+        return
+    path = _path(name)
+    # Other processes may be reading or writing the same cache
+    temppath = "%s.%d" % (path, os.getpid())
+    try:
+        with open(temppath, "wb") as f:
+            f.write(marshal.dumps((_version(sourcefiles), tables)))
+        os.replace(temppath, path)
+    except (OSError, ValueError):
+        try:
+            os.remove(temppath)
+        except OSError:
+            pass
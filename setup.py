@@ -380,6 +380,7 @@ setup(
         "SQLAlchemy>=2",
         "websockets",
     ],
+    extras_require={"numpy": ["numpy"]},
     package_dir={"": "lib"},
     packages=PACKAGES,
     data_files=DATA_FILES,
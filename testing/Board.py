@@ -1,7 +1,9 @@
 import unittest
 
 from pychess.Utils.const import (
+    WHITE,
     BLACK,
+    THREECHECKCHESS,
     KING,
     ROOK,
     D2,
@@ -23,6 +25,9 @@ from pychess.Utils.Cord import Cord
 from pychess.Utils.Board import Board
 from pychess.Utils.Move import Move
 from pychess.Utils.Piece import Piece
+from pychess.Utils.lutils.lmove import parseSAN
+from pychess.Variants import variants
+from pychess.Variants.threecheck import checkCount
 
 
 class BoardTestCase(unittest.TestCase):
@@ -52,6 +57,47 @@ class BoardTestCase(unittest.TestCase):
         self.assertEqual(board[Cord(G8)].piece, Piece(BLACK, KING).piece)
         self.assertEqual(board[Cord(F8)].piece, Piece(BLACK, ROOK).piece)
 
+    def test2(self):
+        """Testing Board.move() sharing the move history between boards"""
+        board = Board(setup=True)
+        boards = [board]
+        sans = "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 Ng1 Ng8 Nf3 Nf6 Ng1 Ng8 Nf3 Nf6".split()
+        for san in sans:
+            board = board.move(Move(parseSAN(board.board, san)))
+            boards.append(board)
+        fens = [b.asFen() for b in boards]
+
+        self.assertEqual(board.board.repetitionCount(), 3)
+
+        lboard = board.board
+        while lboard.hist_move:
+            lboard.popMove()
+        self.assertEqual(lboard.asFen(), fens[0])
+        self.assertEqual(lboard.hash, boards[0].board.hash)
+
+        # Popping the moves of one board must not change the others
+        self.assertEqual([b.asFen() for b in boards[:-1]], fens[:-1])
+        for b in boards[1:-1]:
+            b.board.popMove()
+        self.assertEqual([b.asFen() for b in boards[1:-1]], fens[:-2])
+
+    def test3(self):
+        """Testing a plain clone of a board sharing its history keeps it all"""
+        board = variants[THREECHECKCHESS](setup=True)
+        sans = "e4 e5 Bc4 Nc6 Bxf7+ Kxf7 Qh5+ g6 Nf3 Nf6 Ng1 Ng8 Nf3 Nf6 Ng1".split()
+        for san in sans:
+            board = board.move(Move(parseSAN(board.board, san)))
+        self.assertIsNotNone(board.board.hist_parent)
+
+        clone = board.board.clone()
+        # The checks given to each color
+        self.assertEqual(checkCount(clone, WHITE), 0)
+        self.assertEqual(checkCount(clone, BLACK), 2)
+        for san in sans:
+            clone.popMove()
+        start = variants[THREECHECKCHESS](setup=True)
+        self.assertEqual(clone.asFen(), start.asFen())
+
 
 if __name__ == "__main__":
     unittest.main()
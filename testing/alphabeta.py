@@ -1,8 +1,14 @@
 import unittest
 from time import time
 
+from pychess.Utils.Board import Board
+from pychess.Utils.const import H1, H8, hashfEXACT
 from pychess.Variants.losers import LosersBoard
 from pychess.Utils.lutils import lsearch
+from pychess.Utils.lutils.SearchStrategy import LosersStrategy, SearchStrategy
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmovegen import genAllMoves, newMove
+from pychess.Utils.lutils.validator import validateMove
 
 # ♜ ♞ ♝ ♛ ♚ . ♞ ♜
 # ♟ . ♟ . . ♟ ♟ ♟
@@ -14,6 +20,15 @@ from pychess.Utils.lutils import lsearch
 # ♖ . ♗ ♕ ♔ ♗ ♘ ♖
 FEN0 = "rnbqk1nr/p1p2ppp/1p2p3/3pP3/1b1P4/2N5/PPP2PPP/R1BQKBNR w KQkq - 0 5"
 
+FEN1 = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+FEN2 = "4k3/8/8/8/8/8/8/R3K3 w - - 0 1"
+
+FEN3 = "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16"
+
+# The selectivity of alphaBeta, each of which can be switched off
+SELECTIVITY = ("nullMove", "lateMoveReductions", "futilityPruning", "razoring")
+
 
 class alphabetaTests(unittest.TestCase):
     def test1(self):
@@ -29,6 +44,135 @@ class alphabetaTests(unittest.TestCase):
 
         self.assertNotEqual(mvs, [])
 
+    def test2(self):
+        """Testing lsearch.alphaBeta() with separate search contexts"""
+
+        board = LosersBoard(setup=FEN0)
+
+        lsearch.searching = False
+        context = lsearch.SearchContext()
+        context.searching = True
+        context.endtime = time() + 1
+
+        mvs, scr = lsearch.alphaBeta(board.board, 1, context=context)
+
+        self.assertNotEqual(mvs, [])
+        self.assertGreater(context.nodes, 0)
+        self.assertFalse(lsearch.searching)
+        self.assertIsNot(context.table, lsearch.table)
+
+    def test3(self):
+        """Testing lsearch.alphaBeta() quiescent search options"""
+
+        qnodes = {}
+        for options in ((False, False, False), (True, True, False), (True, True, True)):
+            board = Board(setup=FEN1)
+            context = lsearch.SearchContext()
+            context.deltaPruning, context.seePruning, context.qsearchChecks = options
+            context.searching = True
+            context.endtime = time() + 60
+
+            mvs, scr = lsearch.alphaBeta(board.board, 2, context=context)
+
+            self.assertNotEqual(mvs, [])
+            self.assertGreater(context.qnodes, 0)
+            self.assertLess(context.qnodes, context.nodes)
+            qnodes[options] = context.qnodes
+
+        self.assertLess(qnodes[(True, True, False)], qnodes[(False, False, False)])
+
+        # Without captures, only the checks are searched
+        for qsearchChecks in (False, True):
+            board = Board(setup=FEN2)
+            context = lsearch.SearchContext()
+            context.qsearchChecks = qsearchChecks
+            context.searching = True
+            context.endtime = time() + 60
+
+            lsearch.alphaBeta(board.board, 0, context=context)
+            self.assertEqual(context.qnodes > 0, qsearchChecks)
+
+    def test4(self):
+        """Testing lsearch.alphaBeta() leaving root moves out"""
+
+        board = Board(setup=FEN2)
+        context = lsearch.SearchContext()
+        context.searching = True
+        context.endtime = time() + 60
+
+        mvs, scr = lsearch.alphaBeta(board.board, 3, context=context)
+        context.excludedMoves = frozenset(mvs[:1])
+        mvs2, scr2 = lsearch.alphaBeta(board.board, 3, context=context)
+
+        self.assertNotEqual(mvs2[0], mvs[0])
+        self.assertLessEqual(scr2, scr)
+
+        # All moves left out
+        context.excludedMoves = frozenset(
+            move for move in genAllMoves(board.board) if validateMove(board.board, move)
+        )
+        self.assertEqual(lsearch.alphaBeta(board.board, 3, context=context)[0], [])
+
+    def test5(self):
+        """Testing lsearch.alphaBeta() picks the strategy of the variant"""
+
+        context = lsearch.SearchContext()
+        context.searching = True
+        context.endtime = time() + 10
+
+        board = LosersBoard(setup=FEN0)
+        mvs, scr = lsearch.alphaBeta(board.board, 2, context=context)
+        self.assertNotEqual(mvs, [])
+        self.assertIsInstance(context.strategy, LosersStrategy)
+
+        board = Board(setup=FEN1)
+        mvs, scr = lsearch.alphaBeta(board.board, 2, context=context)
+        self.assertNotEqual(mvs, [])
+        self.assertIs(type(context.strategy), SearchStrategy)
+
+    def test6(self):
+        """Testing lsearch.alphaBeta() selectivity options one at a time"""
+
+        def search(*options):
+            board = LBoard()
+            board.applyFen(FEN3)
+            context = lsearch.SearchContext()
+            for option in SELECTIVITY:
+                setattr(context, option, option in options)
+            context.searching = True
+            context.endtime = time() + 60
+
+            mvs, scr = lsearch.alphaBeta(board, 4, context=context)
+            return mvs[0], scr, context.nodes
+
+        move, scr, nodes = search()
+        optionNodes = []
+        for option in SELECTIVITY:
+            move2, scr2, nodes2 = search(option)
+            # Each of them saves nodes on its own, without changing the result
+            self.assertEqual((move2, scr2), (move, scr), option)
+            self.assertLess(nodes2, nodes, option)
+            optionNodes.append(nodes2)
+
+        move2, scr2, nodes2 = search(*SELECTIVITY)
+        self.assertEqual((move2, scr2), (move, scr))
+        self.assertLess(nodes2, min(optionNodes))
+
+    def test7(self):
+        """Testing lsearch.alphaBeta() not playing a bad move from the table"""
+
+        board = LBoard()
+        board.applyFen(FEN2)
+        context = lsearch.SearchContext()
+        context.searching = True
+        context.endtime = time() + 60
+        # As if a helper had been writing the entry, or another position
+        # shared its key
+        context.table.record(board, newMove(H8, H1), 0, hashfEXACT, 10)
+
+        mvs, scr = lsearch.alphaBeta(board, 2, context=context)
+        self.assertTrue(validateMove(board, mvs[0]))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -147,6 +147,30 @@ class CECPTests(EmittingTestCase):
             "182010903",
         )
 
+    async def test3(self):
+        """Test analyzing with the multiPV option of the engine"""
+
+        await self.engineA.putline('feature option="multiPV -spin 1 1 64"')
+        self.assertEqual(self.analyzerA.maxAnalysisLines(), 64)
+        self.assertEqual(self.analyzerA.requestMultiPV(2), 2)
+        self.assertEqual(self.analyzerA.getAnalysisLines(), 2)
+
+        board = Board("5k2/PK6/8/8/8/6P1/6P1/8 w - - 1 48")
+        self.analyzerA.setBoardList([board], [])
+        self.traceSignal(self.analyzerA, "analyze")
+
+        first = (94, ["a8=Q+", "Kf7"], 1833, "3.", "")
+        second = (94, ["a8=R", "Ke7"], 500, "3.", "")
+        await self.engineA.putline("3. 1833 0 1000     a8=Q+ Kf7")
+        self.assertEqual(self.getSignalResults(self.analyzerA), ([first, None],))
+        await self.engineA.putline("3. 500 0 1000     a8=R Ke7")
+        self.assertEqual(self.getSignalResults(self.analyzerA), ([first, second],))
+
+        # The first line of the next depth only replaces the first line
+        deeper = (94, ["a8=Q+", "Kf7", "Qa2+"], 1850, "4.", "")
+        await self.engineA.putline("4. 1850 0 2000     a8=Q+ Kf7 Qa2+")
+        self.assertEqual(self.getSignalResults(self.analyzerA), ([deeper, second],))
+
 
 if __name__ == "__main__":
     unittest.main()
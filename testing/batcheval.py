@@ -0,0 +1,73 @@
+import random
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pychess.Utils.const import WHITE, BLACK, NORMALCHESS
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.leval import evaluateComplete, evalMaterial
+from pychess.Utils.lutils.lmovegen import genLegalMoves
+from pychess.Utils.lutils.Benchmark import benchmarkPositions
+
+if numpy is not None:
+    from pychess.Utils.lutils.BatchEval import (
+        packBoards,
+        unpackBoard,
+        evaluateBatch,
+        evalMaterialBatch,
+    )
+
+
+def randomPositions(count):
+    """Positions of random games from the benchmark positions"""
+    random.seed(25)
+    boards = []
+    while len(boards) < count:
+        board = LBoard(NORMALCHESS)
+        board.applyFen(random.choice(benchmarkPositions))
+        for i in range(random.randint(1, 80)):
+            moves = list(genLegalMoves(board))
+            if not moves:
+                break
+            board.applyMove(random.choice(moves))
+        boards.append(board)
+    return boards
+
+
+@unittest.skipIf(numpy is None, "BatchEval needs NumPy")
+class BatchEvalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.boards = randomPositions(300)
+        self.packed = packBoards(self.boards)
+
+    def test1(self):
+        """Testing evaluateBatch scores positions like evaluateComplete"""
+        scores = evaluateBatch(self.packed)
+        whiteScores = evaluateBatch(self.packed, WHITE)
+        blackScores = evaluateBatch(self.packed, BLACK)
+        for i, board in enumerate(self.boards):
+            self.assertEqual(scores[i], evaluateComplete(board, board.color))
+            self.assertEqual(whiteScores[i], evaluateComplete(board, WHITE))
+            self.assertEqual(blackScores[i], evaluateComplete(board, BLACK))
+
+    def test2(self):
+        """Testing evalMaterialBatch scores material like evalMaterial"""
+        scores, phases = evalMaterialBatch(self.packed, WHITE)
+        for i, board in enumerate(self.boards):
+            self.assertEqual((scores[i], phases[i]), tuple(evalMaterial(board, WHITE)))
+
+    def test3(self):
+        """Testing unpackBoard gives back the packed positions"""
+        for i, board in enumerate(self.boards):
+            unpacked = unpackBoard(self.packed, i)
+            self.assertEqual(unpacked.asFen().split()[:3], board.asFen().split()[:3])
+            self.assertEqual(
+                evaluateComplete(unpacked, WHITE), evaluateComplete(board, WHITE)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
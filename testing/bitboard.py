@@ -5,6 +5,9 @@ import operator
 from functools import reduce
 
 from pychess.Utils.lutils.bitboard import setBit, clearBit, firstBit, lastBit, iterBits
+from pychess.Utils.lutils import attack
+from pychess.Utils.lutils.ldata import ray00, ray45, ray90, ray135
+from pychess.Utils.lutils.ldata import attack00, attack45, attack90, attack135
 
 
 class BitboardTestCase(unittest.TestCase):
@@ -51,6 +54,23 @@ class BitboardTestCase(unittest.TestCase):
             itered = sorted(iterBits(board))
             self.assertEqual(positions, itered)
 
+    def test4(self):
+        """Testing sliding attack arrays against the dicts"""
+
+        for rays, attacks, index in (
+            (ray00, attack00, attack._rankIndex),
+            (ray90, attack90, attack._fileIndex),
+            (ray45, attack45, attack._diagonalIndex),
+            (ray135, attack135, attack._diagonalIndex),
+        ):
+            table = attack._attackArray(attacks, index)
+            for positions, board in self.positionSets:
+                for cord in positions:
+                    self.assertEqual(
+                        table[index(cord, board & rays[cord])],
+                        attacks[cord][board & rays[cord]],
+                    )
+
 
 if __name__ == "__main__":
     unittest.main()
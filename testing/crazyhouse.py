@@ -5,7 +5,8 @@ from pychess.Utils.Move import Move, parseSAN
 from pychess.Variants.crazyhouse import CrazyhouseBoard
 from pychess.Utils.lutils.lmovegen import genAllMoves, genCheckEvasions
 from pychess.Utils.lutils.LBoard import LBoard
-from pychess.Utils.const import CRAZYHOUSECHESS
+from pychess.Utils.lutils.lmove import parseSAN as lparseSAN
+from pychess.Utils.const import CRAZYHOUSECHESS, BLACK, PAWN, QUEEN, B7
 
 # Black has a pawn and a rook in hes holding
 # ♚ . ♖ ♔ . . . . ♟ ♜
@@ -37,6 +38,9 @@ FEN1 = "r1r5/pp3Nkp/5bp1/2pPp2n/4P1Q1/5P2/Pnp1R1PP/K2q1BNR/bbPPQ w - - 3 25"
 # ♖ ♘ ♗ ♕ ♔ ♗ ♘ ♖
 FEN2 = "rnbqkbRr/pPPppNpp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 
+# The queen on b7 is a promoted pawn
+FEN3 = "4k3/1Q~6/8/8/4b3/8/Kpp5/8/ b - - 0 1"
+
 
 class CrazyhouseTestCase(unittest.TestCase):
     def test_validate(self):
@@ -69,6 +73,19 @@ class CrazyhouseTestCase(unittest.TestCase):
         self.assertTrue(parseSAN(board, "P@b1").move not in evasions)
         self.assertTrue(parseSAN(board, "P@c1").move not in evasions)
 
+    def test_promoted_fen(self):
+        """Testing Crazyhouse promoted pieces in FEN"""
+
+        board = LBoard(variant=CRAZYHOUSECHESS)
+        board.applyFen(FEN3)
+        self.assertEqual(board.promoted, [int(cord == B7) for cord in range(64)])
+        self.assertEqual(board.asFen().split()[0], FEN3.split()[0][:-1])
+
+        # Capturing it gives a pawn
+        board.applyMove(lparseSAN(board, "Bxb7"))
+        self.assertEqual(board.holding[BLACK][PAWN], 1)
+        self.assertEqual(board.holding[BLACK][QUEEN], 0)
+
     def test_apply_pop(self):
         """Testing Crazyhouse applyMove popMove"""
 
@@ -2,7 +2,10 @@ import os.path
 import unittest
 
 from pychess.Savers import pgn
+from pychess.Utils.const import FEN_START
 from pychess.Utils.lutils import ldraw
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lmove import parseSAN
 from pychess.System.protoopen import protoopen
 
 
@@ -62,6 +65,27 @@ class DrawTestCase(unittest.TestCase):
             lboard = model.boards[-1].board
             self.assertEqual(ldraw.testMaterial(lboard), True)
 
+    def test4(self):
+        """Testing repetition counts through moves taken back and clones"""
+        lboard = LBoard()
+        lboard.applyFen(FEN_START)
+        counts = []
+        for san in "Nf3 Nf6 Ng1 Ng8 Nf3 Nf6 Ng1 Ng8 e4 Nf6 Nf3 Ng8 Ng1".split():
+            lboard.applyMove(parseSAN(lboard, san))
+            counts.append(lboard.repetitionCount())
+        # The pawn move resets the fifty move counter, and what came before
+        # can't be repeated
+        self.assertEqual(counts, [1, 1, 1, 2, 2, 2, 2, 3, 1, 1, 1, 1, 2])
+        self.assertTrue(ldraw.test(lboard))
+
+        clone = lboard.clone(shareHistory=True)
+        for board in (lboard, clone):
+            for count in reversed(counts[:-1]):
+                board.popMove()
+                self.assertEqual(board.repetitionCount(), count)
+            board.popMove()
+            self.assertEqual(board.repetitionCount(), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,13 +1,30 @@
+import json
+import os
+import tempfile
 import unittest
+from multiprocessing import RawArray, RawValue
+from queue import SimpleQueue
+from threading import Thread
 from unittest.mock import patch, MagicMock
 from io import StringIO
+from time import sleep, time
 
 from pychess.Players.PyChessCECP import PyChessCECP
+from pychess.Utils.const import FEN_START, LOSERSCHESS, CRAZYHOUSECHESS, ATOMICCHESS
+from pychess.Utils.lutils import leval, lsearch
+from pychess.Utils.lutils.LazySMP import SEARCH_OPTIONS, _helperMain
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.leval import evaluateComplete
+from pychess.Utils.lutils.lmove import parseSAN, toSAN
+from pychess.Utils.lutils.lmovegen import genLegalMoves
 
 
 class EngineTests(unittest.TestCase):
     def setUp(self):
         self.engine = PyChessCECP()
+        # The engines share the transposition table, and hash hits from an
+        # earlier test could leave a search without a move to ponder on
+        lsearch.table.clear()
 
     @patch("sys.stdout", new_callable=StringIO)
     @patch(
@@ -48,6 +65,258 @@ class EngineTests(unittest.TestCase):
 
         self.assertTrue(output.endswith("n/s\n"))
 
+    @patch("sys.stdout", new_callable=StringIO)
+    def test5(self, mock_stdout):
+        """Send 'benchmark 3 <file>' to PyChess engine, and compare the results"""
+
+        from pychess.Utils.lutils.Benchmark import (
+            HASH_SIZE,
+            benchmarkPositions,
+            compare,
+        )
+
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with patch(
+            "pychess.Players.PyChessCECP.get_input",
+            new=MagicMock(side_effect=["benchmark 3 %s" % path, "stop_unittest"]),
+        ):
+            self.engine.run()
+        with open(path) as f:
+            results = json.load(f)
+
+        self.assertEqual(len(results["positions"]), len(benchmarkPositions))
+        # Not the size of the engine's table
+        self.assertEqual(results["hashSize"], HASH_SIZE)
+        first = results["positions"][0]
+        self.assertEqual(first["depth"], 2)
+        self.assertEqual(first["bestmove"], first["pv"][0])
+        self.assertEqual(compare(results, results), [])
+
+        # Fewer nodes per second, and more nodes in the first position
+        baseline = json.loads(json.dumps(results))
+        baseline["nps"] *= 2
+        baseline["positions"][0]["nodes"] //= 2
+        self.assertEqual(len(compare(results, baseline)), 2)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test4(self, mock_stdout):
+        """Let PyChess engine ponder, and play the move it ponders on"""
+
+        engine = self.engine
+
+        def waitForPondering():
+            while not engine.pondering:
+                sleep(0.01)
+
+        def commands():
+            yield "setboard r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16"
+            yield "hard"
+            yield "sd 3"
+            yield "go"
+            waitForPondering()
+            yield "usermove %s" % toSAN(engine.board, engine.ponderMove)
+            waitForPondering()
+            yield "force"
+            yield "stop_unittest"
+
+        with patch(
+            "pychess.Players.PyChessCECP.get_input",
+            new=MagicMock(side_effect=commands()),
+        ):
+            engine.run()
+        output = mock_stdout.getvalue()
+
+        self.assertEqual(output.count("\nmove "), 2)
+        self.assertFalse(engine.pondering)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test7(self, mock_stdout):
+        """Let PyChess engine ponder, and play another move than it ponders on"""
+
+        engine = self.engine
+
+        def waitForPondering():
+            while not engine.pondering:
+                sleep(0.01)
+
+        def otherMove():
+            for move in genLegalMoves(engine.board):
+                if move != engine.ponderMove:
+                    return toSAN(engine.board, move)
+
+        def commands():
+            yield "setboard r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16"
+            yield "hard"
+            yield "level 40 5 0"
+            yield "sd 2"
+            yield "go"
+            waitForPondering()
+            sleep(0.5)
+            yield "time 5000"
+            yield "usermove %s" % otherMove()
+            waitForPondering()
+            yield "force"
+            yield "stop_unittest"
+
+        with patch(
+            "pychess.Players.PyChessCECP.get_input",
+            new=MagicMock(side_effect=commands()),
+        ):
+            engine.run()
+        output = mock_stdout.getvalue()
+
+        self.assertEqual(output.count("\nmove "), 2)
+        # Only the search of the second move used our 50 seconds, not the
+        # first search nor the pondering
+        self.assertGreater(engine.clock[engine.playingAs], 49.7)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test8(self, mock_stdout):
+        """Let PyChess engine search with a helper process, set by 'cores 2'"""
+
+        engine = self.engine
+        self.addCleanup(engine.smp.shutdown)
+        fen = "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16"
+
+        def commands():
+            yield "cores 2"
+            yield "setboard %s" % fen
+            yield "sd 4"
+            yield "go"
+            while "\nmove " not in mock_stdout.getvalue():
+                sleep(0.01)
+            yield "force"
+            yield "stop_unittest"
+
+        with patch(
+            "pychess.Players.PyChessCECP.get_input",
+            new=MagicMock(side_effect=commands()),
+        ):
+            engine.run()
+        output = mock_stdout.getvalue()
+
+        self.assertEqual(len(engine.smp.helpers), 1)
+        self.assertGreater(engine.smp.nodes, 0)
+        board = LBoard()
+        board.applyFen(fen)
+        san = output.split("\nmove ")[1].split()[0]
+        self.assertIn(parseSAN(board, san), list(genLegalMoves(board)))
+
+    @patch("sys.stdout", new_callable=StringIO)
+    @patch(
+        "pychess.Players.PyChessCECP.get_input",
+        new=MagicMock(side_effect=["memory 0", "stop_unittest"]),
+    )
+    def test9(self, mock_stdout):
+        """Send 'memory' with a too low limit to PyChess engine"""
+
+        self.engine.run()
+        output = mock_stdout.getvalue()
+
+        self.assertTrue(output.endswith("Error (limit too low): memory 0\n"))
+
+    def test10(self):
+        """Let PyChess engine search inside an aspiration window"""
+
+        engine = self.engine
+        fen = "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16"
+
+        def search(window, lastScore):
+            engine.aspirationWindow = window
+            board = LBoard()
+            board.applyFen(fen)
+            lsearch.table.clear()
+            lsearch.nodes = 0
+            lsearch.searching = True
+            lsearch.endtime = time() + 60
+            mvs, scr = engine._PyChess__search(board, 4, lastScore)
+            return mvs[0], scr, lsearch.nodes
+
+        move, scr, nodes = search(0, 0)
+        # A window around the score saves nodes
+        self.assertLess(search(50, scr)[2], nodes)
+        # A window the score falls outside of is searched again without it
+        for lastScore in (scr - 500, scr + 500):
+            move2, scr2, nodes2 = search(50, lastScore)
+            self.assertEqual((move2, scr2), (move, scr))
+            self.assertGreater(nodes2, nodes)
+
+    def test11(self):
+        """Let a helper of PyChess engine search with the options it's sent"""
+
+        saved = {name: getattr(lsearch, name) for name in SEARCH_OPTIONS}
+        saved["table"] = lsearch.table
+
+        def restore():
+            for name, value in saved.items():
+                setattr(lsearch, name, value)
+
+        self.addCleanup(restore)
+        pawnHashSize = leval.pawnHashSize
+        self.addCleanup(leval.setPawnHashSize, pawnHashSize * leval.pawnEntryType.size)
+
+        board = LBoard()
+        board.applyFen("r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16")
+        options = {name: not getattr(lsearch, name) for name in SEARCH_OPTIONS}
+        options["skipPruneChance"] = 0.5
+        commands = SimpleQueue()
+        commands.put((board, 1, time() + 60, 1, 0, options, pawnHashSize // 2))
+        commands.put(None)
+        # The helper in a thread of this process, so that we can look at it
+        helper = Thread(
+            target=_helperMain,
+            args=(
+                0,
+                RawArray("c", 64 * lsearch.table.bucketSize),
+                commands,
+                RawValue("i", 0),
+                RawValue("i", 1),
+                RawArray("q", 1),
+            ),
+        )
+        helper.start()
+        helper.join()
+
+        for name, value in options.items():
+            self.assertEqual(getattr(lsearch, name), value, name)
+        self.assertEqual(leval.pawnHashSize, pawnHashSize // 2)
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test6(self, mock_stdout):
+        """Send 'new' and 'variant' to PyChess engine"""
+
+        for name, variant in (
+            ("losers", LOSERSCHESS),
+            ("crazyhouse", CRAZYHOUSECHESS),
+            ("atomic", ATOMICCHESS),
+        ):
+            engine = PyChessCECP()
+            with patch(
+                "pychess.Players.PyChessCECP.get_input",
+                new=MagicMock(
+                    side_effect=[
+                        "new",
+                        "variant %s" % name,
+                        "force",
+                        "usermove e4",
+                        "stop_unittest",
+                    ]
+                ),
+            ):
+                engine.run()
+
+            board = LBoard(variant)
+            board.applyFen(FEN_START)
+            board.applyMove(engine.board.hist_move[0])
+            self.assertEqual(engine.board.variant, variant)
+            self.assertEqual(engine.board.material, board.material)
+            self.assertEqual(
+                evaluateComplete(engine.board, engine.board.color),
+                evaluateComplete(board, board.color),
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
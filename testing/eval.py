@@ -1,7 +1,9 @@
 import unittest
 
-from pychess.Utils.const import WHITE, BLACK, NORMALCHESS
+from pychess.Utils.const import WHITE, BLACK, NORMALCHESS, PAWN, KING
 from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.ldata import PIECE_VALUES
+from pychess.Utils.lutils.lmove import parseSAN
 from pychess.Utils.lutils.leval import evaluateComplete
 from pychess.Utils.lutils import leval
 
@@ -23,13 +25,17 @@ class EvalTestCase(unittest.TestCase):
 
     def test3(self):
         """Testing eval symmetry of each function"""
-        funcs = (f for f in dir(leval) if f.startswith("eval"))
+        # The evaluate* functions evaluate whole positions, not parts of them
+        funcs = (
+            f
+            for f in dir(leval)
+            if f.startswith("eval") and not f.startswith("evaluate")
+        )
         funcs = (getattr(leval, f) for f in funcs)
         funcs = (
             f
             for f in funcs
             if callable(f)
-            and f != leval.evaluateComplete
             and f != leval.evalMaterial
             and f != leval.evalPawnStructure
             and f != leval.evalTrappedBishops
@@ -59,6 +65,23 @@ class EvalTestCase(unittest.TestCase):
             # print func, sw, sb
             self.assertEqual(sw, sb)
 
+    def test4(self):
+        """Testing incremental material through captures, promotions and popMove"""
+        board = LBoard(NORMALCHESS)
+        board.applyFen("r3k2r/1P6/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1")
+        material = board.material[:]
+        for san in ("exd6", "Kd7", "bxa8=Q", "Rxa8", "Rxa8"):
+            board.applyMove(parseSAN(board, san))
+            for color in (WHITE, BLACK):
+                expected = sum(
+                    PIECE_VALUES[piece] * board.pieceCount[color][piece]
+                    for piece in range(PAWN, KING)
+                )
+                self.assertEqual(board.material[color], expected)
+        for i in range(5):
+            board.popMove()
+        self.assertEqual(board.material, material)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,14 +2,30 @@ import os.path
 import unittest
 
 from pychess import MSYS2
-from pychess.Utils.lutils.lmovegen import genAllMoves, genCheckEvasions
+from pychess.Utils.lutils.lmovegen import (
+    genAllMoves,
+    genCheckEvasions,
+    genLegalMoves,
+    isPseudoLegal,
+)
 from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.lsort import genStagedMoves
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
+from pychess.Utils.lutils.perft import do_perft, readEpd
 
 # from pychess.Utils.lutils.ldata import *
 from pychess.Utils.lutils.validator import validateMove
 
 from pychess.Utils.lutils.lmove import toSAN, parseSAN, ParsingError
-from pychess.Utils.const import NORMALCHESS, SITTUYINCHESS, CAMBODIANCHESS, MAKRUKCHESS
+from pychess.Utils.const import (
+    NORMALCHESS,
+    CRAZYHOUSECHESS,
+    FISCHERRANDOMCHESS,
+    SITTUYINCHESS,
+    CAMBODIANCHESS,
+    MAKRUKCHESS,
+    NORMAL_MOVE,
+)
 
 
 class FindMovesTestCase(unittest.TestCase):
@@ -198,5 +214,70 @@ class FindMovesTestCase(unittest.TestCase):
         self.movegen(positions, MAKRUKCHESS)
 
 
+class StagedMovesTestCase(unittest.TestCase):
+    def testStagedMoves(self):
+        """Testing genStagedMoves and isPseudoLegal against genAllMoves"""
+        table = TranspositionTable(1 << 16)
+        curdir = os.path.dirname(__file__)
+        with open("%s/gamefiles/perftsuite.epd" % curdir) as f:
+            fens = [line.split(";")[0] for line in f if not line.startswith("#")]
+
+        for fen in fens[:40]:
+            board = LBoard(NORMALCHESS)
+            board.applyFen(fen)
+            for move in genAllMoves(board):
+                board.applyMove(move)
+                moves = list(genAllMoves(board))
+                for hashmove in moves:
+                    self.assertEqual(
+                        isPseudoLegal(board, hashmove), hashmove >> 12 == NORMAL_MOVE
+                    )
+                # An illegal hash move must not be played
+                for hashmove in moves[:1] + [4095]:
+                    table.setHashMove(1, hashmove)
+                    staged = [m for value, m in genStagedMoves(board, table, 1)]
+                    self.assertEqual(sorted(staged), sorted(moves))
+                board.popMove()
+
+
+class LegalMovesTestCase(unittest.TestCase):
+    def legalMoves(self, board):
+        moves = []
+        for move in genAllMoves(board):
+            board.applyMove(move)
+            if not board.opIsChecked():
+                moves.append(move)
+            board.popMove()
+        return sorted(moves)
+
+    def compare(self, board, depth):
+        moves = self.legalMoves(board)
+        self.assertEqual(sorted(genLegalMoves(board)), moves, board.asFen())
+        if depth > 1:
+            for move in moves:
+                board.applyMove(move)
+                self.compare(board, depth - 1)
+                board.popMove()
+
+    def testLegalMoves(self):
+        """Testing genLegalMoves against genAllMoves and opIsChecked"""
+        curdir = os.path.dirname(__file__)
+        for variant, name in (
+            (NORMALCHESS, "perftsuite.epd"),
+            (FISCHERRANDOMCHESS, "frc_perftsuite.epd"),
+        ):
+            for fen, counts in readEpd("%s/gamefiles/%s" % (curdir, name)):
+                board = LBoard(variant)
+                board.applyFen(fen)
+                self.compare(board, 2)
+                # perft counts with genLegalMoves
+                self.assertEqual(do_perft(board, 2), counts[1])
+
+        # Checks can be blocked with drops in crazyhouse
+        board = LBoard(CRAZYHOUSECHESS)
+        board.applyFen("r3k3/8/8/8/8/8/8/R3K3[Nn] w Qq - 0 1")
+        self.compare(board, 3)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,75 @@
+import os
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from pychess.Utils.lutils.LBoard import LBoard
+from pychess.Utils.lutils.perft import (
+    PerftTable,
+    countNodes,
+    createPool,
+    do_perft,
+    main,
+)
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+
+curdir = os.path.dirname(__file__)
+
+
+class PerftTestCase(unittest.TestCase):
+    def setUp(self):
+        self.board = LBoard()
+        self.board.applyFen(KIWIPETE)
+
+    def test1(self):
+        """Testing perft with a hash table"""
+        table = PerftTable(1024 * 1024)
+        self.assertEqual(do_perft(self.board, 3, table=table), 97862)
+        # Now counted from the table
+        self.assertEqual(do_perft(self.board, 3, table=table), 97862)
+        self.assertEqual(table.probe(self.board.hash, 3), 97862)
+        self.assertEqual(self.board.asFen(), KIWIPETE)
+
+    def test2(self):
+        """Testing perft shared out to processes"""
+        pool = createPool(2, 1024 * 1024)
+        try:
+            self.assertEqual(countNodes(self.board, 3, pool=pool), 97862)
+        finally:
+            pool.close()
+            pool.join()
+
+    def test3(self):
+        """Testing perft script over EPD files"""
+        files = [
+            "%s/gamefiles/%s" % (curdir, name)
+            for name in ("atomic_perftsuite.epd", "zh_perftsuite.epd")
+        ]
+        with redirect_stdout(StringIO()):
+            self.assertEqual(main(["-d", "3", "-v", "atomic", files[0]]), 0)
+            self.assertEqual(main(["-d", "3", "-v", "crazyhouse", files[1]]), 0)
+            # The counts of crazyhouse aren't those of atomic
+            self.assertEqual(main(["-d", "2", "-v", "crazyhouse", files[0]]), 1)
+
+    def test4(self):
+        """Testing perft script dividing the count by the root moves"""
+        path = "%s/gamefiles/zh_perftsuite.epd" % curdir
+        output = StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(
+                main(["-d", "2", "-v", "crazyhouse", "-j", "2", "--divide", "1", path]),
+                0,
+            )
+
+        # The first position is the start position, with 20 moves of 20
+        # replies, which come between the counts of depth 1 and 2
+        lines = output.getvalue().splitlines()
+        moves = lines[2:22]
+        self.assertEqual([line.split()[1] for line in moves], ["20"] * 20)
+        self.assertEqual(moves[-1].split()[2], "400")
+        self.assertEqual(lines[22].split()[:3], ["2", "400", "400"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import importlib
+import os
+import tempfile
+import unittest
+
+from pychess.Utils.lutils import ldata, tablecache
+
+
+class TableCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addCleanup(setattr, tablecache, "cacheDir", tablecache.cacheDir)
+        tablecache.cacheDir = tmpdir.name
+        self.path = os.path.join(tmpdir.name, "%s.tables" % ldata.__name__)
+
+    def buildTables(self):
+        """Imports ldata again, returning its tables"""
+        importlib.reload(ldata)
+        return {name: getattr(ldata, name) for name in ldata.CACHED_TABLES}
+
+    def test1(self):
+        """Testing ldata tables loaded from the cache"""
+        # Built, as the cache is empty
+        built = self.buildTables()
+        self.assertTrue(os.path.exists(self.path))
+        self.assertIsNotNone(tablecache.loadTables(ldata.__name__, ldata.SOURCES))
+
+        loaded = self.buildTables()
+        self.assertEqual(loaded.keys(), built.keys())
+        for name in built:
+            self.assertEqual(loaded[name], built[name], name)
+
+    def test2(self):
+        """Testing the cache going stale with a source of the tables"""
+        source = os.path.join(tablecache.cacheDir, "source.py")
+        with open(source, "w") as f:
+            f.write("table = [1, 2]\n")
+        tablecache.saveTables("test", (source,), {"table": [1, 2]})
+        self.assertEqual(tablecache.loadTables("test", (source,)), {"table": [1, 2]})
+
+        with open(source, "w") as f:
+            f.write("table = [1, 2, 3]\n")
+        self.assertIsNone(tablecache.loadTables("test", (source,)))
+
+        # ldata's tables depend on the sources of the modules they're built
+        # from, not only on ldata's own
+        self.buildTables()
+        self.assertIsNone(tablecache.loadTables(ldata.__name__, ldata.SOURCES[:1]))
+
+    def test3(self):
+        """Testing ldata tables built again instead of loaded from a bad cache"""
+        built = self.buildTables()
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        for bad in (data[: len(data) // 2], b"garbage", b""):
+            with open(self.path, "wb") as f:
+                f.write(bad)
+            self.assertIsNone(tablecache.loadTables(ldata.__name__, ldata.SOURCES))
+
+            rebuilt = self.buildTables()
+            for name in built:
+                self.assertEqual(rebuilt[name], built[name], name)
+            # And saved again
+            self.assertIsNotNone(tablecache.loadTables(ldata.__name__, ldata.SOURCES))
+
+        # Without a cache dir the tables are neither loaded nor saved
+        tablecache.cacheDir = None
+        self.assertIsNone(tablecache.loadTables(ldata.__name__, ldata.SOURCES))
+
+
+if __name__ == "__main__":
+    unittest.main()
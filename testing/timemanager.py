@@ -0,0 +1,78 @@
+import unittest
+
+from pychess.Utils.lutils.TimeManager import (
+    TimeManager,
+    MOVE_OVERHEAD,
+    MAX_TIMECHECK_FREQ,
+    MIN_TIMECHECK_FREQ,
+)
+
+
+class TimeManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tm = TimeManager()
+
+    def test1(self):
+        """Testing TimeManager soft and hard limits"""
+        self.tm.start(10, 100)
+        self.assertEqual(self.tm.softLimit, 10)
+        self.assertEqual(self.tm.hardLimit, 40)
+
+        # Never more than half of the clock, unless planned
+        self.tm.start(10, 30)
+        self.assertEqual(self.tm.hardLimit, (30 - MOVE_OVERHEAD) / 2)
+        self.tm.start(10, 15)
+        self.assertEqual(self.tm.hardLimit, 10)
+
+        # Nor more than we have
+        self.tm.start(1, 0.5)
+        self.assertEqual(self.tm.softLimit, 0.5 - MOVE_OVERHEAD)
+
+    def test2(self):
+        """Testing TimeManager predicting the next iteration"""
+        self.tm.start(15, 70)
+        self.tm.starttime -= 1
+        self.tm.iterationDone(1000, 1, 0)
+        self.assertTrue(self.tm.nextIteration())
+
+        # Branching factor 4, so the next iteration takes about 4 * 8 s
+        self.tm.starttime -= 1
+        self.tm.iterationDone(5000, 1, 0)
+        self.tm.starttime -= 8
+        self.tm.iterationDone(21000, 1, 0)
+        self.assertAlmostEqual(self.tm.branchingFactor(), 4)
+        self.assertAlmostEqual(self.tm.predictedTime(), 32, places=2)
+        self.assertLess(self.tm.elapsed(), self.tm.softLimit)
+        self.assertFalse(self.tm.nextIteration())
+
+    def test3(self):
+        """Testing TimeManager extending the soft limit"""
+        self.tm.start(10, 100)
+        self.tm.iterationDone(1000, 1, 0)
+        self.tm.iterationDone(2000, 1, 0)
+        self.tm.starttime -= 11
+        self.assertFalse(self.tm.nextIteration())
+
+        # The best move changed
+        self.tm.iterationDone(3000, 2, 0)
+        self.assertTrue(self.tm.nextIteration())
+
+        # The score dropped
+        self.tm.start(10, 100)
+        self.tm.iterationDone(1000, 1, 0)
+        self.tm.iterationDone(2000, 1, -50)
+        self.tm.starttime -= 15
+        self.assertTrue(self.tm.nextIteration())
+
+    def test4(self):
+        """Testing TimeManager time check frequency"""
+        self.tm.nps = 10000
+        self.assertEqual(self.tm.timecheckFreq(), 50)
+        self.tm.nps = 1
+        self.assertEqual(self.tm.timecheckFreq(), MIN_TIMECHECK_FREQ)
+        self.tm.nps = 10**9
+        self.assertEqual(self.tm.timecheckFreq(), MAX_TIMECHECK_FREQ)
+
+
+if __name__ == "__main__":
+    unittest.main()
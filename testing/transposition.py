@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+
+from pychess.Utils.const import hashfEXACT, hashfBAD
+from pychess.Utils.lutils import leval, lsearch
+from pychess.Utils.lutils.TranspositionTable import TranspositionTable
+from pychess.Utils.lutils.EvalCache import EvalCache, entrySize
+
+
+class FakeBoard:
+    def __init__(self, hash):
+        self.hash = hash
+
+
+class TranspositionTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(64 * TranspositionTable.bucketSize)
+        # Boards hashing to the same bucket
+        self.boards = [FakeBoard(i * self.table.buckets + 1) for i in range(1001, 1007)]
+
+    def test1(self):
+        """Testing TranspositionTable record and probe"""
+        board = self.boards[0]
+        self.assertIsNone(self.table.probe(board, 1, -100, 100))
+
+        self.table.record(board, 42, 10, hashfEXACT, 3)
+        self.assertEqual(self.table.probe(board, 3, -100, 100), (42, 10, hashfEXACT))
+        self.assertEqual(self.table.probe(board, 4, -100, 100), (42, 10, hashfBAD))
+        self.assertIsNone(self.table.probe(self.boards[1], 1, -100, 100))
+
+    def test2(self):
+        """Testing TranspositionTable keeping the deepest entries"""
+        for depth, board in enumerate(self.boards[:3], 5):
+            self.table.record(board, depth, 0, hashfEXACT, depth)
+
+        # Shallow entries only go into the always-replace slot
+        for board in self.boards[3:]:
+            self.table.record(board, 1, 0, hashfEXACT, 1)
+        for depth, board in enumerate(self.boards[:3], 5):
+            self.assertEqual(self.table.probe(board, depth, 0, 0)[0], depth)
+        self.assertIsNone(self.table.probe(self.boards[3], 1, 0, 0))
+        self.assertIsNone(self.table.probe(self.boards[4], 1, 0, 0))
+        self.assertEqual(self.table.probe(self.boards[5], 1, 0, 0)[0], 1)
+
+        # In the next search the old entries make room for new ones
+        self.table.newSearch()
+        self.table.record(self.boards[3], 1, 0, hashfEXACT, 1)
+        self.assertEqual(self.table.probe(self.boards[3], 1, 0, 0)[0], 1)
+        self.assertEqual(self.table.probe(self.boards[5], 1, 0, 0)[0], 1)
+
+    def test3(self):
+        """Testing lsearch.setHashSize"""
+        pawntable = leval.pawntable
+        context = lsearch.SearchContext()
+        lsearch.setHashSize(4, context)
+        table = context.table
+        pawnSize = int(4 * 1024 * 1024 * lsearch.PAWN_HASH_SHARE)
+        evalSize = int(4 * 1024 * 1024 * lsearch.EVAL_CACHE_SHARE)
+        self.assertEqual(
+            table.buckets, (4 * 1024 * 1024 - pawnSize - evalSize) // table.bucketSize
+        )
+        self.assertEqual(context.evalCache.size, evalSize // entrySize)
+        self.assertIsNot(table, lsearch.table)
+        # The pawn table of the engine is left alone for a context of its own
+        self.assertIs(leval.pawntable, pawntable)
+
+        saved = lsearch.table, lsearch.evalCache
+        self.addCleanup(setattr, lsearch, "table", saved[0])
+        self.addCleanup(setattr, lsearch, "evalCache", saved[1])
+        self.addCleanup(
+            leval.setPawnHashSize, leval.pawnHashSize * leval.pawnEntryType.size
+        )
+        lsearch.setHashSize(4)
+        self.assertEqual(leval.pawnHashSize, pawnSize // leval.pawnEntryType.size)
+        self.assertEqual(lsearch.table.buckets, table.buckets)
+
+    def test4(self):
+        """Testing TranspositionTable statistics"""
+        for board in self.boards[:3]:
+            self.table.record(board, 1, 0, hashfEXACT, 5)
+        for board in self.boards[3:5]:
+            self.table.record(board, 1, 0, hashfEXACT, 1)
+        self.table.probe(self.boards[0], 1, 0, 0)
+        self.table.probe(self.boards[3], 1, 0, 0)
+        self.table.probe(self.boards[4], 1, 0, 0)
+        self.assertEqual(self.table.hits, 2)
+        self.assertEqual(self.table.misses, 1)
+        self.assertEqual(self.table.overwrites, 1)
+
+        self.table.clear()
+        self.assertEqual(self.table.hits + self.table.misses, 0)
+
+    def test5(self):
+        """Testing TranspositionTable stored in a file"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "hash")
+            size = 64 * TranspositionTable.bucketSize
+            table = TranspositionTable(size, path=path)
+            for depth, board in enumerate(self.boards[:3], 1):
+                table.record(board, depth, 0, hashfEXACT, depth)
+            table.save()
+            self.assertEqual(os.path.getsize(path), size)
+
+            table = TranspositionTable(size, path=path)
+            self.assertEqual(table.probe(self.boards[0], 1, 0, 0)[0], 1)
+            table.clear()
+            self.assertIsNone(table.probe(self.boards[0], 1, 0, 0))
+
+            # Loading a file which doesn't fit the table clears it
+            table.record(self.boards[0], 1, 0, hashfEXACT, 1)
+            table = TranspositionTable(2 * size, path=path)
+            self.assertIsNone(table.probe(self.boards[0], 1, 0, 0))
+            self.assertEqual(os.path.getsize(path), 2 * size)
+
+            context = lsearch.SearchContext()
+            lsearch.setHashFile(path, context)
+            self.assertEqual(context.table.buckets, table.buckets)
+            lsearch.setHashFile(None, context)
+            self.assertIsNone(context.table.path)
+
+    def test6(self):
+        """Testing EvalCache"""
+        cache = EvalCache(64 * entrySize)
+        hash = self.boards[0].hash
+        self.assertIsNone(cache.probe(hash))
+        cache.record(hash, -42)
+        self.assertEqual(cache.probe(hash), -42)
+
+        # Entries hashing to the same index replace each other
+        cache.record(hash + cache.size, 7)
+        self.assertIsNone(cache.probe(hash))
+        self.assertEqual(cache.probe(hash + cache.size), 7)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        # Entries are kept until the next search
+        for i in range(255):
+            cache.newSearch()
+            self.assertIsNone(cache.probe(hash + cache.size))
+            cache.record(hash, i)
+        cache.newSearch()
+        self.assertIsNone(cache.probe(hash))
+
+
+if __name__ == "__main__":
+    unittest.main()
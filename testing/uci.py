@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from io import StringIO
+from time import sleep
+
+from pychess.Players.PyChessUCI import PyChessUCI
+
+FEN = "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16"
+
+
+class UCITests(unittest.TestCase):
+    def setUp(self):
+        self.engine = PyChessUCI()
+
+    def run_engine(self, commands):
+        with patch(
+            "pychess.Players.PyChessUCI.get_input",
+            new=MagicMock(side_effect=commands),
+        ):
+            self.engine.run()
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test1(self, mock_stdout):
+        """Send 'uci' to PyChess UCI engine"""
+
+        self.run_engine(["uci", "isready", "stop_unittest"])
+        output = mock_stdout.getvalue()
+
+        self.assertIn("option name Hash type spin", output)
+        self.assertTrue(output.endswith("uciok\nreadyok\n"))
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test2(self, mock_stdout):
+        """Search a position with moves to a fixed depth"""
+
+        engine = self.engine
+
+        def commands():
+            yield "position fen %s moves a1e1 g8h8" % FEN
+            yield "go depth 3"
+            engine.thread.join()
+            yield "stop_unittest"
+
+        self.run_engine(commands())
+        lines = mock_stdout.getvalue().splitlines()
+
+        self.assertTrue(lines[-2].startswith("info depth 3 multipv 1 score cp "))
+        self.assertIn(" hashfull ", lines[-2])
+        self.assertTrue(lines[-1].startswith("bestmove f1f7"))
+
+    @patch("sys.stdout", new_callable=StringIO)
+    def test3(self, mock_stdout):
+        """Search until stop, and ponder until ponderhit"""
+
+        engine = self.engine
+
+        def waitForSearches(count):
+            while mock_stdout.getvalue().count("info depth 2 ") < count:
+                sleep(0.01)
+
+        def commands():
+            yield "position fen %s" % FEN
+            yield "go infinite"
+            waitForSearches(1)
+            yield "stop"
+            yield "position fen %s moves a1e1" % FEN
+            yield "go ponder wtime 1000 btime 1000"
+            waitForSearches(2)
+            yield "ponderhit"
+            engine.thread.join()
+            yield "stop_unittest"
+
+        self.run_engine(commands())
+        output = mock_stdout.getvalue()
+
+        self.assertEqual(output.count("bestmove "), 2)
+        self.assertFalse(engine.pondering)
+
+
+if __name__ == "__main__":
+    unittest.main()
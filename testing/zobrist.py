@@ -3,6 +3,7 @@ import unittest
 from pychess.Utils.Board import Board
 from pychess.Utils.lutils.LBoard import LBoard
 from pychess.Utils.lutils.lmove import parseAN
+from pychess.Utils.lutils.lsearch import NULL_MOVE
 
 FEN = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
 
@@ -91,6 +92,38 @@ class ZobristTestCase(unittest.TestCase):
 
         self.assertEqual(hash1, hash2)
 
+    def testZobrist_5(self):
+        """Testing zobrist hashing with a null move and take back"""
+
+        board = self.board
+        self.make_move("a2a4")
+        self.make_move("e8g8")
+        self.make_move("c3b1")
+        self.make_move("c7c5")
+        fen = board.asFen()
+        state = (board.hash, board.enpassant, board.fifty, board.plyCount)
+        history = [len(board.hist_move), len(board.hist_hash), len(board.hist_state)]
+        self.assertIsNotNone(board.enpassant)
+
+        board.applyMove(NULL_MOVE)
+        self.assertIsNone(board.enpassant)
+        # The same position with black to move
+        nullBoard = LBoard(Board)
+        nullBoard.applyFen(fen.replace(" w ", " b ").replace(" c6 ", " - "))
+        self.assertEqual(board.hash, nullBoard.hash)
+        self.assertEqual(board.repetitionCount(), 1)
+
+        board.popMove()
+        self.assertEqual(board.asFen(), fen)
+        self.assertEqual(
+            (board.hash, board.enpassant, board.fifty, board.plyCount), state
+        )
+        self.assertEqual(
+            [len(board.hist_move), len(board.hist_hash), len(board.hist_state)],
+            history,
+        )
+        self.assertEqual(board.repetitionCount(), 1)
+
 
 if __name__ == "__main__":
     unittest.main()